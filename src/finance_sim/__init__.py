@@ -1,2 +1,5 @@
 from .config import *
 from .events import *
+from .stochastic import *
+from .home import *
+from .retirement import *
@@ -1,13 +1,14 @@
 from ctypes import ArgumentError
 import re
 import yaml
-from dataclasses import dataclass
+from copy import deepcopy
+from dataclasses import dataclass, field
 from datetime import date
 from dateutil.relativedelta import relativedelta
-from typing import Any
+from typing import Any, Iterator, Tuple
 
 from .scheduling import AccrualModel
-from .util import parseAccrualModel
+from .util import parseAccrualModel, parseGranularity
 
 
 @dataclass
@@ -38,33 +39,15 @@ class ScenarioConfig(object):
     time: TimeConfig
     initialState: list[StateConfig]
     scheduledValues: list[ScheduledState]
+    indices: dict[str, Any] = field(default_factory=dict)
+    sweep: dict[str, list[float]] = field(default_factory=dict)
 
 
-def _parseGranularity(granularityStr: str) -> relativedelta:
-    pattern = r"(\d+)\s*(d|w|M2?|Y)"
-    match = re.match(pattern, granularityStr)
-    if not match:
-        raise ArgumentError(
-            "granularityStr must match the regex pattern {}, got {}".format(
-                pattern, granularityStr
-            )
-        )
-
-    groups = match.groups()
-    value = int(groups[0])
-    unit = groups[1]
-    if unit == "d":
-        return relativedelta(days=value)
-    if unit == "w":
-        return relativedelta(days=7 * value)
-    if unit == "M":
-        return relativedelta(months=value)
-    if unit == "M2":
-        return relativedelta(days=15 * value)
-    if unit == "Y":
-        return relativedelta(years=value)
-
-    raise RuntimeError("None of the supported units was used")
+@dataclass
+class SweepPoint(object):
+    index: int
+    values: dict[str, float]
+    config: ScenarioConfig
 
 
 def _parseState(stateConfig) -> StateConfig:
@@ -93,6 +76,134 @@ def _parseScheduledStateUpdates(rawScheduledUpdates) -> list[ScheduledState]:
     return result
 
 
+def _configSections(config: ScenarioConfig) -> dict[str, list[StateConfig]]:
+    return {
+        "initialState": config.initialState,
+        "scheduledStateUpdates": [scheduled.state for scheduled in config.scheduledValues],
+    }
+
+
+def _resolveConfigPath(config: ScenarioConfig, path: str) -> Tuple[Any, Any]:
+    """
+    Paths address a value by section, state name and data key, mirroring the YAML
+    layout, e.g. "initialState.Savings.value", "scheduledStateUpdates.raise.salary",
+    "indices.cpi.annualRate" or "time.period". Further segments index into nested lists
+    and dicts.
+    """
+    segments = path.split(".")
+    if len(segments) == 2 and segments[0] == "time":
+        return config.time, segments[1]
+    container: Any
+    if len(segments) >= 3 and segments[0] == "indices":
+        if segments[1] not in config.indices:
+            raise ArgumentError("{} does not name an index".format(path))
+        container = config.indices[segments[1]]
+    else:
+        sections = _configSections(config)
+        if len(segments) < 3 or segments[0] not in sections:
+            raise ArgumentError("{} is not a valid config path".format(path))
+        states = [state for state in sections[segments[0]] if state.name == segments[1]]
+        if len(states) != 1:
+            raise ArgumentError("{} does not name exactly one state".format(path))
+        container = states[0].data
+    for segment in segments[2:-1]:
+        container = container[int(segment) if isinstance(container, list) else segment]
+    key = segments[-1]
+    return container, int(key) if isinstance(container, list) else key
+
+
+def getConfigValue(config: ScenarioConfig, path: str) -> Any:
+    container, key = _resolveConfigPath(config, path)
+    if isinstance(container, TimeConfig):
+        return getattr(container, key)
+    return container[key]
+
+
+def withConfigValue(config: ScenarioConfig, path: str, value: Any) -> ScenarioConfig:
+    """
+    Returns a copy of `config` with the value at `path` replaced, leaving `config`
+    untouched.
+    """
+    result = deepcopy(config)
+    _setConfigValue(result, path, value)
+    return result
+
+
+def _setConfigValue(config: ScenarioConfig, path: str, value: Any):
+    container, key = _resolveConfigPath(config, path)
+    if isinstance(container, TimeConfig):
+        setattr(container, key, value)
+    else:
+        container[key] = value
+
+
+def _parseSweepAxis(path: str, spec: Any) -> list[float]:
+    """
+    An axis is a list of values, {start, stop, count} for `count` evenly spaced values
+    from `start` to `stop`, or {start, stop, step} for values from `start` up to and
+    including `stop` in steps of `step`.
+    """
+    if isinstance(spec, list) and spec:
+        return list(spec)
+    if isinstance(spec, dict) and set(spec) == {"start", "stop", "count"}:
+        count = int(spec["count"])
+        if count < 1:
+            raise RuntimeError("sweep {}: count must be positive".format(path))
+        if count == 1:
+            return [spec["start"]]
+        width = (spec["stop"] - spec["start"]) / (count - 1)
+        return [spec["start"] + width * i for i in range(count)]
+    if isinstance(spec, dict) and set(spec) == {"start", "stop", "step"}:
+        if spec["step"] <= 0 or spec["stop"] < spec["start"]:
+            raise RuntimeError("sweep {}: the range must be increasing".format(path))
+        count = int((spec["stop"] - spec["start"]) / spec["step"] + 1e-9) + 1
+        return [spec["start"] + spec["step"] * i for i in range(count)]
+    raise RuntimeError(
+        "sweep {}: expected a list of values or {{start, stop, count|step}}, got {!r}".format(
+            path, spec
+        )
+    )
+
+
+def sweepSize(config: ScenarioConfig) -> int:
+    size = 1
+    for values in config.sweep.values():
+        size *= len(values)
+    return size
+
+
+def sweepVariants(
+    config: ScenarioConfig, shard: int = 0, shards: int = 1
+) -> Iterator[SweepPoint]:
+    """
+    Yields one SweepPoint per point of the product of `config.sweep`'s axes, each with
+    a copy of `config` that has the point's values filled in and no sweep. Points are
+    numbered with the last axis varying fastest and built one at a time, so grids of any
+    size can be walked. With `shards`, only the points whose number is `shard` modulo
+    `shards` are generated, which splits a grid evenly and deterministically between
+    workers.
+    """
+    if shards < 1 or not 0 <= shard < shards:
+        raise ArgumentError("shard must be in [0, {})".format(shards))
+    axes = list(config.sweep.items())
+    for path, values in axes:
+        current = getConfigValue(config, path)
+        if isinstance(current, bool) or not isinstance(current, (int, float)):
+            raise ArgumentError("sweep {}: {!r} is not a number".format(path, current))
+    base = deepcopy(config)
+    base.sweep = {}
+    for index in range(shard, sweepSize(config), shards):
+        point: dict[str, float] = {}
+        remainder = index
+        for path, values in reversed(axes):
+            remainder, position = divmod(remainder, len(values))
+            point[path] = values[position]
+        variant = deepcopy(base)
+        for path, value in point.items():
+            _setConfigValue(variant, path, value)
+        yield SweepPoint(index, {path: point[path] for path, _ in axes}, variant)
+
+
 def parseConfig(path: str) -> ScenarioConfig:
     with open(path, "r") as configFile:
         rawConfig = yaml.safe_load(configFile)
@@ -110,7 +221,7 @@ def parseConfig(path: str) -> ScenarioConfig:
                 '"time" field requires "granularity", "accrualModel", ' + 'and "period"'
             )
         timeConfig = TimeConfig(
-            granularity=_parseGranularity(rawTimeConfig["granularity"]),
+            granularity=parseGranularity(rawTimeConfig["granularity"]),
             accrualModel=parseAccrualModel(rawTimeConfig["accrualModel"]),
             period=int(rawTimeConfig["period"]),
             startingDate=rawTimeConfig["startingDate"],
@@ -126,6 +237,15 @@ def parseConfig(path: str) -> ScenarioConfig:
 
         scheduledUpdates = _parseScheduledStateUpdates(rawConfig["scheduledStateUpdates"])
 
+        sweep = {
+            axis: _parseSweepAxis(axis, spec)
+            for axis, spec in (rawConfig.get("sweep") or {}).items()
+        }
+
         return ScenarioConfig(
-            time=timeConfig, initialState=stateConfig, scheduledValues=scheduledUpdates
+            time=timeConfig,
+            initialState=stateConfig,
+            scheduledValues=scheduledUpdates,
+            indices=rawConfig.get("indices") or {},
+            sweep=sweep,
         )
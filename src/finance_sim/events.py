@@ -3,13 +3,25 @@ from __future__ import annotations
 import abc
 
 from ctypes import ArgumentError
+from bisect import bisect_right
+from collections.abc import Sequence
 from dataclasses import dataclass
+import datetime
 from datetime import date
+from heapq import heapify, heappop, heappush
+from math import inf
+from enum import Enum
 from dateutil.relativedelta import relativedelta
-from typing import Any, Optional, Type
+from typing import Any, Optional, Tuple
 
-from .scheduling import AccrualModel, portionOfYear
-from .util import parseAccrualModel
+import numpy as np
+
+from .ledger import Ledger
+from .registry import ProfileRegistry
+from .scheduling import AccrualModel, CadenceKey, Timeline, cadenceKey, portionOfYear
+from . import schema
+from .schema import ConfigField
+from .util import parseAccrualModel, parseGranularity, parseIndex
 
 EventConfigType = Optional[dict[str, Any]]
 
@@ -21,6 +33,8 @@ class AbstractEventProfile(abc.ABC):
     """
 
     name: str
+    # keys the profile reads from its config `data`, checked before a run starts
+    configSchema: dict[str, ConfigField] = {}
 
     @abc.abstractmethod
     def __init__(self, config: EventConfigType, name: str, **kwargs):
@@ -34,38 +48,188 @@ class AbstractEventProfile(abc.ABC):
     def copy(self) -> AbstractEventProfile:
         raise NotImplementedError()
 
+    def prepare(self, timeline: Timeline, step: int) -> None:
+        """
+        Called once when the profile enters a simulation, with the timeline it runs on
+        and the first step it can be transformed on. Profiles that precompute values for
+        every step they will see do it here.
+        """
+        pass
+
+    def netWorth(self) -> float:
+        """
+        What the profile adds to (or, for debts, takes from) net worth.
+        """
+        return 0.0
+
+    def observableState(self) -> Any:
+        """
+        Two snapshots of a profile with equal observable state are interchangeable in
+        history, which is what lets SparseFinanceHistory skip storing unchanged steps.
+        """
+        return vars(self)
+
+
+abstractEventProfileType = ProfileRegistry(
+    AbstractEventProfile, "finance_sim.event_profiles"
+)
+
+
+class PreparedProfile(AbstractEventProfile):
+    """
+    A profile that computes what it needs for every step it will see when the
+    simulation prepares it, and reads one entry per transform. The attributes named in
+    `shared` hold that data, the first one indexed by step; copies share them, and they
+    and the `step` cursor are left out of the observable state.
+    """
+
+    shared: Tuple[str, ...] = ()
+    step: int
+
+    @abc.abstractmethod
+    def _precompute(self, timeline: Timeline, step: int) -> None:
+        raise NotImplementedError()
+
+    def prepare(self, timeline: Timeline, step: int):
+        self._precompute(timeline, step)
+        self.step = 0
+
+    def _nextStep(self) -> int:
+        step = self.step
+        if step >= len(getattr(self, self.shared[0])):
+            raise RuntimeError(
+                "{} must be prepared for the timeline it runs on".format(self.name)
+            )
+        self.step += 1
+        return step
+
+    def _shareWith(self, result: PreparedProfile) -> PreparedProfile:
+        for name in self.shared:
+            setattr(result, name, getattr(self, name))
+        result.step = self.step
+        return result
+
+    def observableState(self) -> Any:
+        hidden = set(self.shared) | {"step"}
+        return {key: value for key, value in vars(self).items() if key not in hidden}
+
+
+class InsolvencyPolicy(Enum):
+    """
+    What happens when a withdrawal exceeds the cash on hand. Raise aborts the run, Stop
+    ends it after the step the shortfall happened on, and Continue lets the cash go
+    negative.
+    """
 
-abstractEventProfileType: dict[str, Type[AbstractEventProfile]] = {}
+    Raise = 0
+    Stop = 1
+    Continue = 2
 
 
 class EventProfileGroup(object):
     date: date
     events: dict[str, AbstractEventProfile]
+    insolvencyPolicy: InsolvencyPolicy
+    shortfall: float
+    ledger: Optional[Ledger]
 
-    def __init__(self, date: date, events: dict[str, AbstractEventProfile]):
+    def __init__(
+        self,
+        date: date,
+        events: dict[str, AbstractEventProfile],
+        insolvencyPolicy: InsolvencyPolicy = InsolvencyPolicy.Raise,
+        ledger: Optional[Ledger] = None,
+    ):
         self.date = date
         self.events = events
+        self.insolvencyPolicy = insolvencyPolicy
+        self.shortfall = 0
+        self.ledger = ledger
+        self._cashWaterfall: Optional[_CashWaterfall] = None
+
+    def cashWaterfall(self) -> _CashWaterfall:
+        """
+        Built on first use. Adding or removing profiles through setEvent and removeEvent
+        discards it; editing `events` directly after cash has moved does not.
+        """
+        if self._cashWaterfall is None:
+            self._cashWaterfall = _CashWaterfall(self.events, self.ledger)
+        return self._cashWaterfall
+
+    def setEvent(self, name: str, event: AbstractEventProfile):
+        self.events[name] = event
+        self._cashWaterfall = None
+
+    def removeEvent(self, name: str):
+        del self.events[name]
+        self._cashWaterfall = None
 
     def copy(self):
         return EventProfileGroup(
-            self.date, {name: event.copy() for name, event in self.events.items()}
+            self.date,
+            {name: event.copy() for name, event in self.events.items()},
+            self.insolvencyPolicy,
+            self.ledger,
         )
 
 
 class CashEventProfile(AbstractEventProfile):
+    """
+    A cash account. Deposits fill accounts in ascending depositPriority up to their
+    caps, and withdrawals drain them in ascending withdrawalPriority. Accounts with equal
+    priority are used in the order they appear in the group.
+    """
+
     value: float
+    depositPriority: float
+    withdrawalPriority: float
+    cap: Optional[float]
+
+    configSchema = {
+        "value": ConfigField(schema.number),
+        "depositPriority": ConfigField(schema.number, required=False, continuous=False),
+        "withdrawalPriority": ConfigField(schema.number, required=False, continuous=False),
+        "cap": ConfigField(schema.number, required=False),
+    }
 
-    def __init__(self, config: EventConfigType, name: str, value: float = 0):
+    def __init__(
+        self,
+        config: EventConfigType,
+        name: str,
+        value: float = 0,
+        depositPriority: float = 0,
+        withdrawalPriority: float = 0,
+        cap: Optional[float] = None,
+    ):
         self.name = name
         if config is not None:
-            self.value = float(config["value"])
+            value = float(config["value"])
+            depositPriority = config.get("depositPriority", 0)
+            withdrawalPriority = config.get("withdrawalPriority", 0)
+            cap = config.get("cap")
         self.value = value
+        self.depositPriority = depositPriority
+        self.withdrawalPriority = withdrawalPriority
+        self.cap = cap
 
     def transform(self, history: FinanceHistory, date: date, delta: relativedelta):
         pass
 
     def copy(self):
-        return CashEventProfile(None, self.name, self.value)
+        return CashEventProfile(
+            None,
+            self.name,
+            self.value,
+            self.depositPriority,
+            self.withdrawalPriority,
+            self.cap,
+        )
+
+    def room(self) -> float:
+        return inf if self.cap is None else self.cap - self.value
+
+    def netWorth(self) -> float:
+        return self.value
 
     def __str__(self):
         return str(round(self.value, 2))
@@ -87,6 +251,13 @@ class TaxPaymentEventProfile(AbstractEventProfile):
     taxableIncome: float
     taxesPaid: float
 
+    configSchema = {
+        "frequency": ConfigField(schema.granularity),
+        "accrualModel": ConfigField(schema.accrualModel),
+        # the first bracket must start at zero income
+        "brackets": ConfigField(schema.taxBrackets, fixed=("0.income",)),
+    }
+
     def __init__(
         self,
         config: EventConfigType,
@@ -96,9 +267,9 @@ class TaxPaymentEventProfile(AbstractEventProfile):
         brackets: list[TaxBracket] = [],
     ):
         if config is not None:
-            frequency = config["frequency"]
+            frequency = parseGranularity(config["frequency"])
             accrualModel = parseAccrualModel(config["accrualModel"])
-            brackets = config["brackets"]  # todo: same as above
+            brackets = [TaxBracket(**bracket) for bracket in config["brackets"]]
         if len(brackets) < 1:
             raise ArgumentError("there must be at least one tax bracket")
         if brackets[0].income != 0.0:
@@ -112,7 +283,9 @@ class TaxPaymentEventProfile(AbstractEventProfile):
         self.taxesPaid = 0
 
     def transform(self, history: FinanceHistory, date: date, delta: relativedelta):
-        if (date - delta) <= (date - self.frequency):
+        # measured forward from the step's start, so a month ending on a clamped day
+        # (Mar 31 to Apr 30) still counts as a month
+        if (date - delta) + self.frequency <= date:
             taxDue = 0
             for bracket in self.brackets[::-1]:
                 adjustedIncomeThreshold = bracket.income * portionOfYear(
@@ -122,7 +295,7 @@ class TaxPaymentEventProfile(AbstractEventProfile):
                     marginAboveBracket = self.taxableIncome - adjustedIncomeThreshold
                     taxDue += bracket.rate * marginAboveBracket
                     self.taxableIncome -= marginAboveBracket
-            addToCash(history.pendingEvents, -taxDue)
+            addToCash(history.pendingEvents, -taxDue, source=self.name)
             self.taxesPaid += taxDue
 
     def copy(self):
@@ -150,6 +323,12 @@ class ConstantGrowthAsset(AbstractEventProfile):
     value: float
     appreciation: float
 
+    configSchema = {
+        "accrualModel": ConfigField(schema.accrualModel),
+        "initialValue": ConfigField(schema.number),
+        "annualAppreciation": ConfigField(schema.number),
+    }
+
     def __init__(
         self,
         config: EventConfigType,
@@ -177,6 +356,9 @@ class ConstantGrowthAsset(AbstractEventProfile):
         )
         return result
 
+    def netWorth(self) -> float:
+        return self.value
+
     def __str__(self) -> str:
         return str(round(self.value, 2))
 
@@ -184,34 +366,131 @@ class ConstantGrowthAsset(AbstractEventProfile):
 abstractEventProfileType["constant-growth-asset"] = ConstantGrowthAsset
 
 
-def addToCash(events: EventProfileGroup, difference: float, taxable: bool = True) -> None:
-    if difference < 0:
-        for _, event in events.events.items():
+class _CashWaterfall(object):
+    """
+    The deposit and withdrawal order of a group's cash accounts, as heaps of
+    (priority, position, name) holding only the accounts that currently have room for
+    deposits or money to withdraw. Built once per group, after which each cash movement
+    costs O(log n) per account it fills or drains. With a ledger, each of those
+    movements is also recorded.
+    """
+
+    accounts: dict[str, CashEventProfile]
+    taxPayment: Optional[TaxPaymentEventProfile]
+    ledger: Optional[Ledger]
+
+    def __init__(
+        self, events: dict[str, AbstractEventProfile], ledger: Optional[Ledger] = None
+    ):
+        self.accounts = {}
+        self.taxPayment = None
+        self.ledger = ledger
+        self.depositKeys: dict[str, Tuple[float, int, str]] = {}
+        self.withdrawalKeys: dict[str, Tuple[float, int, str]] = {}
+        for position, (name, event) in enumerate(events.items()):
             if isinstance(event, CashEventProfile):
-                if event.value >= -difference:
-                    event.value += difference
-                    difference = 0
-                elif event.value > 0:
-                    difference += event.value
-                    event.value = 0
-        if difference > 0:
-            raise RuntimeError("not enough money to subtract")
+                self.accounts[name] = event
+                self.depositKeys[name] = (event.depositPriority, position, name)
+                self.withdrawalKeys[name] = (event.withdrawalPriority, position, name)
+            elif isinstance(event, TaxPaymentEventProfile) and self.taxPayment is None:
+                self.taxPayment = event
+        self.overflow = max(self.depositKeys.values(), default=(0, 0, None))[2]
+        self.overdraft = min(self.withdrawalKeys.values(), default=(0, 0, None))[2]
+        self.depositHeap = [
+            key for name, key in self.depositKeys.items() if self.accounts[name].room() > 0
+        ]
+        self.withdrawalHeap = [
+            key
+            for name, key in self.withdrawalKeys.items()
+            if self.accounts[name].value > 0
+        ]
+        heapify(self.depositHeap)
+        heapify(self.withdrawalHeap)
+        self.canDeposit = {key[2] for key in self.depositHeap}
+        self.canWithdraw = {key[2] for key in self.withdrawalHeap}
+
+    def _changed(self, name: str):
+        account = self.accounts[name]
+        if account.value > 0 and name not in self.canWithdraw:
+            self.canWithdraw.add(name)
+            heappush(self.withdrawalHeap, self.withdrawalKeys[name])
+        if account.room() > 0 and name not in self.canDeposit:
+            self.canDeposit.add(name)
+            heappush(self.depositHeap, self.depositKeys[name])
+
+    def deposit(self, amount: float, source: str = "", taxable: bool = False):
+        """
+        Once every account is at its cap, the rest goes to the last account in deposit
+        order.
+        """
+        while amount > 0 and self.depositHeap:
+            name = self.depositHeap[0][2]
+            account = self.accounts[name]
+            room = account.room()
+            if room <= 0:
+                heappop(self.depositHeap)
+                self.canDeposit.discard(name)
+                continue
+            moved = min(amount, room)
+            account.value += moved
+            amount -= moved
+            self._changed(name)
+            if self.ledger is not None:
+                self.ledger.record(source, name, moved, taxable)
+        if amount > 0 and self.overflow is not None:
+            self.accounts[self.overflow].value += amount
+            self._changed(self.overflow)
+            if self.ledger is not None:
+                self.ledger.record(source, self.overflow, amount, taxable)
+
+    def withdraw(self, amount: float, source: str = "") -> float:
+        """
+        Returns the part of `amount` the accounts could not cover.
+        """
+        while amount > 0 and self.withdrawalHeap:
+            name = self.withdrawalHeap[0][2]
+            account = self.accounts[name]
+            if account.value <= 0:
+                heappop(self.withdrawalHeap)
+                self.canWithdraw.discard(name)
+                continue
+            moved = min(amount, account.value)
+            account.value -= moved
+            amount -= moved
+            self._changed(name)
+            if self.ledger is not None:
+                self.ledger.record(source, name, -moved, False)
+        return amount
+
+    def overdraw(self, amount: float, source: str = ""):
+        if self.overdraft is not None:
+            self.accounts[self.overdraft].value -= amount
+            self._changed(self.overdraft)
+            if self.ledger is not None:
+                self.ledger.record(source, self.overdraft, -amount, False)
+
+
+def addToCash(
+    events: EventProfileGroup, difference: float, taxable: bool = True, source: str = ""
+) -> None:
+    """
+    A withdrawal the cash accounts cannot cover raises under InsolvencyPolicy.Raise.
+    Otherwise the rest is overdrawn from the first account in withdrawal order and added
+    to the group's shortfall for the engine to act on. `source` names the profile the
+    money comes from or goes to in the group's ledger, if it has one.
+    """
+    waterfall = events.cashWaterfall()
+    if difference < 0:
+        shortfall = waterfall.withdraw(-difference, source)
+        if shortfall > 0:
+            if events.insolvencyPolicy == InsolvencyPolicy.Raise:
+                raise RuntimeError("not enough money to subtract")
+            waterfall.overdraw(shortfall, source)
+            events.shortfall += shortfall
     else:
-        cashEventProfile: Optional[CashEventProfile] = None
-        taxPaymentEventProfile: Optional[TaxPaymentEventProfile] = None
-        for _, event in events.events.items():
-            if isinstance(event, CashEventProfile):
-                cashEventProfile = event
-                if taxPaymentEventProfile:
-                    break
-            elif isinstance(event, TaxPaymentEventProfile):
-                taxPaymentEventProfile = event
-                if cashEventProfile:
-                    break
-        if cashEventProfile:
-            cashEventProfile.value += difference
-        if taxable and taxPaymentEventProfile:
-            taxPaymentEventProfile.taxableIncome += difference
+        waterfall.deposit(difference, source, taxable)
+        if taxable and waterfall.taxPayment:
+            waterfall.taxPayment.taxableIncome += difference
 
 
 class AmortizingLoan(AbstractEventProfile):
@@ -221,6 +500,17 @@ class AmortizingLoan(AbstractEventProfile):
     rate: float
     term: float
     payment: float
+    interestPaid: float
+
+    configSchema = {
+        "accrualModel": ConfigField(schema.accrualModel),
+        "initialPrinciple": ConfigField(schema.number),
+        "loanAmount": ConfigField(schema.number),
+        "rate": ConfigField(schema.number),
+        "remainingTermInYears": ConfigField(schema.number),
+        # -1 computes the payment on the first step
+        "payment": ConfigField(schema.number, continuous=False),
+    }
 
     def __init__(
         self,
@@ -247,18 +537,20 @@ class AmortizingLoan(AbstractEventProfile):
         self.rate = rate
         self.term = remainingTermInYears
         self.payment = payment
+        self.interestPaid = 0
 
     def transform(self, history: FinanceHistory, date: date, period: relativedelta) -> None:
         yearFraction = portionOfYear(date, period, self.accrualModel)
         adjustedRate = pow(1 + self.rate, yearFraction) - 1
-        interestPaid = (self.loanAmount - self.principle) * adjustedRate
+        interest = (self.loanAmount - self.principle) * adjustedRate
         if self.payment < 0:
             denominator = 1 - pow(1 + adjustedRate, -(self.term / yearFraction))
-            paymentAmount = interestPaid / denominator
+            paymentAmount = interest / denominator
             self.payment = paymentAmount
-        self.principle += self.payment - interestPaid
+        self.principle += self.payment - interest
         self.term -= yearFraction
-        addToCash(history.pendingEvents, -self.payment)
+        self.interestPaid += interest
+        addToCash(history.pendingEvents, -self.payment, source=self.name)
 
     def copy(self):
         result = AmortizingLoan(
@@ -271,8 +563,12 @@ class AmortizingLoan(AbstractEventProfile):
             self.term,
             self.payment,
         )
+        result.interestPaid = self.interestPaid
         return result
 
+    def netWorth(self) -> float:
+        return self.principle - self.loanAmount
+
     def __str__(self):
         return str(self.principle)
 
@@ -284,6 +580,11 @@ class ConstantSalariedIncome(AbstractEventProfile):
     salary: float
     accrualModel: AccrualModel
 
+    configSchema = {
+        "salary": ConfigField(schema.number),
+        "accrualModel": ConfigField(schema.accrualModel),
+    }
+
     def __init__(
         self,
         config: EventConfigType,
@@ -300,7 +601,7 @@ class ConstantSalariedIncome(AbstractEventProfile):
 
     def transform(self, history: FinanceHistory, date: date, period: relativedelta):
         portion = portionOfYear(date, period, self.accrualModel)
-        addToCash(history.pendingEvents, portion * self.salary)
+        addToCash(history.pendingEvents, portion * self.salary, source=self.name)
 
     def copy(self):
         return ConstantSalariedIncome(None, self.name, self.salary, self.accrualModel)
@@ -316,6 +617,11 @@ class ConstantExpense(AbstractEventProfile):
     yearlyExpense: float
     accrualModel: AccrualModel
 
+    configSchema = {
+        "yearlyExpense": ConfigField(schema.number),
+        "accrualModel": ConfigField(schema.accrualModel),
+    }
+
     def __init__(
         self,
         config: EventConfigType,
@@ -332,7 +638,7 @@ class ConstantExpense(AbstractEventProfile):
 
     def transform(self, history: FinanceHistory, date: date, period: relativedelta):
         portion = portionOfYear(date, period, self.accrualModel)
-        addToCash(history.pendingEvents, -portion * self.yearlyExpense)
+        addToCash(history.pendingEvents, -portion * self.yearlyExpense, source=self.name)
 
     def copy(self):
         return ConstantExpense(None, self.name, self.yearlyExpense, self.accrualModel)
@@ -344,9 +650,130 @@ class ConstantExpense(AbstractEventProfile):
 abstractEventProfileType["constant-expense"] = ConstantExpense
 
 
+class _IndexedCashFlow(PreparedProfile):
+    """
+    A yearly amount, in terms of the start of the simulation, scaled by an index curve,
+    with the curve's level prepared for every step the profile is due.
+    """
+
+    accrualModel: AccrualModel
+    index: Tuple[float, ...]
+    levels: np.ndarray
+    level: float
+    shared = ("levels",)
+
+    def _setup(self, name: str, accrualModel: AccrualModel, index: Tuple[float, ...]):
+        self.name = name
+        self.accrualModel = accrualModel
+        self.index = index
+        self.levels = np.empty(0)
+        self.level = 1.0
+        self.step = 0
+
+    def _precompute(self, timeline: Timeline, step: int):
+        curve = timeline.indexCurve(self.index)
+        self.levels = curve[timeline.dueSteps(cadenceKey(self.accrualModel), step)]
+
+    def _nextLevel(self) -> float:
+        self.level = float(self.levels[self._nextStep()])
+        return self.level
+
+    def _copyInto(self, result: _IndexedCashFlow) -> _IndexedCashFlow:
+        result.level = self.level
+        return self._shareWith(result)
+
+
+class IndexedSalariedIncome(_IndexedCashFlow):
+    salary: float
+
+    configSchema = {
+        "salary": ConfigField(schema.number),
+        "accrualModel": ConfigField(schema.accrualModel),
+        "index": ConfigField(schema.index),
+    }
+
+    def __init__(
+        self,
+        config: EventConfigType,
+        name: str,
+        salary: float = 0,
+        accrualModel: AccrualModel = AccrualModel.PeriodicMonthly,
+        index: Tuple[float, ...] = (0.0,),
+    ):
+        if config is not None:
+            salary = config["salary"]
+            accrualModel = parseAccrualModel(config["accrualModel"])
+            index = parseIndex(config["index"])
+        self._setup(name, accrualModel, index)
+        self.salary = salary
+
+    def transform(self, history: FinanceHistory, date: date, period: relativedelta):
+        portion = portionOfYear(date, period, self.accrualModel)
+        amount = portion * self.salary * self._nextLevel()
+        addToCash(history.pendingEvents, amount, source=self.name)
+
+    def copy(self):
+        result = IndexedSalariedIncome(
+            None, self.name, self.salary, self.accrualModel, self.index
+        )
+        return self._copyInto(result)
+
+    def __str__(self):
+        return str(self.salary * self.level)
+
+
+abstractEventProfileType["indexed-salaried-income"] = IndexedSalariedIncome
+
+
+class IndexedExpense(_IndexedCashFlow):
+    yearlyExpense: float
+
+    configSchema = {
+        "yearlyExpense": ConfigField(schema.number),
+        "accrualModel": ConfigField(schema.accrualModel),
+        "index": ConfigField(schema.index),
+    }
+
+    def __init__(
+        self,
+        config: EventConfigType,
+        name: str,
+        yearlyExpense: float = 0,
+        accrualModel: AccrualModel = AccrualModel.PeriodicMonthly,
+        index: Tuple[float, ...] = (0.0,),
+    ):
+        if config is not None:
+            yearlyExpense = config["yearlyExpense"]
+            accrualModel = parseAccrualModel(config["accrualModel"])
+            index = parseIndex(config["index"])
+        self._setup(name, accrualModel, index)
+        self.yearlyExpense = yearlyExpense
+
+    def transform(self, history: FinanceHistory, date: date, period: relativedelta):
+        portion = portionOfYear(date, period, self.accrualModel)
+        amount = portion * self.yearlyExpense * self._nextLevel()
+        addToCash(history.pendingEvents, -amount, source=self.name)
+
+    def copy(self):
+        result = IndexedExpense(
+            None, self.name, self.yearlyExpense, self.accrualModel, self.index
+        )
+        return self._copyInto(result)
+
+    def __str__(self):
+        return str(-self.yearlyExpense * self.level)
+
+
+abstractEventProfileType["indexed-expense"] = IndexedExpense
+
+
+def netWorth(events: EventProfileGroup) -> float:
+    return sum(event.netWorth() for event in events.events.values())
+
+
 class FinanceState(object):
-    def __init__(self, date: date = date.today()):
-        self.date = date
+    def __init__(self, date: Optional[date] = None):
+        self.date = date if date is not None else datetime.date.today()
         self.cash: float = 0
         self.constantGrowthAssets: list[ConstantGrowthAsset] = []
         self.amortizingLoans: dict[str, AmortizingLoan] = {}
@@ -357,8 +784,8 @@ class FinanceState(object):
         result = FinanceState()
         result.date = self.date
         result.cash = self.cash
-        result.constantGrowthAssets = self.constantGrowthAssets
-        result.amortizingLoans = self.amortizingLoans
+        result.constantGrowthAssets = list(self.constantGrowthAssets)
+        result.amortizingLoans = dict(self.amortizingLoans)
         result.taxableIncome = self.taxableIncome
         result.taxesPaid = self.taxesPaid
         return result
@@ -366,18 +793,30 @@ class FinanceState(object):
 
 class FinanceHistory(object):
     pendingEvents: EventProfileGroup
+    insolvencyDate: Optional[date] = None
 
     def __init__(self, event: EventProfileGroup):
         self.data: list[EventProfileGroup] = [event]
 
     def _startPendingEventProfile(self, date: date):
-        self.pendingEvents = self.data[-1].copy()
+        self.pendingEvents = self.latestEvents().copy()
         self.pendingEvents.date = date
 
     def _processAndPushPending(self, date: date, period: relativedelta):
         for _, event in self.pendingEvents.events.items():
             event.transform(self, date, period)
-        self.data.append(self.pendingEvents)
+        self.appendEvent(self.pendingEvents)
+
+    def _processAndPushDue(self, date: date, due: dict[CadenceKey, relativedelta]):
+        """
+        Only transforms the profiles whose cadence falls on this step, each over the
+        period since its own previous step.
+        """
+        for _, event in self.pendingEvents.events.items():
+            period = due.get(cadenceKey(getattr(event, "accrualModel", None)))
+            if period is not None:
+                event.transform(self, date, period)
+        self.appendEvent(self.pendingEvents)
 
     def passEvent(self, date: date, period: relativedelta):
         self._startPendingEventProfile(date)
@@ -388,3 +827,175 @@ class FinanceHistory(object):
 
     def latestEvents(self):
         return self.data[-1]
+
+
+class LatestFinanceHistory(FinanceHistory):
+    """
+    Keeps only the most recent step, for runs that only need the state at the end (or
+    at each step as it happens) rather than the path that led there.
+    """
+
+    def __init__(self, event: EventProfileGroup):
+        self._latest = event
+
+    @property
+    def data(self) -> list[EventProfileGroup]:
+        return [self._latest]
+
+    def appendEvent(self, events: EventProfileGroup):
+        self._latest = events
+
+    def latestEvents(self):
+        return self._latest
+
+
+class InPlaceFinanceHistory(LatestFinanceHistory):
+    """
+    Advances one state in place instead of copying it every step, for runs that only
+    need the state at the end. The group and its profiles are the ones the run started
+    with, and its cash waterfall is kept from step to step, so profiles must move cash
+    through addToCash.
+    """
+
+    def _startPendingEventProfile(self, date: date):
+        events = self._latest
+        events.date = date
+        events.shortfall = 0
+        self.pendingEvents = events
+
+
+class _SparseColumn(object):
+    steps: list[int]
+    snapshots: list[Optional[AbstractEventProfile]]
+
+    def __init__(self):
+        self.steps = []
+        self.snapshots = []
+
+    def at(self, step: int) -> Optional[AbstractEventProfile]:
+        position = bisect_right(self.steps, step) - 1
+        return self.snapshots[position] if position >= 0 else None
+
+
+class _SparseRows(Sequence):
+    def __init__(self, history: SparseFinanceHistory):
+        self.history = history
+
+    def __len__(self) -> int:
+        return len(self.history.dates)
+
+    def __getitem__(self, step):
+        if isinstance(step, slice):
+            return [self[index] for index in range(*step.indices(len(self)))]
+        if step < 0:
+            step += len(self)
+        if not 0 <= step < len(self):
+            raise IndexError("history step out of range")
+        return self.history.stepAt(step)
+
+    def __iter__(self):
+        columns = list(self.history.columns.items())
+        positions = [-1] * len(columns)
+        for step, stepDate in enumerate(self.history.dates):
+            events: dict[str, AbstractEventProfile] = {}
+            for index, (name, column) in enumerate(columns):
+                position = positions[index]
+                while (
+                    position + 1 < len(column.steps) and column.steps[position + 1] <= step
+                ):
+                    position += 1
+                positions[index] = position
+                if position >= 0 and column.snapshots[position] is not None:
+                    events[name] = column.snapshots[position]
+            yield EventProfileGroup(stepDate, events)
+
+
+def _sameState(a: Any, b: Any) -> bool:
+    """
+    Equality that also works on states holding numpy arrays. Anything that cannot be
+    compared counts as changed, which only costs an extra snapshot.
+    """
+    if a is b:
+        return True
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return (
+            isinstance(a, np.ndarray)
+            and isinstance(b, np.ndarray)
+            and a.dtype == b.dtype
+            and bool(np.array_equal(a, b))
+        )
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_sameState(a[key], b[key]) for key in a)
+    if isinstance(a, (list, tuple)) and type(a) is type(b):
+        return len(a) == len(b) and all(_sameState(x, y) for x, y in zip(a, b))
+    try:
+        return bool(a == b)
+    except (ValueError, TypeError):
+        return False
+
+
+class SparseFinanceHistory(FinanceHistory):
+    """
+    Stores a profile snapshot only on the steps where its observable state changed (or
+    it was added or removed), instead of a full copy of every profile on every step.
+    Steps and columns are rebuilt on demand; `data` is a read-only view of the rebuilt
+    steps so code written against FinanceHistory keeps working.
+    """
+
+    dates: list[date]
+    columns: dict[str, _SparseColumn]
+
+    def __init__(self, event: EventProfileGroup):
+        self.dates = []
+        self.columns = {}
+        self._latest = event
+        self._record(event)
+
+    @property
+    def data(self) -> Sequence[EventProfileGroup]:
+        return _SparseRows(self)
+
+    def _record(self, events: EventProfileGroup):
+        step = len(self.dates)
+        self.dates.append(events.date)
+        for name, event in events.events.items():
+            column = self.columns.get(name)
+            if column is None:
+                column = self.columns[name] = _SparseColumn()
+            previous = column.snapshots[-1] if column.snapshots else None
+            if previous is None or (
+                previous is not event
+                and not _sameState(previous.observableState(), event.observableState())
+            ):
+                column.steps.append(step)
+                column.snapshots.append(event)
+        for name, column in self.columns.items():
+            if name not in events.events and column.snapshots[-1] is not None:
+                column.steps.append(step)
+                column.snapshots.append(None)
+
+    def appendEvent(self, events: EventProfileGroup):
+        self._latest = events
+        self._record(events)
+
+    def latestEvents(self):
+        return self._latest
+
+    def stepAt(self, step: int) -> EventProfileGroup:
+        events: dict[str, AbstractEventProfile] = {}
+        for name, column in self.columns.items():
+            event = column.at(step)
+            if event is not None:
+                events[name] = event
+        return EventProfileGroup(self.dates[step], events)
+
+    def column(self, name: str) -> list[Optional[AbstractEventProfile]]:
+        column = self.columns[name]
+        result: list[Optional[AbstractEventProfile]] = [None] * len(self.dates)
+        bounds = column.steps[1:] + [len(self.dates)]
+        for start, end, event in zip(column.steps, bounds, column.snapshots):
+            result[start:end] = [event] * (end - start)
+        return result
+
+    def storedSnapshots(self) -> int:
+        return sum(len(column.snapshots) for column in self.columns.values())
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+from datetime import date
+from dateutil.relativedelta import relativedelta
+
+import numpy as np
+
+from .events import (
+    EventConfigType,
+    FinanceHistory,
+    PreparedProfile,
+    abstractEventProfileType,
+    addToCash,
+)
+from . import schema
+from .schema import ConfigField
+from .scheduling import AccrualModel, Timeline, cadenceKey, portionsOfYear
+from .util import parseAccrualModel
+
+homeScheduleRecord = np.dtype(
+    [
+        ("value", np.float64),
+        ("balance", np.float64),
+        ("interest", np.float64),
+        ("payment", np.float64),
+        ("carryingCost", np.float64),
+    ]
+)
+
+
+def homeSchedule(
+    portions: np.ndarray,
+    purchasePrice: float,
+    loanAmount: float,
+    rate: float,
+    termInYears: float,
+    annualAppreciation: float,
+    carryingRate: float,
+) -> np.ndarray:
+    """
+    The state of a home after each of a run of periods, given as portions of a year:
+    its value, the remaining mortgage balance, and the interest, mortgage payment and
+    carrying cost (property tax and maintenance, charged on the value at the start of
+    the period) of the period. The payment is fixed from the first period like
+    AmortizingLoan's, and stops once the mortgage is paid off.
+    """
+    result = np.zeros(len(portions), dtype=homeScheduleRecord)
+    if len(portions) == 0:
+        return result
+    values = purchasePrice * np.power(1 + annualAppreciation, np.cumsum(portions))
+    result["value"] = values
+    result["carryingCost"] = (
+        carryingRate * portions * np.concatenate([[purchasePrice], values[:-1]])
+    )
+    if loanAmount <= 0:
+        return result
+
+    rates = np.power(1 + rate, portions) - 1
+    firstPeriods = termInYears / portions[0]
+    if rates[0] == 0:
+        payment = loanAmount / firstPeriods
+    else:
+        payment = loanAmount * rates[0] / (1 - (1 + rates[0]) ** -firstPeriods)
+    # balance after period k is G_k * (loanAmount - payment * sum_{i<=k} 1 / G_i) with
+    # G_k the compounded growth through period k
+    growth = np.cumprod(1 + rates)
+    balances = growth * (loanAmount - payment * np.cumsum(1 / growth))
+    payments = np.full(len(portions), payment)
+    # tolerate rounding so a loan paid off on schedule does not leave a dust payment
+    paidOff = np.flatnonzero(balances <= 1e-9 * loanAmount)
+    if len(paidOff):
+        last = paidOff[0]
+        payments[last] += balances[last]
+        payments[last + 1 :] = 0
+        balances[last:] = 0
+    result["balance"] = balances
+    result["interest"] = np.concatenate([[loanAmount], balances[:-1]]) * rates
+    result["payment"] = payments
+    return result
+
+
+class HomeProfile(PreparedProfile):
+    """
+    A home bought with a down payment and a mortgage, appreciating at a constant rate
+    and costing property tax and maintenance as yearly fractions of its value. Each
+    transform posts the step's mortgage payment and carrying cost from the prepared
+    schedule, plus the down payment on the first step, as one cash movement.
+    """
+
+    accrualModel: AccrualModel
+    purchasePrice: float
+    downPayment: float
+    rate: float
+    termInYears: float
+    annualAppreciation: float
+    propertyTaxRate: float
+    maintenanceRate: float
+    value: float
+    balance: float
+    interestPaid: float
+    purchased: bool
+    schedule: np.ndarray
+    shared = ("schedule",)
+
+    configSchema = {
+        "accrualModel": ConfigField(schema.accrualModel),
+        "purchasePrice": ConfigField(schema.number),
+        "downPayment": ConfigField(schema.number),
+        "rate": ConfigField(schema.number),
+        "termInYears": ConfigField(schema.number),
+        "annualAppreciation": ConfigField(schema.number),
+        "propertyTaxRate": ConfigField(schema.number, required=False),
+        "maintenanceRate": ConfigField(schema.number, required=False),
+    }
+
+    def __init__(
+        self,
+        config: EventConfigType,
+        name: str,
+        accrualModel: AccrualModel = AccrualModel.PeriodicMonthly,
+        purchasePrice: float = 0,
+        downPayment: float = 0,
+        rate: float = 0.05,
+        termInYears: float = 30,
+        annualAppreciation: float = 0,
+        propertyTaxRate: float = 0,
+        maintenanceRate: float = 0,
+    ):
+        if config is not None:
+            accrualModel = parseAccrualModel(config["accrualModel"])
+            purchasePrice = config["purchasePrice"]
+            downPayment = config["downPayment"]
+            rate = config["rate"]
+            termInYears = config["termInYears"]
+            annualAppreciation = config["annualAppreciation"]
+            propertyTaxRate = config.get("propertyTaxRate", 0)
+            maintenanceRate = config.get("maintenanceRate", 0)
+        self.name = name
+        self.accrualModel = accrualModel
+        self.purchasePrice = purchasePrice
+        self.downPayment = downPayment
+        self.rate = rate
+        self.termInYears = termInYears
+        self.annualAppreciation = annualAppreciation
+        self.propertyTaxRate = propertyTaxRate
+        self.maintenanceRate = maintenanceRate
+        self.value = purchasePrice
+        self.balance = purchasePrice - downPayment
+        self.interestPaid = 0
+        self.purchased = False
+        self.schedule = np.zeros(0, dtype=homeScheduleRecord)
+        self.step = 0
+
+    def _precompute(self, timeline: Timeline, step: int):
+        starts, ends = timeline.spans(cadenceKey(self.accrualModel), step)
+        self.schedule = homeSchedule(
+            portionsOfYear(starts, ends, self.accrualModel),
+            self.purchasePrice,
+            self.purchasePrice - self.downPayment,
+            self.rate,
+            self.termInYears,
+            self.annualAppreciation,
+            self.propertyTaxRate + self.maintenanceRate,
+        )
+        self.schedule.flags.writeable = False
+
+    def transform(self, history: FinanceHistory, date: date, period: relativedelta):
+        step = self._nextStep()
+        entry = self.schedule[step]
+        outflow = float(entry["payment"] + entry["carryingCost"])
+        if not self.purchased:
+            outflow += self.downPayment
+            self.purchased = True
+        self.value = float(entry["value"])
+        self.balance = float(entry["balance"])
+        self.interestPaid += float(entry["interest"])
+        addToCash(history.pendingEvents, -outflow, source=self.name)
+
+    def copy(self) -> HomeProfile:
+        result = HomeProfile(
+            None,
+            self.name,
+            self.accrualModel,
+            self.purchasePrice,
+            self.downPayment,
+            self.rate,
+            self.termInYears,
+            self.annualAppreciation,
+            self.propertyTaxRate,
+            self.maintenanceRate,
+        )
+        result.value = self.value
+        result.balance = self.balance
+        result.interestPaid = self.interestPaid
+        result.purchased = self.purchased
+        return self._shareWith(result)
+
+    def netWorth(self) -> float:
+        # no equity until the first step has paid the down payment out of cash
+        return self.value - self.balance if self.purchased else 0
+
+    def __str__(self) -> str:
+        return str(round(self.netWorth(), 2))
+
+
+abstractEventProfileType["home"] = HomeProfile
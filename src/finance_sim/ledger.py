@@ -0,0 +1,120 @@
+from datetime import date
+from typing import Optional, Union
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+from pandas import Categorical, DataFrame
+
+from .scheduling import Timeline
+from .util import parseGranularity
+
+ledgerRecord = np.dtype(
+    [
+        ("step", np.int32),
+        ("source", np.int32),
+        ("destination", np.int32),
+        ("amount", np.float64),
+        ("taxable", np.bool_),
+    ]
+)
+
+
+class Ledger(object):
+    """
+    Records every cash movement as (step, source profile, destination account, amount,
+    taxable) in a structured array that doubles in size when full. Names are stored as
+    indexes into `names`. Attach one to a run through `report(..., ledger=...)` or an
+    EventProfileGroup; the engine keeps `step` and `timeline` current.
+    """
+
+    names: list[str]
+    step: int
+    timeline: Optional[Timeline]
+
+    def __init__(self, capacity: int = 1024):
+        self._records = np.zeros(max(capacity, 1), dtype=ledgerRecord)
+        self._size = 0
+        self._codes: dict[str, int] = {}
+        self.names = []
+        self.step = 0
+        self.timeline = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _code(self, name: str) -> int:
+        code = self._codes.get(name)
+        if code is None:
+            code = self._codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+    def record(self, source: str, destination: str, amount: float, taxable: bool):
+        if self._size == len(self._records):
+            grown = np.zeros(2 * len(self._records), dtype=ledgerRecord)
+            grown[: self._size] = self._records
+            self._records = grown
+        self._records[self._size] = (
+            self.step,
+            self._code(source),
+            self._code(destination),
+            amount,
+            taxable,
+        )
+        self._size += 1
+
+    @property
+    def records(self) -> np.ndarray:
+        """
+        A view of the recorded part of the array, valid until the next record.
+        """
+        return self._records[: self._size]
+
+    def frame(self) -> DataFrame:
+        records = self.records
+        return DataFrame(
+            {
+                "step": records["step"],
+                "source": Categorical.from_codes(records["source"], self.names),
+                "destination": Categorical.from_codes(records["destination"], self.names),
+                "amount": records["amount"],
+                "taxable": records["taxable"],
+            }
+        )
+
+    def _periods(self, frequency: relativedelta) -> tuple[np.ndarray, list[date]]:
+        if self.timeline is None:
+            raise RuntimeError("the ledger has not been attached to a run")
+        start = date.fromordinal(self.timeline.startOrdinal)
+        last = int(self.timeline.ordinals[-1]) if len(self.timeline) else start.toordinal()
+        boundaries = [start + frequency]
+        while boundaries[-1].toordinal() < last:
+            boundaries.append(start + frequency * (len(boundaries) + 1))
+        ordinals = np.array([boundary.toordinal() for boundary in boundaries])
+        steps = np.asarray(self.timeline.ordinals)[self.records["step"]]
+        return np.searchsorted(ordinals, steps, side="left"), boundaries
+
+    def summary(self, frequency: Optional[Union[relativedelta, str]] = None) -> DataFrame:
+        """
+        The net amount each source moved, one row per source. Given a `frequency`, there
+        is one column per report period, labelled with its end date, with periods
+        bounded the same way as `report`'s; otherwise one "amount" column.
+        """
+        records = self.records
+        sources = records["source"]
+        if frequency is None:
+            totals = np.bincount(sources, records["amount"], len(self.names))
+            columns: list = ["amount"]
+            table = totals.reshape(-1, 1)
+        else:
+            if isinstance(frequency, str):
+                frequency = parseGranularity(frequency)
+            periods, columns = self._periods(frequency)
+            keys = sources.astype(np.int64) * len(columns) + periods
+            totals = np.bincount(keys, records["amount"], len(self.names) * len(columns))
+            table = totals.reshape(len(self.names), len(columns))
+        used = np.zeros(len(self.names), dtype=bool)
+        used[sources] = True
+        return DataFrame(
+            table[used], index=[n for n, u in zip(self.names, used) if u], columns=columns
+        )
@@ -0,0 +1,223 @@
+"""
+Run metrics. Nothing is measured until a sink is attached with setMetricsSink, and the
+engine only checks for one once per run, so unmonitored runs pay next to nothing.
+"""
+
+import abc
+import os
+import threading
+import time
+import urllib.request
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Iterator, Mapping, Optional, Sequence, Tuple
+
+_help = {
+    "finance_sim_runs_total": "Simulation runs (or resumed parts of runs) finished.",
+    "finance_sim_steps_total": "Timeline steps simulated.",
+    "finance_sim_run_seconds": "Wall time of each simulation run.",
+    "finance_sim_steps_per_second": "Simulation throughput of each run.",
+    "finance_sim_profiles_per_step": "Mean number of active profiles per step of each run.",
+    "finance_sim_scheduled_activations_total": "Scheduled profiles activated.",
+    "finance_sim_insolvencies_total": "Runs that ran out of cash.",
+    "finance_sim_precomputed_lookups_total": "Precomputed tables reused or built.",
+    "finance_sim_report_seconds": "Wall time of building each report.",
+}
+
+_secondsBuckets = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 60)
+defaultBuckets: dict[str, Tuple[float, ...]] = {
+    "finance_sim_run_seconds": _secondsBuckets,
+    "finance_sim_report_seconds": _secondsBuckets,
+    "finance_sim_steps_per_second": (1e2, 1e3, 1e4, 3e4, 1e5, 3e5, 1e6),
+    "finance_sim_profiles_per_step": (1, 2, 5, 10, 20, 50, 100),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class MetricsSink(abc.ABC):
+    """
+    Receives counter increments and histogram observations. Sinks are shared by every
+    thread running simulations, so implementations must be thread-safe.
+    """
+
+    @abc.abstractmethod
+    def increment(self, name: str, amount: float = 1, labels: Mapping[str, str] = {}):
+        pass
+
+    @abc.abstractmethod
+    def observe(self, name: str, value: float, labels: Mapping[str, str] = {}):
+        pass
+
+
+class PrometheusMetrics(MetricsSink):
+    """
+    Keeps metrics in memory and renders them in the Prometheus text exposition format,
+    to write to a file for a textfile collector or push to a gateway.
+    """
+
+    def __init__(self, buckets: Mapping[str, Sequence[float]] = defaultBuckets):
+        self.buckets = {name: tuple(bounds) for name, bounds in buckets.items()}
+        self._counters: dict[str, dict[Labels, float]] = {}
+        self._histograms: dict[str, dict[Labels, list]] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, amount: float = 1, labels: Mapping[str, str] = {}):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, labels: Mapping[str, str] = {}):
+        key = tuple(sorted(labels.items()))
+        bounds = self.buckets.get(name, _secondsBuckets)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [[0] * len(bounds), 0.0, 0]
+            position = bisect_left(bounds, value)
+            if position < len(bounds):
+                state[0][position] += 1
+            state[1] += value
+            state[2] += 1
+
+    def counter(self, name: str, **labels: str) -> float:
+        return self._counters.get(name, {}).get(tuple(sorted(labels.items())), 0)
+
+    def histogram(self, name: str, **labels: str) -> Tuple[float, int]:
+        """
+        The sum and count of the observations of a histogram.
+        """
+        state = self._histograms.get(name, {}).get(tuple(sorted(labels.items())))
+        return (state[1], state[2]) if state is not None else (0.0, 0)
+
+    def exposition(self) -> str:
+        lines: list[str] = []
+
+        def header(name: str, kind: str):
+            if name in _help:
+                lines.append("# HELP {} {}".format(name, _help[name]))
+            lines.append("# TYPE {} {}".format(name, kind))
+
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                header(name, "counter")
+                for key, value in sorted(series.items()):
+                    lines.append("{}{} {}".format(name, _formatLabels(key), _number(value)))
+            for name, histograms in sorted(self._histograms.items()):
+                header(name, "histogram")
+                bounds = self.buckets.get(name, _secondsBuckets)
+                for key, (counts, total, count) in sorted(histograms.items()):
+                    cumulative = 0
+                    for bound, bucketCount in zip(bounds, counts):
+                        cumulative += bucketCount
+                        labels = _formatLabels(key + (("le", _number(bound)),))
+                        lines.append("{}_bucket{} {}".format(name, labels, cumulative))
+                    labels = _formatLabels(key + (("le", "+Inf"),))
+                    lines.append("{}_bucket{} {}".format(name, labels, count))
+                    lines.append(
+                        "{}_sum{} {}".format(name, _formatLabels(key), _number(total))
+                    )
+                    lines.append("{}_count{} {}".format(name, _formatLabels(key), count))
+        return "\n".join(lines) + "\n"
+
+    def writeTextFile(self, path: str):
+        """
+        Replaces `path` atomically, so a collector never reads a partial file.
+        """
+        temporary = "{}.{}.tmp".format(path, os.getpid())
+        with open(temporary, "w") as file:
+            file.write(self.exposition())
+        os.replace(temporary, path)
+
+    def push(self, url: str, timeout: float = 10):
+        """
+        PUTs the metrics to `url`, e.g. a Pushgateway job URL.
+        """
+        request = urllib.request.Request(
+            url,
+            data=self.exposition().encode(),
+            method="PUT",
+            headers={"Content-Type": "text/plain; version=0.0.4"},
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _formatLabels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        '{}="{}"'.format(
+            key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        for key, value in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+_sink: Optional[MetricsSink] = None
+
+
+def setMetricsSink(sink: Optional[MetricsSink]) -> Optional[MetricsSink]:
+    """
+    Attaches `sink` (or detaches the current one with None) and returns the previous one.
+    """
+    global _sink
+    previous, _sink = _sink, sink
+    return previous
+
+
+def currentSink() -> Optional[MetricsSink]:
+    return _sink
+
+
+def increment(name: str, amount: float = 1, **labels: str):
+    sink = _sink
+    if sink is not None:
+        sink.increment(name, amount, labels)
+
+
+@contextmanager
+def timer(name: str, **labels: str) -> Iterator[None]:
+    sink = _sink
+    if sink is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        sink.observe(name, time.perf_counter() - started, labels)
+
+
+class RunStats(object):
+    """
+    Tallies of one run, kept by the engine only while a sink is attached.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.steps = 0
+        self.profiles = 0
+        self.activations = 0
+        self.insolvencies = 0
+
+    def record(self, sink: MetricsSink):
+        seconds = time.perf_counter() - self.started
+        sink.increment("finance_sim_runs_total")
+        sink.increment("finance_sim_steps_total", self.steps)
+        sink.observe("finance_sim_run_seconds", seconds)
+        if self.steps > 0:
+            if seconds > 0:
+                sink.observe("finance_sim_steps_per_second", self.steps / seconds)
+            sink.observe("finance_sim_profiles_per_step", self.profiles / self.steps)
+        if self.activations:
+            sink.increment("finance_sim_scheduled_activations_total", self.activations)
+        if self.insolvencies:
+            sink.increment("finance_sim_insolvencies_total", self.insolvencies)
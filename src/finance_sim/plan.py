@@ -0,0 +1,172 @@
+from bisect import bisect_left
+from ctypes import ArgumentError
+from copy import deepcopy
+from dataclasses import dataclass
+from datetime import date
+from types import MappingProxyType
+from typing import Any, Mapping, Optional, Tuple, Type
+
+from . import metrics
+from .config import ScenarioConfig, StateConfig
+from .events import AbstractEventProfile, abstractEventProfileType
+from .schema import validateConfigData
+from .scheduling import AccrualModel, Timeline, buildTimeline
+from .util import parseAccrualModel, parseIndex
+
+
+@dataclass(frozen=True)
+class ProfileSpec(object):
+    constructor: Type[AbstractEventProfile]
+    name: str
+    data: Any
+    slot: int
+
+    def instantiate(self) -> AbstractEventProfile:
+        """
+        Each profile gets its own copy of the data, so nothing a profile does to its
+        config reaches other runs of the plan.
+        """
+        return self.constructor(deepcopy(self.data), self.name)
+
+
+@dataclass(frozen=True)
+class ScheduledChange(object):
+    profile: ProfileSpec
+    activate: bool
+
+
+@dataclass(frozen=True)
+class ExecutionPlan(object):
+    """
+    A validated scenario, ready to run: the timeline, the profiles of the starting
+    state, and the scheduled profiles to add or remove keyed by timeline step. `slots`
+    names every profile that can appear in the run, and each ProfileSpec knows its slot.
+    Plans do not change once compiled and can be shared between runs.
+    """
+
+    startingDate: date
+    timeline: Timeline
+    initialProfiles: Tuple[ProfileSpec, ...]
+    changes: Mapping[int, Tuple[ScheduledChange, ...]]
+    slots: Tuple[str, ...]
+
+
+def _validateState(where: str, state: StateConfig) -> list[str]:
+    if state.type not in abstractEventProfileType:
+        return ["{}: {} is not a valid event type".format(where, state.type)]
+    schema = abstractEventProfileType[state.type].configSchema
+    return [
+        "{}: {}".format(where, error) for error in validateConfigData(schema, state.data)
+    ]
+
+
+def _indexErrors(where: str, state: StateConfig, indices: Mapping[str, Any]) -> list[str]:
+    if not isinstance(state.data, dict):
+        return []
+    name = state.data.get("index")
+    if isinstance(name, str) and name not in indices:
+        return ["{}: index {} is not defined in indices".format(where, name)]
+    return []
+
+
+def _resolveIndex(data: Any, indices: Mapping[str, Any]) -> Any:
+    """
+    Replaces a profile's reference to a named index with the index's definition.
+    """
+    if isinstance(data, dict) and isinstance(data.get("index"), str):
+        return {**data, "index": indices[data["index"]]}
+    return data
+
+
+def _profileAccrualModels(config: ScenarioConfig) -> set[AccrualModel]:
+    states = config.initialState + [scheduled.state for scheduled in config.scheduledValues]
+    return {
+        parseAccrualModel(state.data["accrualModel"])
+        for state in states
+        if isinstance(state.data, dict) and "accrualModel" in state.data
+    }
+
+
+def _buildTimeline(config: ScenarioConfig) -> Timeline:
+    return buildTimeline(
+        config.time.startingDate,
+        config.time.granularity,
+        config.time.period,
+        config.time.accrualModel,
+        _profileAccrualModels(config),
+    )
+
+
+def validateConfig(config: ScenarioConfig) -> list[str]:
+    """
+    Checks every initial and scheduled profile against the schema of its type, without
+    building anything. Returns a description of each problem found.
+    """
+    errors: list[str] = []
+    for name, definition in config.indices.items():
+        try:
+            parseIndex(definition)
+        except ArgumentError as error:
+            errors.append("indices {}: {}".format(name, error))
+    for index, state in enumerate(config.initialState):
+        where = "initialState[{}] {}".format(index, state.name)
+        errors += _validateState(where, state)
+        errors += _indexErrors(where, state, config.indices)
+    for index, scheduled in enumerate(config.scheduledValues):
+        where = "scheduledStateUpdates[{}] {}".format(index, scheduled.state.name)
+        errors += _validateState(where, scheduled.state)
+        errors += _indexErrors(where, scheduled.state, config.indices)
+        for field in ["startDate", "endDate"]:
+            if not isinstance(getattr(scheduled, field), date):
+                errors.append("{}: {} must be a date".format(where, field))
+    return errors
+
+
+def compileConfig(
+    config: ScenarioConfig, timeline: Optional[Timeline] = None
+) -> ExecutionPlan:
+    """
+    Validates `config` up front, so a bad profile fails here rather than when the run
+    reaches it, and compiles it into an ExecutionPlan. Pass `timeline` to reuse one
+    compiled for a config with the same time settings and accrual models.
+    """
+    errors = validateConfig(config)
+    if errors:
+        raise RuntimeError("invalid configuration:\n  " + "\n  ".join(errors))
+    if timeline is None:
+        metrics.increment(
+            "finance_sim_precomputed_lookups_total", table="timeline", outcome="built"
+        )
+        timeline = _buildTimeline(config)
+    else:
+        metrics.increment(
+            "finance_sim_precomputed_lookups_total", table="timeline", outcome="reused"
+        )
+
+    slots: dict[str, int] = {}
+
+    def spec(state: StateConfig) -> ProfileSpec:
+        slot = slots.setdefault(state.name, len(slots))
+        constructor = abstractEventProfileType[state.type]
+        data = deepcopy(_resolveIndex(state.data, config.indices))
+        return ProfileSpec(constructor, state.name, data, slot)
+
+    initialProfiles = tuple(spec(state) for state in config.initialState)
+    changes: dict[int, list[ScheduledChange]] = {}
+    for scheduled in config.scheduledValues:
+        profile = spec(scheduled.state)
+        startStep = bisect_left(timeline.ordinals, scheduled.startDate.toordinal())
+        endStep = bisect_left(timeline.ordinals, scheduled.endDate.toordinal())
+        if startStep >= min(endStep, len(timeline)):
+            continue
+        changes.setdefault(startStep, []).append(ScheduledChange(profile, True))
+        if endStep < len(timeline):
+            changes.setdefault(endStep, []).append(ScheduledChange(profile, False))
+
+    return ExecutionPlan(
+        startingDate=config.time.startingDate,
+        timeline=timeline,
+        initialProfiles=initialProfiles,
+        changes=MappingProxyType({step: tuple(c) for step, c in changes.items()}),
+        slots=tuple(slots),
+    )
@@ -0,0 +1,103 @@
+import inspect
+import threading
+
+from collections.abc import MutableMapping
+from importlib.metadata import EntryPoint, entry_points
+from typing import Iterator, Optional, Type
+
+
+class ProfileRegistry(MutableMapping):
+    """
+    Maps the `type` strings used in configs to event profile classes. Types registered
+    in code are available right away. Types that installed packages advertise under the
+    registry's entry point group are discovered on the first lookup of an unknown type,
+    and each is only imported the first time a config asks for it. Discovery, loading
+    and registration hold a lock, so runs on several threads can look types up while
+    plugins load.
+    """
+
+    def __init__(self, baseClass: type, group: str):
+        self.baseClass = baseClass
+        self.group = group
+        self._types: dict[str, type] = {}
+        self._entryPoints: Optional[dict[str, EntryPoint]] = None
+        self._lock = threading.RLock()
+
+    def _plugins(self) -> dict[str, EntryPoint]:
+        entryPoints = self._entryPoints
+        if entryPoints is None:
+            with self._lock:
+                if self._entryPoints is None:
+                    self._entryPoints = {
+                        entryPoint.name: entryPoint
+                        for entryPoint in entry_points(group=self.group)
+                    }
+                entryPoints = self._entryPoints
+        return entryPoints
+
+    def validate(self, name: str, profileType: type) -> None:
+        """
+        Checks that `profileType` can stand in for a built-in profile: it derives from the
+        base class, implements every abstract method, and `__init__(config, name)`,
+        `transform(history, date, delta)` and `copy()` accept the engine's arguments.
+        """
+        if not inspect.isclass(profileType) or not issubclass(profileType, self.baseClass):
+            raise RuntimeError(
+                "{} must be a subclass of {}".format(name, self.baseClass.__name__)
+            )
+        if inspect.isabstract(profileType):
+            raise RuntimeError(
+                "{} does not implement {}".format(
+                    name, ", ".join(sorted(profileType.__abstractmethods__))
+                )
+            )
+        contracts = [
+            ("__init__", (None, name)),
+            ("transform", (None, None, None)),
+            ("copy", ()),
+        ]
+        for method, arguments in contracts:
+            try:
+                inspect.signature(getattr(profileType, method)).bind(None, *arguments)
+            except TypeError as error:
+                raise RuntimeError("{}.{}: {}".format(name, method, error)) from error
+
+    def __getitem__(self, name: str) -> Type:
+        profileType = self._types.get(name)
+        if profileType is not None:
+            return profileType
+        entryPoint = self._plugins().get(name)
+        if entryPoint is None:
+            raise KeyError(name)
+        with self._lock:
+            if name not in self._types:
+                profileType = entryPoint.load()
+                self.validate(name, profileType)
+                self._types[name] = profileType
+            return self._types[name]
+
+    def __setitem__(self, name: str, profileType: type) -> None:
+        self.validate(name, profileType)
+        with self._lock:
+            self._types[name] = profileType
+
+    def __delitem__(self, name: str) -> None:
+        with self._lock:
+            del self._types[name]
+
+    def __contains__(self, name) -> bool:
+        return name in self._types or name in self._plugins()
+
+    def __iter__(self) -> Iterator[str]:
+        types = dict(self._types)
+        yield from types
+        yield from (name for name in self._plugins() if name not in types)
+
+    def __len__(self) -> int:
+        return len(self._types.keys() | self._plugins().keys())
+
+    def loaded(self) -> dict[str, type]:
+        """
+        The types available without importing anything further.
+        """
+        return dict(self._types)
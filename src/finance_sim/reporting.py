@@ -1,6 +1,12 @@
-from typing import Any, Tuple
+from __future__ import annotations
 
-from calendar import monthrange
+from copy import copy
+from ctypes import ArgumentError
+from math import nan
+from typing import Any, Callable, Iterable, Mapping, Optional, Tuple, Union
+
+import numpy as np
+from dataclasses import dataclass
 from datetime import date
 from dateutil.relativedelta import relativedelta
 from pandas import DataFrame
@@ -10,71 +16,96 @@ from .events import (
     EventProfileGroup,
     AbstractEventProfile,
     FinanceHistory,
-    abstractEventProfileType,
+    InPlaceFinanceHistory,
+    InsolvencyPolicy,
+    SparseFinanceHistory,
+    netWorth,
 )
-from .scheduling import AccrualModel
+from . import metrics
+from .ledger import Ledger
+from .plan import ExecutionPlan, ScheduledChange, _profileAccrualModels, compileConfig
+from .scheduling import Timeline
+from .util import parseGranularity
 
 
-def _assembleInitialState(config: ScenarioConfig) -> EventProfileGroup:
+def _assembleInitialState(
+    plan: ExecutionPlan,
+    insolvencyPolicy: InsolvencyPolicy = InsolvencyPolicy.Raise,
+    ledger: Optional[Ledger] = None,
+) -> EventProfileGroup:
     events: dict[str, AbstractEventProfile] = {}
-    for stateConfig in config.initialState:
-        if stateConfig.type in abstractEventProfileType:
-            events[stateConfig.name] = abstractEventProfileType[stateConfig.type](
-                stateConfig.data, stateConfig.name
-            )
-        else:
-            raise RuntimeError("{} is not a valid event type".format(stateConfig.type))
-    return EventProfileGroup(config.time.startingDate, events)
+    for profile in plan.initialProfiles:
+        events[profile.name] = profile.instantiate()
+    return EventProfileGroup(plan.startingDate, events, insolvencyPolicy, ledger)
 
 
-def _nextDate(eventDate: date, accrualModel: AccrualModel) -> Tuple[date, relativedelta]:
-    if accrualModel == AccrualModel.PeriodicMonthly:
-        delta = relativedelta(months=1)
-        return eventDate + delta, delta
-    elif accrualModel == AccrualModel.PeriodicSemiMonthly:
-        if eventDate.day == 15:
-            delta = relativedelta(days=monthrange(eventDate.year, eventDate.month)[1] - 15)
-        else:
-            delta = relativedelta(days=15)
-        return eventDate + delta, delta
-    elif accrualModel == AccrualModel.PeriodicWeekly:
-        delta = relativedelta(days=7)
-        return eventDate + delta, delta
-    elif accrualModel == AccrualModel.PeriodicBiweekly:
-        delta = relativedelta(days=14)
-        return eventDate + delta, delta
-    elif accrualModel == AccrualModel.PeriodicYearly:
-        delta = relativedelta(years=1)
-        return eventDate + delta, delta
-    return date(2000, 1, 1), relativedelta(months=0)
-
-
-def _synchronizeUpdates(config: ScenarioConfig, eventDate: date, history: FinanceHistory):
-    for scheduledEvent in config.scheduledValues:
-        if eventDate >= scheduledEvent.startDate:
-            if eventDate < scheduledEvent.endDate and not scheduledEvent.active:
-                scheduledState = scheduledEvent.state
-                if scheduledState.type in abstractEventProfileType:
-                    pendingEvents = history.pendingEvents
-                    pendingEvents.events[scheduledState.name] = abstractEventProfileType[
-                        scheduledState.type
-                    ](scheduledState.data, scheduledState.name)
-                    scheduledEvent.active = True
-            elif eventDate >= scheduledEvent.endDate and scheduledEvent.active:
-                scheduledState = scheduledEvent.state
-                pendingEvents = history.pendingEvents
-                del pendingEvents.events[scheduledState.name]  # todo: see below todo
-                scheduledEvent.active = False
-
-
-def _simulate(config: ScenarioConfig, history: FinanceHistory):
-    accrualModel = config.time.accrualModel
-    eventDate, delta = _nextDate(config.time.startingDate, accrualModel)
-    while eventDate < (config.time.startingDate + relativedelta(years=config.time.period)):
-        history._startPendingEventProfile(eventDate)
-        _synchronizeUpdates(config, eventDate, history)
-        history._processAndPushPending(eventDate, delta)
-        eventDate, delta = _nextDate(eventDate, accrualModel)
+def _applyScheduledChanges(
+    changes: Tuple[ScheduledChange, ...],
+    pendingEvents: EventProfileGroup,
+    timeline: Timeline,
+    step: int,
+):
+    for change in changes:
+        name = change.profile.name
+        if change.activate:
+            event = change.profile.instantiate()
+            event.prepare(timeline, step)
+            pendingEvents.setEvent(name, event)
+        elif name in pendingEvents.events:
+            pendingEvents.removeEvent(name)
+
+
+def _simulate(
+    plan: ExecutionPlan,
+    history: FinanceHistory,
+    start: int = 0,
+    stop: Optional[int] = None,
+    observer: Optional[Callable[[EventProfileGroup], bool]] = None,
+) -> Optional[int]:
+    """
+    Simulates steps [`start`, `stop`) until `observer` returns False or, under
+    InsolvencyPolicy.Stop, cash runs out. Returns the halting step, or None.
+    """
+    timeline = plan.timeline
+    if stop is None:
+        stop = len(timeline)
+    if start == 0:
+        for event in history.latestEvents().events.values():
+            event.prepare(timeline, 0)
+    ledger = history.latestEvents().ledger
+    if ledger is not None:
+        ledger.timeline = timeline
+    sink = metrics.currentSink()
+    stats = metrics.RunStats() if sink is not None else None
+    try:
+        for step in range(start, stop):
+            eventDate = date.fromordinal(timeline.ordinals[step])
+            if ledger is not None:
+                ledger.step = step
+            history._startPendingEventProfile(eventDate)
+            changes = plan.changes.get(step)
+            if changes is not None:
+                _applyScheduledChanges(changes, history.pendingEvents, timeline, step)
+                if stats is not None:
+                    stats.activations += sum(change.activate for change in changes)
+            history._processAndPushDue(eventDate, timeline.due[step])
+            pendingEvents = history.pendingEvents
+            if stats is not None:
+                stats.steps += 1
+                stats.profiles += len(pendingEvents.events)
+            insolvent = pendingEvents.shortfall > 0
+            if insolvent and history.insolvencyDate is None:
+                history.insolvencyDate = eventDate
+                if stats is not None:
+                    stats.insolvencies += 1
+            if observer is not None and not observer(pendingEvents):
+                return step
+            if insolvent and pendingEvents.insolvencyPolicy == InsolvencyPolicy.Stop:
+                return step
+        return None
+    finally:
+        if stats is not None:
+            stats.record(sink)
 
 
 def _stateToRow(state: EventProfileGroup) -> list:
@@ -83,11 +114,368 @@ def _stateToRow(state: EventProfileGroup) -> list:
     return result
 
 
-def report(config: ScenarioConfig) -> DataFrame:
-    initialEvents = _assembleInitialState(config)
-    history = FinanceHistory(initialEvents)
-    _simulate(config, history)
-    return DataFrame([_stateToRow(d) for d in history.data])
+@dataclass(frozen=True)
+class Aggregate(object):
+    """
+    A report column: `attribute` of `profile` (net worth if None) reduced per period by
+    `how`, one of first, last, sum, mean, min, max or change.
+    """
+
+    profile: Optional[str] = None
+    attribute: str = "value"
+    how: str = "last"
+
+
+_aggregations = {"first", "last", "sum", "mean", "min", "max", "change"}
+
+
+def _aggregateValue(aggregate: Aggregate, events: EventProfileGroup) -> float:
+    if aggregate.profile is None:
+        return netWorth(events)
+    event = events.events.get(aggregate.profile)
+    if event is None:
+        return nan
+    value = getattr(event, aggregate.attribute)
+    return value() if callable(value) else value
+
+
+class _Accumulator(object):
+    how: str
+    previous: float
+
+    def __init__(self, how: str, initial: float):
+        self.how = how
+        self.previous = 0.0 if initial != initial else initial
+        self._reset()
+
+    def _reset(self):
+        self.first = nan
+        self.last = nan
+        self.total = 0.0
+        self.count = 0
+        self.least = nan
+        self.most = nan
+
+    def add(self, value: float):
+        if self.count == 0 and self.first != self.first:
+            self.first = value
+        self.last = value
+        if value == value:
+            self.total += value
+            self.least = value if self.count == 0 else min(self.least, value)
+            self.most = value if self.count == 0 else max(self.most, value)
+            self.count += 1
+
+    def flush(self) -> float:
+        how = self.how
+        if how == "first":
+            result = self.first
+        elif how == "last":
+            result = self.last
+        elif how == "sum":
+            result = self.total
+        elif how == "mean":
+            result = self.total / self.count if self.count else nan
+        elif how == "min":
+            result = self.least
+        elif how == "max":
+            result = self.most
+        else:
+            last = 0.0 if self.last != self.last else self.last
+            result = last - self.previous
+            self.previous = last
+        self._reset()
+        return result
+
+
+class _PeriodAggregator(object):
+    """
+    Observes a run and keeps only one reduced row per report period.
+    """
+
+    def __init__(
+        self,
+        aggregates: Mapping[str, Aggregate],
+        startingDate: date,
+        frequency: Optional[relativedelta],
+        initial: EventProfileGroup,
+    ):
+        for name, aggregate in aggregates.items():
+            if aggregate.how not in _aggregations:
+                raise ArgumentError(
+                    "{}: unknown aggregation {!r}".format(name, aggregate.how)
+                )
+        self.aggregates = list(aggregates.values())
+        self.accumulators = [
+            _Accumulator(aggregate.how, _aggregateValue(aggregate, initial))
+            for aggregate in self.aggregates
+        ]
+        self.startingDate = startingDate
+        self.frequency = frequency
+        self.periods = 1
+        self.boundary = startingDate + frequency if frequency is not None else startingDate
+        self.steps = 0
+        self.rows: list[list[Any]] = []
+
+    def __call__(self, events: EventProfileGroup) -> bool:
+        if self.frequency is None:
+            self.boundary = events.date
+        while events.date > self.boundary:
+            self.flush()
+        for aggregate, accumulator in zip(self.aggregates, self.accumulators):
+            accumulator.add(_aggregateValue(aggregate, events))
+        self.steps += 1
+        if self.frequency is None:
+            self.flush()
+        return True
+
+    def flush(self):
+        if self.steps > 0:
+            row: list[Any] = [self.boundary]
+            row.extend(accumulator.flush() for accumulator in self.accumulators)
+            self.rows.append(row)
+            self.steps = 0
+        if self.frequency is not None:
+            self.periods += 1
+            self.boundary = self.startingDate + self.frequency * self.periods
+
+    def fork(self) -> _PeriodAggregator:
+        """
+        An independent copy to continue a run that branches off this one.
+        """
+        result = copy(self)
+        result.accumulators = [copy(accumulator) for accumulator in self.accumulators]
+        result.rows = list(self.rows)
+        return result
+
+
+def report(
+    config: ScenarioConfig,
+    insolvency: InsolvencyPolicy = InsolvencyPolicy.Raise,
+    frequency: Optional[Union[relativedelta, str]] = None,
+    aggregates: Optional[Mapping[str, Aggregate]] = None,
+    ledger: Optional[Ledger] = None,
+) -> DataFrame:
+    """
+    One row per step, or per period of `frequency` with columns for `aggregates`. Cash
+    movements are recorded in `ledger`, if given.
+    """
+    with metrics.timer("finance_sim_report_seconds", kind="report"):
+        return _report(config, insolvency, frequency, aggregates, ledger)
+
+
+def _report(
+    config: ScenarioConfig,
+    insolvency: InsolvencyPolicy,
+    frequency: Optional[Union[relativedelta, str]],
+    aggregates: Optional[Mapping[str, Aggregate]],
+    ledger: Optional[Ledger],
+) -> DataFrame:
+    plan = compileConfig(config)
+    initial = _assembleInitialState(plan, insolvency, ledger)
+    if frequency is None:
+        if aggregates is not None:
+            raise ArgumentError("aggregates need a report frequency")
+        history: FinanceHistory = SparseFinanceHistory(initial)
+        _simulate(plan, history)
+        result = DataFrame([_stateToRow(d) for d in history.data])
+    else:
+        if isinstance(frequency, str):
+            frequency = parseGranularity(frequency)
+        if aggregates is None:
+            aggregates = {"netWorth": Aggregate()}
+        aggregator = _PeriodAggregator(aggregates, plan.startingDate, frequency, initial)
+        history = InPlaceFinanceHistory(initial)
+        _simulate(plan, history, observer=aggregator)
+        aggregator.flush()
+        result = DataFrame(aggregator.rows, columns=["date", *aggregates])
+    result.attrs["insolvencyDate"] = history.insolvencyDate
+    return result
+
+
+def _divergence(a: ExecutionPlan, b: ExecutionPlan) -> int:
+    """
+    The first step the runs of `a` and `b` can differ on.
+    """
+    if a.timeline is not b.timeline or a.initialProfiles != b.initialProfiles:
+        return 0
+    for step in sorted(set(a.changes) | set(b.changes)):
+        if a.changes.get(step) != b.changes.get(step):
+            return step
+    return len(a.timeline)
+
+
+def _partition(members: list[int], same: Callable[[int, int], bool]) -> list[list[int]]:
+    groups: list[list[int]] = []
+    for member in members:
+        for group in groups:
+            if same(group[0], member):
+                group.append(member)
+                break
+        else:
+            groups.append([member])
+    return groups
+
+
+def compare(
+    configs: Mapping[str, ScenarioConfig],
+    insolvency: InsolvencyPolicy = InsolvencyPolicy.Raise,
+    frequency: Optional[Union[relativedelta, str]] = None,
+    aggregates: Optional[Mapping[str, Aggregate]] = None,
+) -> DataFrame:
+    """
+    Runs `configs` side by side, with deltas from the first; shared prefixes of the
+    scenarios are simulated once.
+    """
+    with metrics.timer("finance_sim_report_seconds", kind="compare"):
+        return _compare(configs, insolvency, frequency, aggregates)
+
+
+def _compare(
+    configs: Mapping[str, ScenarioConfig],
+    insolvency: InsolvencyPolicy,
+    frequency: Optional[Union[relativedelta, str]],
+    aggregates: Optional[Mapping[str, Aggregate]],
+) -> DataFrame:
+    names = list(configs)
+    if not names:
+        raise ArgumentError("compare needs at least one scenario")
+    if isinstance(frequency, str):
+        frequency = parseGranularity(frequency)
+    if aggregates is None:
+        aggregates = {"netWorth": Aggregate()}
+
+    baseConfig = configs[names[0]]
+    basePlan = compileConfig(baseConfig)
+    plans: list[ExecutionPlan] = []
+    for name in names:
+        config = configs[name]
+        sameTimeline = config.time == baseConfig.time and _profileAccrualModels(
+            config
+        ) == _profileAccrualModels(baseConfig)
+        plans.append(compileConfig(config, basePlan.timeline if sameTimeline else None))
+    for plan in plans:
+        if plan.startingDate != basePlan.startingDate or (
+            frequency is None and plan.timeline.ordinals != basePlan.timeline.ordinals
+        ):
+            raise ArgumentError("scenarios compared by step must share their timeline")
+
+    leaves: dict[int, Tuple[_PeriodAggregator, Optional[date]]] = {}
+    simulatedSteps = 0
+    pending = []
+    for group in _partition(
+        list(range(len(plans))), lambda a, b: _divergence(plans[a], plans[b]) > 0
+    ):
+        initial = _assembleInitialState(plans[group[0]], insolvency)
+        aggregator = _PeriodAggregator(
+            aggregates, basePlan.startingDate, frequency, initial
+        )
+        pending.append((group, InPlaceFinanceHistory(initial), aggregator, 0))
+    while pending:
+        group, history, aggregator, start = pending.pop()
+        lead = plans[group[0]]
+        end = min(
+            (_divergence(lead, plans[member]) for member in group[1:]),
+            default=len(lead.timeline),
+        )
+        haltedOn = _simulate(lead, history, start, end, observer=aggregator)
+        simulatedSteps += (end if haltedOn is None else haltedOn + 1) - start
+        if haltedOn is not None or end == len(lead.timeline):
+            aggregator.flush()
+            for member in group:
+                leaves[member] = (aggregator, history.insolvencyDate)
+            continue
+        for branch in _partition(
+            group, lambda a, b: plans[a].changes.get(end) == plans[b].changes.get(end)
+        ):
+            branchHistory = InPlaceFinanceHistory(history.latestEvents().copy())
+            branchHistory.insolvencyDate = history.insolvencyDate
+            pending.append((branch, branchHistory, aggregator.fork(), end))
+
+    width = len(aggregates)
+    # periods without steps are left out of a run's rows, so runs on different
+    # timelines are lined up by period date, with NaN where a run has no row
+    dates = sorted({row[0] for aggregator, _ in leaves.values() for row in aggregator.rows})
+    positions = {rowDate: position for position, rowDate in enumerate(dates)}
+    values = np.full((len(dates), width * len(names)), nan)
+    for member, (aggregator, _) in leaves.items():
+        for row in aggregator.rows:
+            values[positions[row[0]], member * width : (member + 1) * width] = row[1:]
+    baseline = values[:, :width]
+    deltas = values[:, width:] - np.tile(baseline, len(names) - 1)
+    columns = [
+        "{}.{}".format(name, aggregate) for name in names for aggregate in aggregates
+    ]
+    result = DataFrame(
+        np.hstack([values, deltas]),
+        columns=columns + ["{}.delta".format(column) for column in columns[width:]],
+    )
+    result.insert(0, "date", dates)
+    result.attrs["simulatedSteps"] = simulatedSteps
+    result.attrs["insolvencyDates"] = {
+        name: leaves[member][1] for member, name in enumerate(names)
+    }
+    return result
+
+
+def _simulateFinal(plan: ExecutionPlan, insolvency: InsolvencyPolicy) -> FinanceHistory:
+    history = InPlaceFinanceHistory(_assembleInitialState(plan, insolvency))
+    _simulate(plan, history)
+    return history
+
+
+@dataclass
+class FinalState(object):
+    date: date
+    netWorth: float
+    values: dict[str, float]
+    events: EventProfileGroup
+    insolvencyDate: Optional[date]
+
+
+def simulateFinal(
+    config: Union[ScenarioConfig, ExecutionPlan],
+    insolvency: InsolvencyPolicy = InsolvencyPolicy.Raise,
+) -> FinalState:
+    """
+    Runs a scenario (or compiled plan) to its end in place, keeping only the final state.
+    """
+    plan = config if isinstance(config, ExecutionPlan) else compileConfig(config)
+    history = _simulateFinal(plan, insolvency)
+    events = history.latestEvents()
+    values = {name: event.netWorth() for name, event in events.events.items()}
+    return FinalState(
+        events.date, sum(values.values()), values, events, history.insolvencyDate
+    )
+
+
+@dataclass
+class BatchResult(object):
+    finalEvents: list[EventProfileGroup]
+    insolvent: np.ndarray
+    insolvencyDates: list[Optional[date]]
+
+
+def simulateBatch(
+    configs: Iterable[ScenarioConfig],
+    insolvency: InsolvencyPolicy = InsolvencyPolicy.Raise,
+) -> BatchResult:
+    """
+    Runs each config to its end, masking the ones that ran out of cash in `insolvent`.
+    Under InsolvencyPolicy.Raise a variant that runs out stops there instead of
+    aborting the batch.
+    """
+    plans = [compileConfig(config) for config in configs]
+    if insolvency == InsolvencyPolicy.Raise:
+        insolvency = InsolvencyPolicy.Stop
+    finalEvents: list[EventProfileGroup] = []
+    insolvencyDates: list[Optional[date]] = []
+    for plan in plans:
+        history = _simulateFinal(plan, insolvency)
+        finalEvents.append(history.latestEvents())
+        insolvencyDates.append(history.insolvencyDate)
+    insolvent = np.array([d is not None for d in insolvencyDates], dtype=bool)
+    return BatchResult(finalEvents, insolvent, insolvencyDates)
 
 
 if __name__ == "__main__":
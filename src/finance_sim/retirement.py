@@ -0,0 +1,377 @@
+from __future__ import annotations
+
+from ctypes import ArgumentError
+from dataclasses import dataclass
+from datetime import date
+from dateutil.relativedelta import relativedelta
+from math import inf
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .events import (
+    EventConfigType,
+    FinanceHistory,
+    PreparedProfile,
+    abstractEventProfileType,
+    addToCash,
+)
+from . import schema
+from .schema import ConfigField
+from .scheduling import AccrualModel, Timeline, cadenceKey, portionsOfYear
+from .util import parseAccrualModel, parseIndex
+
+# the IRS Uniform Lifetime Table (2022) from age 73, the last divisor applying from 120
+uniformLifetimeDivisors: Tuple[float, ...] = (
+    26.5, 25.5, 24.6, 23.7, 22.9, 22.0, 21.1, 20.2, 19.4, 18.5,
+    17.7, 16.8, 16.0, 15.2, 14.4, 13.7, 12.9, 12.2, 11.5, 10.8,
+    10.1, 9.5, 8.9, 8.4, 7.8, 7.3, 6.8, 6.4, 6.0, 5.6,
+    5.2, 4.9, 4.6, 4.3, 4.1, 3.9, 3.7, 3.5, 3.4, 3.3,
+    3.1, 3.0, 2.9, 2.8, 2.7, 2.5, 2.3, 2.0,
+)  # fmt: skip
+
+retirementYearRecord = np.dtype(
+    [
+        ("year", np.int32),
+        ("contributionLimit", np.float64),
+        ("matchRate", np.float64),
+        ("matchLimit", np.float64),
+        ("rmdDivisor", np.float64),
+    ]
+)
+retirementStepRecord = np.dtype(
+    [
+        ("year", np.int32),
+        ("portion", np.float64),
+        ("growth", np.float64),
+        ("contribution", np.float64),
+    ]
+)
+accountTotalsRecord = np.dtype(
+    [
+        ("value", np.float64),
+        ("contributed", np.float64),
+        ("matched", np.float64),
+        ("distributed", np.float64),
+    ]
+)
+
+Amount = Union[float, np.ndarray]
+
+
+@dataclass(frozen=True)
+class RetirementTables(object):
+    """
+    The precomputed rules of a retirement account over a run: `years` holds one row of
+    limits per calendar year, and `steps` one row per step the account is due, with
+    the row of `years` it falls in, its portion of the year, its growth factor and the
+    contribution the owner asks for.
+    """
+
+    years: np.ndarray
+    steps: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+
+def cappedContributions(requested: Amount, contributed: Amount, limit: Amount) -> Amount:
+    """
+    The part of `requested` that fits under a yearly `limit` with `contributed`
+    already contributed this year.
+    """
+    return np.minimum(requested, np.maximum(limit - contributed, 0))
+
+
+def employerMatches(
+    contributions: Amount, rate: Amount, matched: Amount, limit: Amount
+) -> Amount:
+    return np.minimum(contributions * rate, np.maximum(limit - matched, 0))
+
+
+def requiredDistributions(
+    yearStartValues: Amount, divisor: float, portion: float, distributed: Amount
+) -> Amount:
+    """
+    The required minimum distribution of a step: the year's requirement (the balance
+    at the start of the year over `divisor`) spread over the year by `portion`, and
+    never more than what is left of it. A divisor of 0 means nothing is required.
+    """
+    if divisor <= 0:
+        return np.zeros_like(yearStartValues)
+    required = yearStartValues / divisor
+    return np.minimum(required * portion, np.maximum(required - distributed, 0))
+
+
+def advanceAccounts(
+    step: np.void,
+    limits: np.void,
+    values: Amount,
+    yearStartValues: Amount,
+    contributed: Amount,
+    matched: Amount,
+    distributed: Amount,
+    growth: Optional[Amount] = None,
+) -> Tuple[Amount, Amount, Amount, Amount]:
+    """
+    Applies one row of RetirementTables.steps to an account, or to an array of them
+    in a batched engine, given their values and what was contributed, matched and
+    distributed so far this year. `growth` replaces the row's growth factor, e.g. with
+    one drawn per path. Returns the new values and the step's contributions, employer
+    matches and distributions.
+    """
+    values = values * (step["growth"] if growth is None else growth)
+    contributions = cappedContributions(
+        step["contribution"], contributed, limits["contributionLimit"]
+    )
+    matches = employerMatches(
+        contributions, limits["matchRate"], matched, limits["matchLimit"]
+    )
+    values = values + contributions + matches
+    distributions = np.minimum(
+        requiredDistributions(
+            yearStartValues, limits["rmdDivisor"], step["portion"], distributed
+        ),
+        values,
+    )
+    return values - distributions, contributions, matches, distributions
+
+
+def simulateAccounts(
+    tables: RetirementTables,
+    initialValues: Sequence[float],
+    growth: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Runs a batch of accounts with the same rules through every step of `tables` at
+    once, e.g. one per Monte Carlo path. `growth`, shaped (accounts, steps), replaces
+    the tables' growth factors. Returns each account's final value and its totals
+    contributed, matched and distributed.
+    """
+    values = np.array(initialValues, dtype=float)
+    if growth is not None and growth.shape != (len(values), len(tables.steps)):
+        raise ArgumentError("growth must have one row per account and column per step")
+    result = np.zeros(len(values), dtype=accountTotalsRecord)
+    yearStart = values.copy()
+    contributed = matched = distributed = np.zeros_like(values)
+    slot = -1
+    for position, step in enumerate(tables.steps):
+        if step["year"] != slot:
+            slot = int(step["year"])
+            yearStart = values
+            contributed = matched = distributed = np.zeros_like(values)
+        values, contributions, matches, distributions = advanceAccounts(
+            step,
+            tables.years[slot],
+            values,
+            yearStart,
+            contributed,
+            matched,
+            distributed,
+            None if growth is None else growth[:, position],
+        )
+        contributed = contributed + contributions
+        matched = matched + matches
+        distributed = distributed + distributions
+        result["contributed"] += contributions
+        result["matched"] += matches
+        result["distributed"] += distributions
+    result["value"] = values
+    return result
+
+
+class RetirementAccount(PreparedProfile):
+    """
+    A tax-deferred account such as a 401(k), taking prorated contributions from cash up
+    to an indexed yearly limit, with an employer match, and paying required minimum
+    distributions back to cash from `rmdAge`. Each transform applies the prepared
+    RetirementTables with the same rules as the batched advanceAccounts.
+    """
+
+    accrualModel: AccrualModel
+    value: float
+    annualReturn: float
+    contribution: float
+    contributionLimit: float
+    employerMatch: float
+    employerMatchLimit: float
+    index: Tuple[float, ...]
+    birthYear: Optional[int]
+    rmdAge: int
+    rmdDivisors: Tuple[float, ...]
+    yearStartValue: float
+    contributedThisYear: float
+    matchedThisYear: float
+    distributedThisYear: float
+    tables: RetirementTables
+    yearSlot: int
+    shared = ("tables",)
+
+    configSchema = {
+        "accrualModel": ConfigField(schema.accrualModel),
+        "initialValue": ConfigField(schema.number),
+        "annualReturn": ConfigField(schema.number),
+        "contribution": ConfigField(schema.number),
+        "contributionLimit": ConfigField(schema.number),
+        "employerMatch": ConfigField(schema.number, required=False),
+        "employerMatchLimit": ConfigField(schema.number, required=False),
+        "index": ConfigField(schema.index, required=False),
+        "birthYear": ConfigField(schema.integer, required=False),
+        "rmdAge": ConfigField(schema.integer, required=False),
+        "rmdDivisors": ConfigField(schema.numberList, required=False),
+    }
+
+    def __init__(
+        self,
+        config: EventConfigType,
+        name: str,
+        accrualModel: AccrualModel = AccrualModel.PeriodicMonthly,
+        initialValue: float = 0,
+        annualReturn: float = 0,
+        contribution: float = 0,
+        contributionLimit: float = inf,
+        employerMatch: float = 0,
+        employerMatchLimit: float = inf,
+        index: Tuple[float, ...] = (0.0,),
+        birthYear: Optional[int] = None,
+        rmdAge: int = 73,
+        rmdDivisors: Sequence[float] = uniformLifetimeDivisors,
+    ):
+        if config is not None:
+            accrualModel = parseAccrualModel(config["accrualModel"])
+            initialValue = config["initialValue"]
+            annualReturn = config["annualReturn"]
+            contribution = config["contribution"]
+            contributionLimit = config["contributionLimit"]
+            employerMatch = config.get("employerMatch", 0)
+            employerMatchLimit = config.get("employerMatchLimit", inf)
+            index = parseIndex(config.get("index", {"annualRate": 0}))
+            birthYear = config.get("birthYear")
+            rmdAge = config.get("rmdAge", 73)
+            rmdDivisors = config.get("rmdDivisors", uniformLifetimeDivisors)
+        if any(divisor <= 0 for divisor in rmdDivisors) or len(rmdDivisors) < 1:
+            raise ArgumentError("rmdDivisors must be a non-empty list of positive numbers")
+        self.name = name
+        self.accrualModel = accrualModel
+        self.value = initialValue
+        self.annualReturn = annualReturn
+        self.contribution = contribution
+        self.contributionLimit = contributionLimit
+        self.employerMatch = employerMatch
+        self.employerMatchLimit = employerMatchLimit
+        self.index = tuple(index)
+        self.birthYear = birthYear
+        self.rmdAge = rmdAge
+        self.rmdDivisors = tuple(rmdDivisors)
+        self.yearStartValue = initialValue
+        self.contributedThisYear = 0
+        self.matchedThisYear = 0
+        self.distributedThisYear = 0
+        self.tables = RetirementTables(
+            np.zeros(0, dtype=retirementYearRecord),
+            np.zeros(0, dtype=retirementStepRecord),
+        )
+        self.yearSlot = -1
+        self.step = 0
+
+    def retirementTables(self, timeline: Timeline, step: int) -> RetirementTables:
+        """
+        The account's rules on every step it is due from `step` onward.
+        """
+        key = cadenceKey(self.accrualModel)
+        starts, ends = timeline.spans(key, step)
+        dueSteps = timeline.dueSteps(key, step)
+        portions = portionsOfYear(starts, ends, self.accrualModel)
+        calendarYears = np.array(
+            [date.fromordinal(int(end)).year for end in ends], dtype=np.int64
+        )
+        years, firsts, slots = np.unique(
+            calendarYears, return_index=True, return_inverse=True
+        )
+        levels = timeline.indexCurve(self.index)[dueSteps[firsts]]
+
+        yearTable = np.zeros(len(years), dtype=retirementYearRecord)
+        yearTable["year"] = years
+        yearTable["contributionLimit"] = self.contributionLimit * levels
+        yearTable["matchRate"] = self.employerMatch
+        yearTable["matchLimit"] = self.employerMatchLimit * levels
+        if self.birthYear is not None:
+            divisors = np.asarray(self.rmdDivisors)
+            ages = years - self.birthYear - self.rmdAge
+            yearTable["rmdDivisor"] = np.where(
+                ages >= 0, divisors[np.clip(ages, 0, len(divisors) - 1)], 0
+            )
+
+        stepTable = np.zeros(len(portions), dtype=retirementStepRecord)
+        stepTable["year"] = slots
+        stepTable["portion"] = portions
+        stepTable["growth"] = np.power(1 + self.annualReturn, portions)
+        stepTable["contribution"] = self.contribution * portions
+        yearTable.flags.writeable = False
+        stepTable.flags.writeable = False
+        return RetirementTables(yearTable, stepTable)
+
+    def _precompute(self, timeline: Timeline, step: int):
+        self.tables = self.retirementTables(timeline, step)
+        self.yearSlot = -1
+
+    def transform(self, history: FinanceHistory, date: date, period: relativedelta):
+        step = self.tables.steps[self._nextStep()]
+        if step["year"] != self.yearSlot:
+            self.yearSlot = int(step["year"])
+            self.yearStartValue = self.value
+            self.contributedThisYear = 0
+            self.matchedThisYear = 0
+            self.distributedThisYear = 0
+        value, contribution, match, distribution = advanceAccounts(
+            step,
+            self.tables.years[self.yearSlot],
+            self.value,
+            self.yearStartValue,
+            self.contributedThisYear,
+            self.matchedThisYear,
+            self.distributedThisYear,
+        )
+        self.value = float(value)
+        self.contributedThisYear += float(contribution)
+        self.matchedThisYear += float(match)
+        self.distributedThisYear += float(distribution)
+
+        events = history.pendingEvents
+        difference = float(distribution - contribution)
+        addToCash(events, difference, source=self.name)
+        taxPayment = events.cashWaterfall().taxPayment
+        if difference < 0 and taxPayment:
+            taxPayment.taxableIncome += difference
+
+    def copy(self) -> RetirementAccount:
+        result = RetirementAccount(
+            None,
+            self.name,
+            self.accrualModel,
+            self.value,
+            self.annualReturn,
+            self.contribution,
+            self.contributionLimit,
+            self.employerMatch,
+            self.employerMatchLimit,
+            self.index,
+            self.birthYear,
+            self.rmdAge,
+            self.rmdDivisors,
+        )
+        result.yearStartValue = self.yearStartValue
+        result.contributedThisYear = self.contributedThisYear
+        result.matchedThisYear = self.matchedThisYear
+        result.distributedThisYear = self.distributedThisYear
+        result.yearSlot = self.yearSlot
+        return self._shareWith(result)
+
+    def netWorth(self) -> float:
+        return self.value
+
+    def __str__(self) -> str:
+        return str(round(self.value, 2))
+
+
+abstractEventProfileType["retirement-account"] = RetirementAccount
@@ -3,6 +3,12 @@ from ctypes import ArgumentError
 from dateutil.relativedelta import relativedelta
 from datetime import date
 from enum import Enum
+from typing import Callable, Iterable, Optional, Tuple
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from . import metrics
 
 
 class AccrualModel(Enum):
@@ -35,29 +41,55 @@ def nonZeroValuesInDelta(delta: relativedelta) -> list[str]:
     return result
 
 
-def _portionOfYearPeriodicMonthly(date: date, period: relativedelta):
+PortionOfYear = Callable[[date], float]
+
+
+def _isWholeDays(period: relativedelta) -> bool:
+    return not (
+        period.years
+        or period.months
+        or period.leapdays
+        or period.hours
+        or period.minutes
+        or period.seconds
+        or period.microseconds
+        or period.weekday is not None
+    )
+
+
+def _isWholeMonths(period: relativedelta) -> bool:
+    return not (
+        period.days
+        or period.leapdays
+        or period.hours
+        or period.minutes
+        or period.seconds
+        or period.microseconds
+        or period.weekday is not None
+    )
+
+
+def _constantPortion(portion: float) -> PortionOfYear:
+    return lambda date: portion
+
+
+def _resolvePeriodicMonthly(period: relativedelta) -> PortionOfYear:
     fieldsInPeriod = nonZeroValuesInDelta(period)
-    if any([field not in ["months", "years"] for field in fieldsInPeriod]):
+    if any(field not in ["months", "years"] for field in fieldsInPeriod):
         raise ArgumentError(
             "Periodic monthly accrual model does not support periods "
             + "containing non-month, non-year values"
         )
-    return period.years + period.months / 12
+    return _constantPortion(period.years + period.months / 12)
 
 
 def _portionOfYearPeriodicSemiMonthly(date: date, period: relativedelta):
-    fieldsInPeriod = nonZeroValuesInDelta(period)
     daysInMonth = monthrange(date.year, date.month)[1]
     dateBeginningPeriod = date - period
     daysInMonthBeginning = monthrange(dateBeginningPeriod.year, dateBeginningPeriod.month)[
         1
     ]
 
-    if any([field not in ["days", "months", "years"] for field in fieldsInPeriod]):
-        raise ArgumentError(
-            "Periodic semi-monthly accrual model does not support "
-            + "periods containing non-day, non-month, non-year values"
-        )
     if date.day != 15 and date.day != daysInMonth:
         raise ArgumentError(
             "Periodic semi-monthly accrual model does not support "
@@ -79,7 +111,17 @@ def _portionOfYearPeriodicSemiMonthly(date: date, period: relativedelta):
     return periods / 24
 
 
-def _portionOfYearPeriodicWeekly(date: date, period: relativedelta):
+def _resolvePeriodicSemiMonthly(period: relativedelta) -> PortionOfYear:
+    fieldsInPeriod = nonZeroValuesInDelta(period)
+    if any(field not in ["days", "months", "years"] for field in fieldsInPeriod):
+        raise ArgumentError(
+            "Periodic semi-monthly accrual model does not support "
+            + "periods containing non-day, non-month, non-year values"
+        )
+    return lambda date: _portionOfYearPeriodicSemiMonthly(date, period)
+
+
+def _resolvePeriodicWeekly(period: relativedelta) -> PortionOfYear:
     fieldsInPeriod = nonZeroValuesInDelta(period)
     if fieldsInPeriod != ["days"]:
         raise ArgumentError(
@@ -91,10 +133,10 @@ def _portionOfYearPeriodicWeekly(date: date, period: relativedelta):
             "Periodic weekly accrual model only works for periods "
             + "that are multiples of 7 days"
         )
-    return (period.days // 7) / 52
+    return _constantPortion((period.days // 7) / 52)
 
 
-def _portionOfYearPeriodicBiweekly(date: date, period: relativedelta):
+def _resolvePeriodicBiweekly(period: relativedelta) -> PortionOfYear:
     fieldsInPeriod = nonZeroValuesInDelta(period)
     if fieldsInPeriod != ["days"]:
         raise ArgumentError(
@@ -106,17 +148,17 @@ def _portionOfYearPeriodicBiweekly(date: date, period: relativedelta):
             "Periodic weekly accrual model only works for periods "
             + "that are multiples of 14 days"
         )
-    return (period.days // 14) / 26
+    return _constantPortion((period.days // 14) / 26)
 
 
-def _portionOfYearPeriodicYearly(date: date, period: relativedelta):
+def _resolvePeriodicYearly(period: relativedelta) -> PortionOfYear:
     fieldsInPeriod = nonZeroValuesInDelta(period)
     if fieldsInPeriod != ["years"]:
         raise ArgumentError(
             "Periodic yearly accrual model does not support periods "
             + "containing non-year values"
         )
-    return period.years
+    return _constantPortion(period.years)
 
 
 def _portionOfYearProRata(date: date, period: relativedelta):
@@ -126,16 +168,378 @@ def _portionOfYearProRata(date: date, period: relativedelta):
     return days / daysInYear
 
 
+def _resolveProRata(period: relativedelta) -> PortionOfYear:
+    if _isWholeDays(period):
+        days = period.days
+        return lambda date: days / (366 if isleap(date.year) else 365)
+    return lambda date: _portionOfYearProRata(date, period)
+
+
+_portionResolvers: dict[AccrualModel, Callable[[relativedelta], PortionOfYear]] = {
+    AccrualModel.ProRata: _resolveProRata,
+    AccrualModel.PeriodicMonthly: _resolvePeriodicMonthly,
+    AccrualModel.PeriodicSemiMonthly: _resolvePeriodicSemiMonthly,
+    AccrualModel.PeriodicWeekly: _resolvePeriodicWeekly,
+    AccrualModel.PeriodicBiweekly: _resolvePeriodicBiweekly,
+    AccrualModel.PeriodicYearly: _resolvePeriodicYearly,
+}
+
+_maxResolvedPeriods = 1024
+# by value, so each (period, model) pair is validated once; shared by every run, and as
+# each access is a single dict operation, concurrent runs can at worst resolve a period
+# twice
+_resolvedPortions: dict[AccrualModel, dict[relativedelta, PortionOfYear]] = {
+    model: {} for model in AccrualModel
+}
+# by identity, which skips hashing the relativedelta for the periods a timeline shares
+# between steps; entries keep their period alive so ids are not reused
+_resolvedPortionsById: dict[
+    AccrualModel, dict[int, Tuple[relativedelta, PortionOfYear]]
+] = {model: {} for model in AccrualModel}
+
+
+def _resolvePortion(period: relativedelta, accrualModel: AccrualModel) -> PortionOfYear:
+    byValue = _resolvedPortions[accrualModel]
+    portion = byValue.get(period)
+    metrics.increment(
+        "finance_sim_precomputed_lookups_total",
+        table="accrual_period",
+        outcome="built" if portion is None else "reused",
+    )
+    if portion is None:
+        portion = _portionResolvers[accrualModel](period)
+        if len(byValue) >= _maxResolvedPeriods:
+            byValue.clear()
+        byValue[period] = portion
+    byId = _resolvedPortionsById[accrualModel]
+    if len(byId) >= _maxResolvedPeriods:
+        byId.clear()
+    byId[id(period)] = (period, portion)
+    return portion
+
+
 def portionOfYear(date: date, period: relativedelta, accrualModel: AccrualModel) -> float:
-    if accrualModel == AccrualModel.PeriodicMonthly:
-        return _portionOfYearPeriodicMonthly(date, period)
-    elif accrualModel == AccrualModel.PeriodicSemiMonthly:
-        return _portionOfYearPeriodicSemiMonthly(date, period)
-    elif accrualModel == AccrualModel.PeriodicWeekly:
-        return _portionOfYearPeriodicWeekly(date, period)
-    elif accrualModel == AccrualModel.PeriodicBiweekly:
-        return _portionOfYearPeriodicBiweekly(date, period)
-    elif accrualModel == AccrualModel.PeriodicYearly:
-        return _portionOfYearPeriodicYearly(date, period)
-    else:  # pro rata
-        return _portionOfYearProRata(date, period)
+    """
+    The portion of a year the period ending on `date` accrues under `accrualModel`.
+    Checking that the period suits the model happens once per (period, model) pair.
+    """
+    resolved = _resolvedPortionsById[accrualModel].get(id(period))
+    if resolved is None:
+        return _resolvePortion(period, accrualModel)(date)
+    return resolved[1](date)
+
+
+_unixEpochOrdinal = date(1970, 1, 1).toordinal()
+
+
+def _calendarFields(
+    ordinals: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Year, month, day and days in month of each ordinal.
+    """
+    days = (ordinals - _unixEpochOrdinal).astype("datetime64[D]")
+    months = days.astype("datetime64[M]")
+    nextMonths = months + np.timedelta64(1, "M")
+    years = months.astype("datetime64[Y]").astype(np.int64) + 1970
+    monthNumbers = months.astype(np.int64) % 12 + 1
+    dayNumbers = (days - months).astype(np.int64) + 1
+    daysInMonth = (
+        nextMonths.astype("datetime64[D]") - months.astype("datetime64[D]")
+    ).astype(np.int64)
+    return years, monthNumbers, dayNumbers, daysInMonth
+
+
+def portionsOfYear(
+    startOrdinals: ArrayLike, endOrdinals: ArrayLike, accrualModel: AccrualModel
+) -> np.ndarray:
+    """
+    Vectorized portionOfYear over periods given as arrays of start and end day
+    ordinals, for engines that process many steps or scenarios at once. Raises
+    ArgumentError if any period does not suit the accrual model.
+    """
+    starts = np.asarray(startOrdinals, dtype=np.int64)
+    ends = np.asarray(endOrdinals, dtype=np.int64)
+    days = ends - starts
+    if accrualModel == AccrualModel.ProRata:
+        endYears = _calendarFields(ends)[0]
+        leap = (endYears % 4 == 0) & ((endYears % 100 != 0) | (endYears % 400 == 0))
+        return days / np.where(leap, 366, 365)
+    if accrualModel in (AccrualModel.PeriodicWeekly, AccrualModel.PeriodicBiweekly):
+        length = 7 if accrualModel == AccrualModel.PeriodicWeekly else 14
+        if np.any(days % length):
+            raise ArgumentError(
+                "{} accrual only works for periods that are multiples of {} days".format(
+                    accrualModel.name, length
+                )
+            )
+        return (days // length) / (364 / length)
+
+    startYear, startMonth, startDay, startMonthLength = _calendarFields(starts)
+    endYear, endMonth, endDay, endMonthLength = _calendarFields(ends)
+    if accrualModel == AccrualModel.PeriodicSemiMonthly:
+        startEnd = startDay == startMonthLength
+        endEnd = endDay == endMonthLength
+        if not np.all(((startDay == 15) | startEnd) & ((endDay == 15) | endEnd)):
+            raise ArgumentError(
+                "Periodic semi-monthly accrual model requires periods that begin and "
+                + "end on the 15th or final day of the month"
+            )
+        periods = (endYear - startYear) * 24 + (endMonth - startMonth) * 2
+        periods += (endEnd & (startDay == 15)).astype(np.int64)
+        periods -= ((endDay == 15) & startEnd).astype(np.int64)
+        return periods / 24
+
+    # monthly and yearly periods end on the same day of the month, unless one end is
+    # clamped to the last day of a month too short to have it
+    sameDay = (
+        (endDay == startDay)
+        | ((endDay == endMonthLength) & (startDay > endDay))
+        | ((startDay == startMonthLength) & (endDay > startDay))
+    )
+    months = (endYear - startYear) * 12 + (endMonth - startMonth)
+    if accrualModel == AccrualModel.PeriodicYearly:
+        if not np.all(sameDay & (months % 12 == 0)):
+            raise ArgumentError(
+                "Periodic yearly accrual model does not support periods "
+                + "containing non-year values"
+            )
+        return (months // 12).astype(float)
+    if not np.all(sameDay):
+        raise ArgumentError(
+            "Periodic monthly accrual model does not support periods "
+            + "containing non-month, non-year values"
+        )
+    return months / 12
+
+
+CadenceKey = Optional[AccrualModel]
+
+
+def cadenceKey(accrualModel: Optional[AccrualModel]) -> CadenceKey:
+    """
+    Periodic accrual models step on their own calendar. Pro rata accrual (and profiles
+    without an accrual model) follow the configured granularity, keyed by None.
+    """
+    if accrualModel is None or accrualModel == AccrualModel.ProRata:
+        return None
+    return accrualModel
+
+
+class Timeline(object):
+    """
+    The step dates of a simulation, stored as day ordinals. `due[i]` maps every cadence
+    that falls on step i to the period it accrues over, so each profile is only
+    transformed on its own dates. Built once per run so the engine never does date
+    arithmetic.
+    """
+
+    startOrdinal: int
+    ordinals: list[int]
+    due: list[dict[CadenceKey, relativedelta]]
+
+    def __init__(
+        self,
+        startOrdinal: int,
+        ordinals: list[int],
+        due: list[dict[CadenceKey, relativedelta]],
+    ):
+        self.startOrdinal = startOrdinal
+        self.ordinals = ordinals
+        self.due = due
+        self._indexCurves: dict[Tuple[float, ...], np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+    def dates(self) -> list[date]:
+        return [date.fromordinal(ordinal) for ordinal in self.ordinals]
+
+    def dueSteps(self, key: CadenceKey, start: int = 0) -> np.ndarray:
+        """
+        The steps from `start` onward that cadence `key` falls on.
+        """
+        return np.array(
+            [step for step in range(start, len(self.due)) if key in self.due[step]],
+            dtype=np.int64,
+        )
+
+    def indexCurve(self, rates: Tuple[float, ...]) -> np.ndarray:
+        """
+        The level of an index with yearly growth `rates` (see util.parseIndex) at every
+        step, starting at 1 and growing on each anniversary of the start. Computed once
+        per timeline and shared by every profile and run that uses the same rates.
+        """
+        curve = self._indexCurves.get(rates)
+        if curve is not None:
+            metrics.increment(
+                "finance_sim_precomputed_lookups_total",
+                table="index_curve",
+                outcome="reused",
+            )
+            return curve
+        metrics.increment(
+            "finance_sim_precomputed_lookups_total", table="index_curve", outcome="built"
+        )
+        start = date.fromordinal(self.startOrdinal)
+        last = self.ordinals[-1] if self.ordinals else self.startOrdinal
+        anniversaries: list[int] = []
+        while True:
+            anniversary = (start + relativedelta(years=len(anniversaries) + 1)).toordinal()
+            if anniversary > last:
+                break
+            anniversaries.append(anniversary)
+        growth = [
+            1 + rates[min(year, len(rates) - 1)] for year in range(len(anniversaries))
+        ]
+        levels = np.concatenate([[1.0], np.cumprod(growth)])
+        passed = np.searchsorted(
+            np.array(anniversaries, dtype=np.int64),
+            np.array(self.ordinals, dtype=np.int64),
+            side="right",
+        )
+        curve = levels[passed]
+        curve.flags.writeable = False
+        return self._indexCurves.setdefault(rates, curve)
+
+    def spans(self, key: CadenceKey, start: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The start and end ordinals of the periods cadence `key` accrues over from step
+        `start` onward, ready for portionsOfYear.
+        """
+        previous = self.startOrdinal
+        starts: list[int] = []
+        ends: list[int] = []
+        for step, (ordinal, due) in enumerate(zip(self.ordinals, self.due)):
+            if key in due:
+                if step >= start:
+                    starts.append(previous)
+                    ends.append(ordinal)
+                previous = ordinal
+        return np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64)
+
+
+def _dailyOrdinals(startOrdinal: int, endOrdinal: int, days: int) -> list[int]:
+    return list(range(startOrdinal + days, endOrdinal, days))
+
+
+def _monthlyOrdinals(startingDate: date, endOrdinal: int, months: int) -> list[int]:
+    """
+    Steps are anchored to the starting day of month rather than accumulated, so a
+    simulation starting on the 31st steps to the last day of shorter months and back to
+    the 31st afterwards.
+    """
+    result: list[int] = []
+    monthIndex = startingDate.year * 12 + startingDate.month - 1
+    while True:
+        monthIndex += months
+        year, month = divmod(monthIndex, 12)
+        daysInMonth = monthrange(year, month + 1)[1]
+        ordinal = date(year, month + 1, min(startingDate.day, daysInMonth)).toordinal()
+        if ordinal >= endOrdinal:
+            return result
+        result.append(ordinal)
+
+
+def _semiMonthlyOrdinals(startingDate: date, endOrdinal: int) -> list[int]:
+    result: list[int] = []
+    year, month = startingDate.year, startingDate.month
+    while True:
+        daysInMonth = monthrange(year, month)[1]
+        monthStart = date(year, month, 1).toordinal()
+        for ordinal in (monthStart + 14, monthStart + daysInMonth - 1):
+            if ordinal >= endOrdinal:
+                return result
+            if ordinal > startingDate.toordinal():
+                result.append(ordinal)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def _dayDeltas(startOrdinal: int, ordinals: list[int]) -> list[relativedelta]:
+    cache: dict[int, relativedelta] = {}
+    result: list[relativedelta] = []
+    previous = startOrdinal
+    for ordinal in ordinals:
+        days = ordinal - previous
+        if days not in cache:
+            cache[days] = relativedelta(days=days)
+        result.append(cache[days])
+        previous = ordinal
+    return result
+
+
+def _granularityTrack(
+    startingDate: date,
+    granularity: relativedelta,
+    endOrdinal: int,
+    accrualModel: AccrualModel,
+) -> Tuple[list[int], list[relativedelta]]:
+    startOrdinal = startingDate.toordinal()
+    if accrualModel == AccrualModel.PeriodicSemiMonthly and granularity == relativedelta(
+        days=15
+    ):
+        ordinals = _semiMonthlyOrdinals(startingDate, endOrdinal)
+        return ordinals, _dayDeltas(startOrdinal, ordinals)
+    if _isWholeDays(granularity):
+        if granularity.days <= 0:
+            raise ArgumentError("granularity must be a positive number of days")
+        ordinals = _dailyOrdinals(startOrdinal, endOrdinal, granularity.days)
+        return ordinals, [granularity] * len(ordinals)
+    if _isWholeMonths(granularity):
+        months = granularity.years * 12 + granularity.months
+        if months <= 0:
+            raise ArgumentError("granularity must be a positive number of months")
+        ordinals = _monthlyOrdinals(startingDate, endOrdinal, months)
+        return ordinals, [granularity] * len(ordinals)
+    raise ArgumentError(
+        "granularity must be expressed in whole days or whole months, got {}".format(
+            granularity
+        )
+    )
+
+
+_cadencePeriods: dict[AccrualModel, relativedelta] = {
+    AccrualModel.PeriodicMonthly: relativedelta(months=1),
+    AccrualModel.PeriodicSemiMonthly: relativedelta(days=15),
+    AccrualModel.PeriodicWeekly: relativedelta(days=7),
+    AccrualModel.PeriodicBiweekly: relativedelta(days=14),
+    AccrualModel.PeriodicYearly: relativedelta(years=1),
+}
+
+
+def buildTimeline(
+    startingDate: date,
+    granularity: relativedelta,
+    period: int,
+    accrualModel: AccrualModel = AccrualModel.PeriodicMonthly,
+    profileModels: Iterable[AccrualModel] = (),
+) -> Timeline:
+    """
+    Steps by `granularity` from (but excluding) `startingDate` for `period` years, merged
+    with the native cadence of every periodic model in `profileModels`. A granularity of
+    15 days with a semi-monthly accrual model steps on the 15th and the final day of
+    each month, which is how the "M2" granularity is meant to be read.
+    """
+    startOrdinal = startingDate.toordinal()
+    endOrdinal = (startingDate + relativedelta(years=period)).toordinal()
+    # the None track serves pro rata profiles, which accrue over the actual days between
+    # steps; monthly steps pinned to the start day are not a whole month apart when the
+    # day is clamped to a shorter month
+    ordinals, _ = _granularityTrack(startingDate, granularity, endOrdinal, accrualModel)
+    tracks = {None: (ordinals, _dayDeltas(startOrdinal, ordinals))}
+    for model in {cadenceKey(model) for model in profileModels}:
+        if model is not None:
+            tracks[model] = _granularityTrack(
+                startingDate, _cadencePeriods[model], endOrdinal, model
+            )
+
+    if len(tracks) == 1:
+        ordinals, deltas = tracks[None]
+        return Timeline(startOrdinal, ordinals, [{None: delta} for delta in deltas])
+
+    merged: dict[int, dict[CadenceKey, relativedelta]] = {}
+    for key, (ordinals, deltas) in tracks.items():
+        for ordinal, delta in zip(ordinals, deltas):
+            merged.setdefault(ordinal, {})[key] = delta
+    ordinals = sorted(merged)
+    return Timeline(startOrdinal, ordinals, [merged[ordinal] for ordinal in ordinals])
@@ -0,0 +1,96 @@
+from ctypes import ArgumentError
+from dataclasses import dataclass
+from typing import Any, Callable, Mapping, Tuple
+
+from .util import parseAccrualModel, parseGranularity, parseIndex
+
+
+@dataclass(frozen=True)
+class ConfigField(object):
+    """
+    One key of a profile's config `data`. `check` raises ArgumentError (or any
+    ValueError/TypeError) for values the profile could not be built from. Sensitivity
+    analysis leaves alone fields that are not `continuous` (priorities, sentinels;
+    integer fields never are) and the positions in `fixed`, like "0.income".
+    """
+
+    check: Callable[[Any], Any]
+    required: bool = True
+    continuous: bool = True
+    fixed: Tuple[str, ...] = ()
+
+
+def number(value: Any) -> None:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ArgumentError("expected a number, got {!r}".format(value))
+
+
+def integer(value: Any) -> None:
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ArgumentError("expected an integer, got {!r}".format(value))
+
+
+def numberList(value: Any) -> None:
+    if not isinstance(value, list) or len(value) < 1:
+        raise ArgumentError("expected a non-empty list of numbers, got {!r}".format(value))
+    for item in value:
+        number(item)
+
+
+def accrualModel(value: Any) -> None:
+    if not isinstance(value, str):
+        raise ArgumentError("expected an accrual model string, got {!r}".format(value))
+    parseAccrualModel(value)
+
+
+def granularity(value: Any) -> None:
+    if not isinstance(value, str):
+        raise ArgumentError("expected a granularity string, got {!r}".format(value))
+    parseGranularity(value)
+
+
+def index(value: Any) -> None:
+    """
+    Either the name of an index in the config's `indices` section, or a definition.
+    """
+    if not isinstance(value, str):
+        parseIndex(value)
+
+
+def taxBrackets(value: Any) -> None:
+    if not isinstance(value, list) or len(value) < 1:
+        raise ArgumentError("there must be at least one tax bracket")
+    for bracket in value:
+        if not isinstance(bracket, dict) or set(bracket) != {"rate", "income"}:
+            raise ArgumentError(
+                'brackets must have exactly "rate" and "income", got {!r}'.format(bracket)
+            )
+        number(bracket["rate"])
+        number(bracket["income"])
+    if value[0]["income"] != 0:
+        raise ArgumentError("brackets must start with a zero income bracket")
+
+
+def validateConfigData(schema: Mapping[str, ConfigField], data: Any) -> list[str]:
+    """
+    Returns a description of every problem with `data`, including unknown keys, which
+    are usually misspelled ones. An empty schema accepts anything.
+    """
+    if not schema:
+        return []
+    if not isinstance(data, dict):
+        return ["data must be a mapping, got {!r}".format(data)]
+    errors = [
+        'missing required key "{}"'.format(key)
+        for key, field in schema.items()
+        if field.required and key not in data
+    ]
+    for key, value in data.items():
+        if key not in schema:
+            errors.append('unknown key "{}"'.format(key))
+            continue
+        try:
+            schema[key].check(value)
+        except (ArgumentError, ValueError, TypeError) as error:
+            errors.append('"{}": {}'.format(key, error))
+    return errors
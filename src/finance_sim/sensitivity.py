@@ -0,0 +1,136 @@
+from concurrent.futures import ProcessPoolExecutor
+from ctypes import ArgumentError
+from typing import Any, Iterator, Optional, Sequence
+
+from pandas import DataFrame
+
+from . import schema
+from .config import ScenarioConfig, _configSections, getConfigValue, withConfigValue
+from .events import InsolvencyPolicy, abstractEventProfileType, netWorth
+from .plan import compileConfig
+from .reporting import _simulateFinal
+from .scheduling import Timeline
+
+
+def _isNumber(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _numericLeaves(value: Any, prefix: str) -> Iterator[str]:
+    if _isNumber(value):
+        yield prefix
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            yield from _numericLeaves(item, "{}.{}".format(prefix, key))
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            yield from _numericLeaves(item, "{}.{}".format(prefix, index))
+
+
+def numericConfigPaths(config: ScenarioConfig) -> list[str]:
+    """
+    Lists the path of every continuous numeric input in the profiles and shared indices
+    of `config`: values, rates, salaries and the like. Fields and positions the
+    profile's schema marks as not continuous, and states whose name is not unique
+    within their section, are left out.
+    """
+    paths: list[str] = []
+    for section, states in _configSections(config).items():
+        names = [state.name for state in states]
+        for state in states:
+            if names.count(state.name) != 1 or not isinstance(state.data, dict):
+                continue
+            fields = {}
+            if state.type in abstractEventProfileType:
+                fields = abstractEventProfileType[state.type].configSchema
+            for key, value in state.data.items():
+                field = fields.get(key)
+                if field is not None and (
+                    not field.continuous or field.check is schema.integer
+                ):
+                    continue
+                prefix = "{}.{}.{}".format(section, state.name, key)
+                fixed = (
+                    {"{}.{}".format(prefix, path) for path in field.fixed}
+                    if field
+                    else set()
+                )
+                paths.extend(
+                    path for path in _numericLeaves(value, prefix) if path not in fixed
+                )
+    for name, definition in config.indices.items():
+        paths.extend(_numericLeaves(definition, "indices.{}".format(name)))
+    return paths
+
+
+def _finalNetWorths(
+    configs: Sequence[ScenarioConfig], timeline: Optional[Timeline] = None
+) -> list[float]:
+    result: list[float] = []
+    for config in configs:
+        plan = compileConfig(config, timeline)
+        history = _simulateFinal(plan, InsolvencyPolicy.Continue)
+        result.append(netWorth(history.latestEvents()))
+    return result
+
+
+def sensitivities(
+    config: ScenarioConfig,
+    paths: Optional[Sequence[str]] = None,
+    relativeStep: float = 1e-4,
+    absoluteStep: float = 1e-4,
+    workers: Optional[int] = None,
+) -> DataFrame:
+    """
+    Estimates how final net worth responds to each parameter in `paths` (every numeric
+    input by default) with forward differences. Each parameter is bumped by
+    `relativeStep` of its value, or by `absoluteStep` if it is zero, and the base run
+    and all bumped runs are simulated as one batch on a shared timeline, split across
+    `workers` processes when given. Running out of cash does not stop a run, so the
+    difference stays defined through insolvency.
+
+    Returns one row per path with the base value, the bump, the bumped net worth, the
+    sensitivity (change in net worth per unit of the parameter) and the elasticity
+    (relative change in net worth per relative change of the parameter).
+    """
+    if relativeStep <= 0 or absoluteStep <= 0:
+        raise ArgumentError("steps must be positive")
+    if paths is None:
+        paths = numericConfigPaths(config)
+    if any(path.startswith("time.") for path in paths):
+        raise ArgumentError("time settings are not continuous parameters")
+    values = [getConfigValue(config, path) for path in paths]
+    for path, value in zip(paths, values):
+        if not _isNumber(value):
+            raise ArgumentError("{} is not a number".format(path))
+    bumps = [relativeStep * abs(value) if value != 0 else absoluteStep for value in values]
+    variants = [config] + [
+        withConfigValue(config, path, value + bump)
+        for path, value, bump in zip(paths, values, bumps)
+    ]
+
+    timeline = compileConfig(config).timeline
+    if workers is None or workers <= 1:
+        netWorths = _finalNetWorths(variants, timeline)
+    else:
+        chunkSize = -(-len(variants) // workers)
+        chunks = [
+            variants[index : index + chunkSize]
+            for index in range(0, len(variants), chunkSize)
+        ]
+        with ProcessPoolExecutor(workers) as executor:
+            results = executor.map(_finalNetWorths, chunks, [timeline] * len(chunks))
+            netWorths = [netWorth for chunk in results for netWorth in chunk]
+
+    base = netWorths[0]
+    rows = []
+    for path, value, bump, bumped in zip(paths, values, bumps, netWorths[1:]):
+        sensitivity = (bumped - base) / bump
+        elasticity = sensitivity * value / base if base != 0 else float("nan")
+        rows.append([path, value, bump, bumped, sensitivity, elasticity])
+    result = DataFrame(
+        rows,
+        columns=["path", "value", "bump", "netWorth", "sensitivity", "elasticity"],
+    )
+    result.attrs["baseNetWorth"] = base
+    return result
@@ -0,0 +1,217 @@
+from bisect import bisect_left
+from ctypes import ArgumentError
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, Optional, Tuple
+
+from .config import ScenarioConfig, getConfigValue, withConfigValue
+from .events import EventProfileGroup, InsolvencyPolicy, LatestFinanceHistory
+from .plan import compileConfig
+from .reporting import _assembleInitialState, _simulate
+from .scheduling import Timeline
+
+
+@dataclass
+class SolverResult(object):
+    value: float
+    iterations: int
+    simulations: int
+    converged: bool
+
+
+class _TrialRunner(object):
+    """
+    Runs the scenario for different values of one config parameter. The config is
+    compiled and its timeline built once, and the steps before the parameter can first
+    have an effect (before its scheduled update starts) are simulated once and resumed
+    from on every trial, so `observer` is checked on them only once.
+    """
+
+    config: ScenarioConfig
+    path: str
+    timeline: Optional[Timeline]
+    start: int
+    simulations: int
+
+    def __init__(
+        self,
+        config: ScenarioConfig,
+        path: str,
+        insolvency: InsolvencyPolicy = InsolvencyPolicy.Continue,
+        observer: Optional[Callable[[EventProfileGroup], bool]] = None,
+    ):
+        getConfigValue(config, path)
+        self.config = config
+        self.path = path
+        self.insolvency = insolvency
+        self.observer = observer
+        self.simulations = 0
+        plan = compileConfig(config)
+        self.timeline = None if path.startswith("time.") else plan.timeline
+        self.start = self._firstAffectedStep()
+        self.prefix: Optional[EventProfileGroup] = None
+        self.prefixInsolvencyDate: Optional[date] = None
+        self.prefixHalted = False
+        if self.start > 0:
+            history = LatestFinanceHistory(_assembleInitialState(plan, insolvency))
+            haltedOn = _simulate(plan, history, stop=self.start, observer=observer)
+            self.prefixHalted = haltedOn is not None
+            self.prefix = history.latestEvents()
+            self.prefixInsolvencyDate = history.insolvencyDate
+
+    def _firstAffectedStep(self) -> int:
+        section, name = self.path.split(".")[:2]
+        if section != "scheduledStateUpdates" or self.timeline is None:
+            return 0
+        startDate = min(
+            scheduled.startDate
+            for scheduled in self.config.scheduledValues
+            if scheduled.state.name == name
+        )
+        return bisect_left(self.timeline.ordinals, startDate.toordinal())
+
+    def run(self, value: float) -> Tuple[EventProfileGroup, bool]:
+        """
+        Returns the state the run ended in and whether it ran to the end of the timeline
+        without `observer` halting it or running out of cash.
+        """
+        if self.prefixHalted:
+            # every value shares the prefix, and with it the step that halted it
+            return self.prefix, False
+        self.simulations += 1
+        plan = compileConfig(withConfigValue(self.config, self.path, value), self.timeline)
+        if self.prefix is not None:
+            history = LatestFinanceHistory(self.prefix)
+            history.insolvencyDate = self.prefixInsolvencyDate
+        else:
+            history = LatestFinanceHistory(_assembleInitialState(plan, self.insolvency))
+        haltedOn = _simulate(plan, history, self.start, observer=self.observer)
+        solvent = history.insolvencyDate is None
+        return history.latestEvents(), haltedOn is None and solvent
+
+
+def _bisect(
+    f: Callable[[float], float], lo: float, hi: float, tolerance: float, maxIterations: int
+) -> Tuple[float, int, bool]:
+    fLo, fHi = f(lo), f(hi)
+    if fLo * fHi > 0:
+        raise ArgumentError("the objective must change sign between lo and hi")
+    if fLo == 0 or fHi == 0:
+        return (lo if fLo == 0 else hi), 0, True
+    for iteration in range(1, maxIterations + 1):
+        mid = (lo + hi) / 2
+        fMid = f(mid)
+        if fMid == 0 or (hi - lo) / 2 < tolerance:
+            return mid, iteration, True
+        if (fMid < 0) == (fLo < 0):
+            lo, fLo = mid, fMid
+        else:
+            hi = mid
+    return (lo + hi) / 2, maxIterations, False
+
+
+def _brent(
+    f: Callable[[float], float], lo: float, hi: float, tolerance: float, maxIterations: int
+) -> Tuple[float, int, bool]:
+    a, b = lo, hi
+    fa, fb = f(a), f(b)
+    if fa * fb > 0:
+        raise ArgumentError("the objective must change sign between lo and hi")
+    c, fc = a, fa
+    d = e = b - a
+    for iteration in range(1, maxIterations + 1):
+        if fb * fc > 0:
+            c, fc = a, fa
+            d = e = b - a
+        if abs(fc) < abs(fb):
+            a, b, c = b, c, b
+            fa, fb, fc = fb, fc, fb
+        tol = 2 * 2.2e-16 * abs(b) + tolerance / 2
+        m = (c - b) / 2
+        if abs(m) <= tol or fb == 0:
+            return b, iteration, True
+        if abs(e) >= tol and abs(fa) > abs(fb):
+            s = fb / fa
+            if a == c:
+                p, q = 2 * m * s, 1 - s
+            else:
+                q, r = fa / fc, fb / fc
+                p = s * (2 * m * q * (q - r) - (b - a) * (r - 1))
+                q = (q - 1) * (r - 1) * (s - 1)
+            if p > 0:
+                q = -q
+            else:
+                p = -p
+            if 2 * p < min(3 * m * q - abs(tol * q), abs(e * q)):
+                e, d = d, p / q
+            else:
+                d = e = m
+        else:
+            d = e = m
+        a, fa = b, fb
+        b += d if abs(d) > tol else (tol if m > 0 else -tol)
+        fb = f(b)
+    return b, maxIterations, False
+
+
+_rootFinders = {"bisect": _bisect, "brent": _brent}
+
+
+def solve(
+    config: ScenarioConfig,
+    path: str,
+    objective: Callable[[EventProfileGroup], float],
+    lo: float,
+    hi: float,
+    method: str = "brent",
+    tolerance: float = 1e-6,
+    maxIterations: int = 100,
+) -> SolverResult:
+    """
+    Finds the value of the parameter at `path` (see getConfigValue) in [lo, hi] for which
+    `objective`, evaluated on the final state of the run, is zero. Trials that run out
+    of cash continue with negative cash so the objective stays continuous.
+    """
+    if method not in _rootFinders:
+        raise ArgumentError("method must be one of {}".format(list(_rootFinders)))
+    runner = _TrialRunner(config, path)
+    value, iterations, converged = _rootFinders[method](
+        lambda x: objective(runner.run(x)[0]), lo, hi, tolerance, maxIterations
+    )
+    return SolverResult(value, iterations, runner.simulations, converged)
+
+
+def solveConstraint(
+    config: ScenarioConfig,
+    path: str,
+    constraint: Callable[[EventProfileGroup], bool],
+    lo: float,
+    hi: float,
+    tolerance: float = 1e-6,
+    maxIterations: int = 100,
+) -> SolverResult:
+    """
+    Finds the boundary in [lo, hi] between parameter values for which `constraint` holds
+    on every step of the run and values for which it is broken at some step, assuming
+    exactly one of lo and hi satisfies it. Running out of cash breaks the constraint too.
+    A run stops at the first broken step, so infeasible trials are cut short. The
+    returned value is on the feasible side.
+    """
+    runner = _TrialRunner(config, path, InsolvencyPolicy.Stop, constraint)
+
+    def feasible(value: float) -> bool:
+        return runner.run(value)[1]
+
+    feasibleLo = feasible(lo)
+    if feasibleLo == feasible(hi):
+        raise ArgumentError("exactly one of lo and hi must satisfy the constraint")
+    iterations = 0
+    while abs(hi - lo) > tolerance and iterations < maxIterations:
+        iterations += 1
+        mid = (lo + hi) / 2
+        if feasible(mid) == feasibleLo:
+            lo = mid
+        else:
+            hi = mid
+    value = lo if feasibleLo else hi
+    return SolverResult(value, iterations, runner.simulations, abs(hi - lo) <= tolerance)
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import abc
+
+from copy import deepcopy
+from ctypes import ArgumentError
+from datetime import date
+from dateutil.relativedelta import relativedelta
+from typing import Iterator, Optional
+
+import numpy as np
+
+from .config import ScenarioConfig
+from .events import (
+    EventConfigType,
+    FinanceHistory,
+    PreparedProfile,
+    abstractEventProfileType,
+)
+from . import schema
+from .schema import ConfigField
+from .scheduling import AccrualModel, Timeline, cadenceKey, portionOfYear, portionsOfYear
+from .util import parseAccrualModel
+
+_lazyBlockSize = 256
+
+
+def generatorFor(seed: int, stream: int = 0) -> np.random.Generator:
+    """
+    Streams with the same seed and different stream indices are statistically
+    independent, so parallel workers can each take a stream instead of sharing a seed.
+    """
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(stream,)))
+
+
+class _StochasticReturnAsset(PreparedProfile):
+    """
+    Growth factors for every step the asset will see are drawn in one batch when the
+    simulation prepares the profile, and each transform just applies the next one.
+    """
+
+    value: float
+    accrualModel: AccrualModel
+    seed: int
+    stream: int
+    factors: np.ndarray
+    shared = ("factors", "_generator")
+
+    def _setup(
+        self,
+        name: str,
+        accrualModel: AccrualModel,
+        initialValue: float,
+        seed: int,
+        stream: int,
+    ):
+        self.name = name
+        self.accrualModel = accrualModel
+        self.value = initialValue
+        self.seed = seed
+        self.stream = stream
+        self.factors = np.empty(0)
+        self.step = 0
+        self._generator: Optional[np.random.Generator] = None
+
+    @abc.abstractmethod
+    def _drawFactors(
+        self, generator: np.random.Generator, portions: np.ndarray
+    ) -> np.ndarray:
+        raise NotImplementedError()
+
+    def _generatorForDraws(self) -> np.random.Generator:
+        if self._generator is None:
+            self._generator = generatorFor(self.seed, self.stream)
+        return self._generator
+
+    def _precompute(self, timeline: Timeline, step: int):
+        starts, ends = timeline.spans(cadenceKey(self.accrualModel), step)
+        portions = portionsOfYear(starts, ends, self.accrualModel)
+        self.factors = self._drawFactors(self._generatorForDraws(), portions)
+
+    def transform(self, history: FinanceHistory, date: date, delta: relativedelta):
+        if self.step >= len(self.factors):
+            # outside of a prepared simulation, draw blocks assuming every upcoming step
+            # accrues like this one
+            portion = portionOfYear(date, delta, self.accrualModel)
+            block = self._drawFactors(
+                self._generatorForDraws(), np.full(_lazyBlockSize, portion)
+            )
+            self.factors = np.concatenate([self.factors, block])
+        self.value *= float(self.factors[self._nextStep()])
+
+    def netWorth(self) -> float:
+        return self.value
+
+    def __str__(self) -> str:
+        return str(round(self.value, 2))
+
+
+class LognormalReturnAsset(_StochasticReturnAsset):
+    """
+    Geometric Brownian motion with an expected growth of (1 + annualReturn) per year,
+    compounding like ConstantGrowthAsset when annualVolatility is zero. Log returns over
+    a step of t years are normal with mean (log(1 + annualReturn) - annualVolatility^2
+    / 2) * t and variance annualVolatility^2 * t.
+    """
+
+    annualReturn: float
+    annualVolatility: float
+    configSchema = {
+        "accrualModel": ConfigField(schema.accrualModel),
+        "initialValue": ConfigField(schema.number),
+        "annualReturn": ConfigField(schema.number),
+        "annualVolatility": ConfigField(schema.number),
+        "seed": ConfigField(schema.integer),
+        "stream": ConfigField(schema.integer, required=False),
+    }
+
+    def __init__(
+        self,
+        config: EventConfigType,
+        name: str,
+        accrualModel: AccrualModel = AccrualModel.PeriodicMonthly,
+        initialValue: float = 0,
+        annualReturn: float = 0,
+        annualVolatility: float = 0,
+        seed: int = 0,
+        stream: int = 0,
+    ):
+        if config is not None:
+            accrualModel = parseAccrualModel(config["accrualModel"])
+            initialValue = config["initialValue"]
+            annualReturn = config["annualReturn"]
+            annualVolatility = config["annualVolatility"]
+            seed = config["seed"]
+            stream = config.get("stream", 0)
+        self._setup(name, accrualModel, initialValue, seed, stream)
+        self.annualReturn = annualReturn
+        self.annualVolatility = annualVolatility
+
+    def _drawFactors(
+        self, generator: np.random.Generator, portions: np.ndarray
+    ) -> np.ndarray:
+        shocks = generator.standard_normal(len(portions))
+        drift = (np.log1p(self.annualReturn) - self.annualVolatility**2 / 2) * portions
+        return np.exp(drift + self.annualVolatility * np.sqrt(portions) * shocks)
+
+    def copy(self) -> LognormalReturnAsset:
+        result = LognormalReturnAsset(
+            None,
+            self.name,
+            self.accrualModel,
+            self.value,
+            self.annualReturn,
+            self.annualVolatility,
+            self.seed,
+            self.stream,
+        )
+        return self._shareWith(result)
+
+
+abstractEventProfileType["lognormal-return-asset"] = LognormalReturnAsset
+
+
+class BootstrapReturnAsset(_StochasticReturnAsset):
+    """
+    Each step resamples one of `historicalReturns` (annual returns) with replacement and
+    compounds it over the step's portion of the year.
+    """
+
+    historicalReturns: np.ndarray
+    configSchema = {
+        "accrualModel": ConfigField(schema.accrualModel),
+        "initialValue": ConfigField(schema.number),
+        "historicalReturns": ConfigField(schema.numberList),
+        "seed": ConfigField(schema.integer),
+        "stream": ConfigField(schema.integer, required=False),
+    }
+
+    def __init__(
+        self,
+        config: EventConfigType,
+        name: str,
+        accrualModel: AccrualModel = AccrualModel.PeriodicMonthly,
+        initialValue: float = 0,
+        historicalReturns: list[float] = [],
+        seed: int = 0,
+        stream: int = 0,
+    ):
+        if config is not None:
+            accrualModel = parseAccrualModel(config["accrualModel"])
+            initialValue = config["initialValue"]
+            historicalReturns = config["historicalReturns"]
+            seed = config["seed"]
+            stream = config.get("stream", 0)
+        if len(historicalReturns) < 1:
+            raise ArgumentError("there must be at least one historical return")
+        self._setup(name, accrualModel, initialValue, seed, stream)
+        self.historicalReturns = np.asarray(historicalReturns, dtype=float)
+
+    def _drawFactors(
+        self, generator: np.random.Generator, portions: np.ndarray
+    ) -> np.ndarray:
+        samples = generator.integers(0, len(self.historicalReturns), len(portions))
+        return np.power(1 + self.historicalReturns[samples], portions)
+
+    def copy(self) -> BootstrapReturnAsset:
+        result = BootstrapReturnAsset(
+            None,
+            self.name,
+            self.accrualModel,
+            self.value,
+            self.historicalReturns,
+            self.seed,
+            self.stream,
+        )
+        return self._shareWith(result)
+
+
+abstractEventProfileType["bootstrap-return-asset"] = BootstrapReturnAsset
+
+
+def streamVariants(config: ScenarioConfig, count: int) -> Iterator[ScenarioConfig]:
+    """
+    Yields `count` copies of `config` in which every stochastic profile draws from its
+    own independent stream, e.g. one per Monte Carlo path or worker.
+    """
+    for stream in range(count):
+        variant = deepcopy(config)
+        states = variant.initialState + [s.state for s in variant.scheduledValues]
+        for state in states:
+            if issubclass(abstractEventProfileType[state.type], _StochasticReturnAsset):
+                state.data["stream"] = stream
+        yield variant
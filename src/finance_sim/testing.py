@@ -0,0 +1,276 @@
+"""
+Differential testing: random valid scenarios and a check that an engine reproduces the
+reference simulation loop on them.
+"""
+
+import time
+from calendar import monthrange
+from dataclasses import dataclass
+from datetime import date
+from dateutil.relativedelta import relativedelta
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from .config import ScenarioConfig, ScheduledState, StateConfig, TimeConfig
+from .events import FinanceHistory, InsolvencyPolicy, netWorth
+from .plan import compileConfig
+from .reporting import _assembleInitialState, _simulate
+from .util import parseAccrualModel, parseGranularity
+
+# an engine runs a config to its end and returns named final values, e.g. from
+# finalValues(); it may return a subset of the reference engine's names
+Engine = Callable[[ScenarioConfig], dict[str, float]]
+
+_granularities = ["1d", "3d", "1w", "2w", "1M2", "1M", "2M", "1Y"]
+_accrualModels = [
+    "pro rata",
+    "periodic monthly",
+    "periodic semi monthly",
+    "periodic weekly",
+    "periodic biweekly",
+    "periodic yearly",
+]
+_maxStepsPerYear = {"1d": 366, "3d": 122, "1w": 53}
+
+
+def _profileData(
+    rng: np.random.Generator, profileType: str, accrualModels: list[str]
+) -> dict[str, Any]:
+    def money(low: float, high: float) -> float:
+        return round(float(rng.uniform(low, high)), 2)
+
+    def accrualModel() -> str:
+        return str(rng.choice(accrualModels))
+
+    def index() -> dict[str, Any]:
+        if rng.random() < 0.5:
+            return {"annualRate": round(float(rng.uniform(0, 0.06)), 4)}
+        rates = rng.uniform(-0.02, 0.08, int(rng.integers(1, 4)))
+        return {"annualRates": [round(float(rate), 4) for rate in rates]}
+
+    if profileType == "cash":
+        data: dict[str, Any] = {"value": money(0, 50000)}
+        if rng.random() < 0.5:
+            data["depositPriority"] = int(rng.integers(0, 3))
+            data["withdrawalPriority"] = int(rng.integers(0, 3))
+        if rng.random() < 0.3:
+            data["cap"] = money(1000, 20000)
+        return data
+    if profileType == "tax-payment":
+        brackets = [{"rate": round(float(rng.uniform(0, 0.1)), 3), "income": 0}]
+        for _ in range(int(rng.integers(0, 3))):
+            brackets.append(
+                {
+                    "rate": round(float(rng.uniform(0.1, 0.4)), 3),
+                    "income": brackets[-1]["income"] + money(10000, 50000),
+                }
+            )
+        return {
+            "frequency": str(rng.choice(["1M", "1Y", "1w"])),
+            "accrualModel": accrualModel(),
+            "brackets": brackets,
+        }
+    if profileType == "constant-growth-asset":
+        return {
+            "accrualModel": accrualModel(),
+            "initialValue": money(0, 100000),
+            "annualAppreciation": round(float(rng.uniform(-0.02, 0.1)), 4),
+        }
+    if profileType == "amortizing-loan":
+        return {
+            "accrualModel": accrualModel(),
+            "initialPrinciple": 0,
+            "loanAmount": money(10000, 300000),
+            "rate": round(float(rng.uniform(0.01, 0.08)), 4),
+            "remainingTermInYears": int(rng.integers(5, 30)),
+            "payment": -1,
+        }
+    if profileType == "constant-salaried-income":
+        return {"salary": money(10000, 150000), "accrualModel": accrualModel()}
+    if profileType == "constant-expense":
+        return {"yearlyExpense": money(1000, 60000), "accrualModel": accrualModel()}
+    if profileType == "indexed-salaried-income":
+        return {
+            "salary": money(10000, 150000),
+            "accrualModel": accrualModel(),
+            "index": index(),
+        }
+    if profileType == "indexed-expense":
+        return {
+            "yearlyExpense": money(1000, 60000),
+            "accrualModel": accrualModel(),
+            "index": index(),
+        }
+    if profileType == "home":
+        price = money(50000, 800000)
+        return {
+            "accrualModel": accrualModel(),
+            "purchasePrice": price,
+            "downPayment": round(price * float(rng.uniform(0, 0.5)), 2),
+            "rate": round(float(rng.uniform(0, 0.08)), 4),
+            "termInYears": int(rng.integers(5, 30)),
+            "annualAppreciation": round(float(rng.uniform(-0.02, 0.06)), 4),
+            "propertyTaxRate": round(float(rng.uniform(0, 0.02)), 4),
+            "maintenanceRate": round(float(rng.uniform(0, 0.02)), 4),
+        }
+    if profileType == "retirement-account":
+        data = {
+            "accrualModel": accrualModel(),
+            "initialValue": money(0, 500000),
+            "annualReturn": round(float(rng.uniform(-0.02, 0.1)), 4),
+            "contribution": money(0, 40000),
+            "contributionLimit": money(5000, 30000),
+            "employerMatch": round(float(rng.uniform(0, 1)), 2),
+            "employerMatchLimit": money(0, 10000),
+            "birthYear": int(rng.integers(1915, 1960)),
+        }
+        if rng.random() < 0.5:
+            data["index"] = index()
+        return data
+    if profileType == "lognormal-return-asset":
+        return {
+            "accrualModel": accrualModel(),
+            "initialValue": money(0, 100000),
+            "annualReturn": round(float(rng.uniform(0, 0.1)), 4),
+            "annualVolatility": round(float(rng.uniform(0, 0.3)), 4),
+            "seed": int(rng.integers(0, 2**31)),
+        }
+    if profileType == "bootstrap-return-asset":
+        returns = rng.uniform(-0.3, 0.4, int(rng.integers(1, 20)))
+        return {
+            "accrualModel": accrualModel(),
+            "initialValue": money(0, 100000),
+            "historicalReturns": [round(float(r), 4) for r in returns],
+            "seed": int(rng.integers(0, 2**31)),
+        }
+    raise KeyError(profileType)
+
+
+profileTypes = [
+    "cash",
+    "tax-payment",
+    "constant-growth-asset",
+    "amortizing-loan",
+    "constant-salaried-income",
+    "constant-expense",
+    "indexed-salaried-income",
+    "indexed-expense",
+    "home",
+    "retirement-account",
+    "lognormal-return-asset",
+    "bootstrap-return-asset",
+]
+
+
+def randomConfig(seed: int, maxSteps: int = 2000) -> ScenarioConfig:
+    """
+    A random valid scenario: a random timeline, a cash account, a handful of the other
+    built-in profile types with random accrual models, and a few scheduled updates.
+    Every profile type and accrual model comes up across seeds.
+    """
+    rng = np.random.default_rng(seed)
+    granularity = str(rng.choice(_granularities))
+    period = int(rng.integers(1, max(2, maxSteps // _maxStepsPerYear.get(granularity, 24))))
+    year, month = int(rng.integers(1990, 2030)), int(rng.integers(1, 13))
+    # semi-monthly periods must start on the 15th or the last day of a month
+    if rng.random() < 0.5:
+        day = int(rng.choice([15, monthrange(year, month)[1]]))
+        accrualModels = _accrualModels
+    else:
+        day = int(rng.integers(1, 29))
+        accrualModels = [model for model in _accrualModels if "semi" not in model]
+    timeConfig = TimeConfig(
+        granularity=parseGranularity(granularity),
+        accrualModel=parseAccrualModel(str(rng.choice(accrualModels))),
+        period=period,
+        startingDate=date(year, month, day),
+    )
+
+    def state(position: int) -> StateConfig:
+        profileType = str(rng.choice(profileTypes))
+        data = _profileData(rng, profileType, accrualModels)
+        return StateConfig(profileType, "{}{}".format(profileType, position), data)
+
+    initialState = [StateConfig("cash", "cash", _profileData(rng, "cash", accrualModels))]
+    initialState += [state(position) for position in range(int(rng.integers(1, 7)))]
+    scheduledValues = []
+    startOrdinal = timeConfig.startingDate.toordinal()
+    endOrdinal = (timeConfig.startingDate + relativedelta(years=period)).toordinal()
+    for position in range(int(rng.integers(0, 4))):
+        start, end = sorted(rng.integers(startOrdinal, endOrdinal + 30, 2))
+        scheduledValues.append(
+            ScheduledState(
+                state(len(initialState) + position),
+                date.fromordinal(int(start)),
+                date.fromordinal(int(end)),
+                False,
+            )
+        )
+    return ScenarioConfig(timeConfig, initialState, scheduledValues)
+
+
+def finalValues(events) -> dict[str, float]:
+    """
+    Every numeric attribute of every profile in a final state, as "<profile>.<name>",
+    and the state's net worth as "netWorth".
+    """
+    result = {"netWorth": netWorth(events)}
+    for name, event in events.events.items():
+        for attribute, value in vars(event).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                result["{}.{}".format(name, attribute)] = float(value)
+    return result
+
+
+def referenceEngine(config: ScenarioConfig) -> dict[str, float]:
+    """
+    The plain simulation loop, keeping every step.
+    """
+    plan = compileConfig(config)
+    history = FinanceHistory(_assembleInitialState(plan, InsolvencyPolicy.Continue))
+    _simulate(plan, history)
+    return finalValues(history.latestEvents())
+
+
+@dataclass
+class DifferentialResult(object):
+    referenceSeconds: float
+    engineSeconds: float
+    maxError: float
+
+    @property
+    def speedup(self) -> float:
+        return self.referenceSeconds / self.engineSeconds if self.engineSeconds else np.inf
+
+
+def _timed(engine: Engine, config: ScenarioConfig) -> tuple[dict[str, float], float]:
+    started = time.perf_counter()
+    result = engine(config)
+    return result, time.perf_counter() - started
+
+
+def checkEngine(
+    engine: Engine,
+    config: ScenarioConfig,
+    relativeTolerance: float = 1e-9,
+    absoluteTolerance: float = 1e-6,
+    reference: Optional[Engine] = None,
+) -> DifferentialResult:
+    """
+    Runs `config` through `reference` (referenceEngine by default) and `engine`, and
+    raises AssertionError unless every value `engine` returns matches the reference's
+    within tolerance. Returns both run times and the largest relative error.
+    """
+    expected, referenceSeconds = _timed(reference or referenceEngine, config)
+    actual, engineSeconds = _timed(engine, config)
+    maxError = 0.0
+    for name, value in actual.items():
+        if name not in expected:
+            raise AssertionError("{} is not in the reference results".format(name))
+        want = expected[name]
+        error = abs(value - want)
+        if error > absoluteTolerance + relativeTolerance * abs(want):
+            raise AssertionError("{}: expected {!r}, got {!r}".format(name, want, value))
+        maxError = max(maxError, error / max(abs(want), absoluteTolerance))
+    return DifferentialResult(referenceSeconds, engineSeconds, maxError)
@@ -1,5 +1,7 @@
 from ctypes import ArgumentError
 import re
+from dateutil.relativedelta import relativedelta
+from typing import Any, Tuple
 
 from .scheduling import AccrualModel
 
@@ -31,3 +33,54 @@ def parseAccrualModel(accrualModelStr: str) -> AccrualModel:
         return AccrualModel.PeriodicYearly
 
     raise RuntimeError("None of the supported accrual model was used")
+
+
+def parseGranularity(granularityStr: str) -> relativedelta:
+    pattern = r"(\d+)\s*(d|w|M2?|Y)"
+    match = re.match(pattern, granularityStr)
+    if not match:
+        raise ArgumentError(
+            "granularityStr must match the regex pattern {}, got {}".format(
+                pattern, granularityStr
+            )
+        )
+
+    groups = match.groups()
+    value = int(groups[0])
+    unit = groups[1]
+    if unit == "d":
+        return relativedelta(days=value)
+    if unit == "w":
+        return relativedelta(days=7 * value)
+    if unit == "M":
+        return relativedelta(months=value)
+    if unit == "M2":
+        return relativedelta(days=15 * value)
+    if unit == "Y":
+        return relativedelta(years=value)
+
+    raise RuntimeError("None of the supported units was used")
+
+
+def parseIndex(definition: Any) -> Tuple[float, ...]:
+    """
+    The yearly growth rates of an index curve. {"annualRate": r} grows by r every year;
+    {"annualRates": [r0, r1, ...]} grows by r0 in the first year, r1 in the second and
+    so on, keeping the last rate once the list runs out.
+    """
+    if isinstance(definition, dict) and set(definition) == {"annualRate"}:
+        rates = [definition["annualRate"]]
+    elif isinstance(definition, dict) and set(definition) == {"annualRates"}:
+        rates = definition["annualRates"]
+    else:
+        raise ArgumentError(
+            'an index needs exactly one of "annualRate" or "annualRates", got {!r}'.format(
+                definition
+            )
+        )
+    if not isinstance(rates, list) or len(rates) < 1:
+        raise ArgumentError("annualRates must be a non-empty list, got {!r}".format(rates))
+    for rate in rates:
+        if isinstance(rate, bool) or not isinstance(rate, (int, float)):
+            raise ArgumentError("index rates must be numbers, got {!r}".format(rate))
+    return tuple(float(rate) for rate in rates)
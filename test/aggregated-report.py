@@ -0,0 +1,85 @@
+import pytest
+from finance_sim import *
+from finance_sim.plan import compileConfig
+from finance_sim.reporting import Aggregate, _assembleInitialState, _simulate, report
+from ctypes import ArgumentError
+from datetime import date
+from dateutil.relativedelta import relativedelta
+
+initialState = [
+    StateConfig("cash", "cash", {"value": 1000}),
+    StateConfig(
+        "constant-salaried-income",
+        "salary",
+        {"salary": 12000, "accrualModel": "periodic monthly"},
+    ),
+    StateConfig(
+        "tax-payment",
+        "taxes",
+        {
+            "frequency": "1M",
+            "accrualModel": "periodic monthly",
+            "brackets": [{"rate": 0.1, "income": 0}],
+        },
+    ),
+    StateConfig(
+        "amortizing-loan",
+        "mortgage",
+        {
+            "accrualModel": "periodic monthly",
+            "initialPrinciple": 0,
+            "loanAmount": 10000,
+            "rate": 0.05,
+            "remainingTermInYears": 10,
+            "payment": -1,
+        },
+    ),
+]
+years = 5
+
+
+def _denseSteps(config):
+    plan = compileConfig(config)
+    history = FinanceHistory(_assembleInitialState(plan))
+    _simulate(plan, history)
+    return history.data[1:]
+
+
+_aggregates = {
+    "cash": Aggregate("cash"),
+    "taxes": Aggregate("taxes", "taxesPaid", "change"),
+    "interest": Aggregate("mortgage", "interestPaid", "change"),
+    "lowestCash": Aggregate("cash", how="min"),
+    "netWorth": Aggregate(),
+}
+
+
+def testYearlyAggregatesMatchDenseHistory(scenario):
+    table = report(scenario, frequency="1Y", aggregates=_aggregates)
+    steps = _denseSteps(scenario)
+    assert list(table["date"]) == [date(year, 1, 1) for year in range(2001, 2006)]
+    for row, year in zip(table.itertuples(), range(2000, 2005)):
+        inYear = [s for s in steps if date(year, 1, 1) < s.date <= date(year + 1, 1, 1)]
+        assert row.cash == pytest.approx(inYear[-1].events["cash"].value)
+        assert row.lowestCash == pytest.approx(min(s.events["cash"].value for s in inYear))
+        assert row.netWorth == pytest.approx(
+            inYear[-1].events["cash"].value + inYear[-1].events["mortgage"].netWorth()
+        )
+    last = steps[-1].events
+    assert table["taxes"].sum() == pytest.approx(last["taxes"].taxesPaid)
+    assert table["interest"].sum() == pytest.approx(last["mortgage"].interestPaid)
+    assert table["taxes"].iloc[1] == pytest.approx(1200)
+
+
+def testQuarterlyRowsAndDefaultNetWorth(scenario):
+    table = report(scenario, frequency=relativedelta(months=3))
+    assert list(table.columns) == ["date", "netWorth"]
+    assert len(table) == 20
+    assert table["date"].iloc[0] == date(2000, 4, 1)
+
+
+def testAggregatesNeedAFrequency(scenario):
+    with pytest.raises(ArgumentError):
+        report(scenario, aggregates=_aggregates)
+    with pytest.raises(ArgumentError):
+        report(scenario, frequency="1Y", aggregates={"x": Aggregate(how="median")})
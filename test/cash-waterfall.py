@@ -0,0 +1,96 @@
+import pytest
+from finance_sim import *
+from datetime import date
+
+
+def _group(*accounts):
+    return EventProfileGroup(
+        date(2000, 1, 1), {account.name: account for account in accounts}
+    )
+
+
+def testDepositsFillByPriorityUpToCaps():
+    group = _group(
+        CashEventProfile(None, "brokerage", 0, depositPriority=2),
+        CashEventProfile(None, "checking", 900, depositPriority=0, cap=1000),
+        CashEventProfile(None, "emergency", 0, depositPriority=1, cap=500),
+    )
+    addToCash(group, 2000)
+    assert group.events["checking"].value == pytest.approx(1000)
+    assert group.events["emergency"].value == pytest.approx(500)
+    assert group.events["brokerage"].value == pytest.approx(1400)
+
+
+def testOverflowGoesToLastDepositAccount():
+    group = _group(
+        CashEventProfile(None, "a", 0, depositPriority=0, cap=100),
+        CashEventProfile(None, "b", 0, depositPriority=1, cap=100),
+    )
+    addToCash(group, 300)
+    assert group.events["a"].value == pytest.approx(100)
+    assert group.events["b"].value == pytest.approx(200)
+
+
+def testWithdrawalsDrainByPriority():
+    group = _group(
+        CashEventProfile(None, "brokerage", 1000, withdrawalPriority=2),
+        CashEventProfile(None, "checking", 100, withdrawalPriority=0),
+        CashEventProfile(None, "emergency", 500, withdrawalPriority=1),
+    )
+    addToCash(group, -300)
+    assert group.events["checking"].value == 0
+    assert group.events["emergency"].value == pytest.approx(300)
+    addToCash(group, -400)
+    assert group.events["emergency"].value == 0
+    assert group.events["brokerage"].value == pytest.approx(900)
+
+
+def testRefilledAccountIsWithdrawnAgain():
+    group = _group(
+        CashEventProfile(None, "checking", 100, withdrawalPriority=0, cap=100),
+        CashEventProfile(None, "savings", 100, withdrawalPriority=1, depositPriority=1),
+    )
+    addToCash(group, -150)
+    addToCash(group, 100)
+    assert group.events["checking"].value == pytest.approx(100)
+    assert group.events["savings"].value == pytest.approx(50)
+    addToCash(group, -120)
+    assert group.events["checking"].value == 0
+    assert group.events["savings"].value == pytest.approx(30)
+
+
+def testOverdraftAndScheduledAccounts():
+    group = _group(
+        CashEventProfile(None, "savings", 50, withdrawalPriority=1),
+        CashEventProfile(None, "checking", 50, withdrawalPriority=0),
+    )
+    group.insolvencyPolicy = InsolvencyPolicy.Continue
+    addToCash(group, -150)
+    assert group.events["checking"].value == pytest.approx(-50)
+    assert group.shortfall == pytest.approx(50)
+    group.setEvent("bonus", CashEventProfile(None, "bonus", 80, withdrawalPriority=-1))
+    addToCash(group, -30)
+    assert group.events["bonus"].value == pytest.approx(50)
+
+
+def testTaxableDeposit():
+    group = _group(CashEventProfile(None, "cash", 0))
+    tax = TaxPaymentEventProfile(None, "tax", brackets=[TaxBracket(0.1, 0)])
+    group.setEvent("tax", tax)
+    addToCash(group, 100)
+    addToCash(group, 50, taxable=False)
+    assert tax.taxableIncome == pytest.approx(100)
+    assert group.events["cash"].value == pytest.approx(150)
+
+
+def testManyAccounts():
+    accounts = [
+        CashEventProfile(None, str(index), 10, withdrawalPriority=index % 97, cap=20)
+        for index in range(20000)
+    ]
+    group = _group(*accounts)
+    for _ in range(2000):
+        addToCash(group, -15)
+        addToCash(group, 5)
+    total = sum(account.value for account in accounts)
+    assert total == pytest.approx(20000 * 10 - 2000 * 10)
@@ -0,0 +1,120 @@
+import pytest
+from finance_sim import *
+from finance_sim.reporting import Aggregate, compare, report
+from ctypes import ArgumentError
+from copy import deepcopy
+from datetime import date
+from dateutil.relativedelta import relativedelta
+
+initialState = [
+    StateConfig("cash", "cash", {"value": 30000}),
+    StateConfig(
+        "constant-expense",
+        "rent",
+        {"yearlyExpense": 1200, "accrualModel": "periodic monthly"},
+    ),
+]
+scheduledValues = [
+    ScheduledState(
+        StateConfig(
+            "constant-salaried-income",
+            "salary",
+            {"salary": 600, "accrualModel": "periodic monthly"},
+        ),
+        date(2010, 1, 1),
+        date(2030, 1, 1),
+        False,
+    )
+]
+years = 20
+
+
+def _scenarios(base):
+    late = deepcopy(base)
+    late.scheduledValues[0].startDate = date(2015, 1, 1)
+    return {
+        "base": base,
+        "raise": withConfigValue(base, "scheduledStateUpdates.salary.salary", 900),
+        "same": deepcopy(base),
+        "late": late,
+    }
+
+
+def testComparisonSharesPrefixes(scenario):
+    table = compare(_scenarios(scenario))
+    steps = len(table)
+    assert steps == 239
+    # everything shares 2000-2010, where "base" and "same" start the salary together
+    shared = 119
+    assert table.attrs["simulatedSteps"] == shared + 3 * (steps - shared)
+    assert list(table.columns) == [
+        "date",
+        "base.netWorth",
+        "raise.netWorth",
+        "same.netWorth",
+        "late.netWorth",
+        "raise.netWorth.delta",
+        "same.netWorth.delta",
+        "late.netWorth.delta",
+    ]
+    assert (table["same.netWorth.delta"] == 0).all()
+    assert (table["raise.netWorth.delta"].iloc[:shared] == 0).all()
+    assert table["raise.netWorth.delta"].iloc[-1] == pytest.approx(120 * 25)
+
+
+def testComparisonMatchesSeparateReports(scenario):
+    aggregates = {"cash": Aggregate("cash"), "salary": Aggregate("salary", "salary")}
+    table = compare(_scenarios(scenario), frequency="1Y", aggregates=aggregates)
+    for name, config in _scenarios(scenario).items():
+        alone = report(config, frequency="1Y", aggregates=aggregates)
+        assert list(alone["date"]) == list(table["date"])
+        assert list(alone["cash"]) == pytest.approx(list(table[name + ".cash"]))
+    assert table["raise.salary.delta"].iloc[12] == 300
+    assert table["late.salary"].isna().iloc[12]
+    assert table["late.salary.delta"].iloc[16] == 0
+
+
+def testInsolventScenarioEndsEarly(scenario):
+    broke = withConfigValue(scenario, "scheduledStateUpdates.salary.salary", 0)
+    broke = withConfigValue(broke, "initialState.cash.value", 100)
+    table = compare({"base": scenario, "broke": broke}, InsolvencyPolicy.Stop)
+    assert table.attrs["insolvencyDates"] == {"base": None, "broke": date(2000, 3, 1)}
+    assert table["broke.netWorth"].isna().sum() == len(table) - 2
+
+
+def testStepComparisonNeedsOneTimeline(scenario):
+    other = withConfigValue(scenario, "time.period", 10)
+    with pytest.raises(ArgumentError):
+        compare({"base": scenario, "short": other})
+    assert len(compare({"base": scenario, "short": other}, frequency="1Y")) == 20
+
+
+def _proRata(months):
+    return ScenarioConfig(
+        TimeConfig(relativedelta(months=months), AccrualModel.ProRata, 2, date(2000, 1, 1)),
+        [
+            StateConfig("cash", "cash", {"value": 30000}),
+            StateConfig(
+                "constant-expense",
+                "rent",
+                {"yearlyExpense": 1200, "accrualModel": "pro rata"},
+            ),
+        ],
+        [],
+    )
+
+
+def testMixedGranularitiesLineUpByDate():
+    table = compare({"monthly": _proRata(1), "coarse": _proRata(6)}, frequency="1M")
+    assert len(table) == 23
+    rows = table.set_index("date")
+    alone = report(_proRata(6), frequency="1M")
+    monthly = report(_proRata(1), frequency="1M").set_index("date")
+    assert list(alone["date"]) == [date(2000 + m // 12, m % 12 + 1, 1) for m in (6, 12, 18)]
+    for rowDate, worth in zip(alone["date"], alone["netWorth"]):
+        assert rows.loc[rowDate, "coarse.netWorth"] == pytest.approx(worth)
+        assert rows.loc[rowDate, "coarse.netWorth.delta"] == pytest.approx(
+            worth - monthly.loc[rowDate, "netWorth"]
+        )
+    # the coarse run has no steps in the months between its own
+    assert rows["coarse.netWorth"].isna().sum() == 23 - len(alone)
@@ -0,0 +1,110 @@
+import sys
+import threading
+import time
+import pytest
+import finance_sim.registry
+from finance_sim import *
+from finance_sim.ledger import Ledger
+from finance_sim.plan import compileConfig
+from finance_sim.reporting import Aggregate, _simulateFinal, report
+from finance_sim.registry import ProfileRegistry
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+
+@pytest.fixture(autouse=True)
+def frequentSwitches():
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+initialState = [
+    StateConfig("cash", "cash", {"value": 1000}),
+    StateConfig(
+        "constant-salaried-income",
+        "salary",
+        {"salary": 10000, "accrualModel": "periodic monthly"},
+    ),
+    StateConfig(
+        "lognormal-return-asset",
+        "stocks",
+        {
+            "accrualModel": "periodic monthly",
+            "initialValue": 5000,
+            "annualReturn": 0.06,
+            "annualVolatility": 0.2,
+            "seed": 0,
+        },
+    ),
+]
+scheduledValues = [
+    ScheduledState(
+        StateConfig(
+            "constant-expense",
+            "rent",
+            {"yearlyExpense": 6000, "accrualModel": "periodic monthly"},
+        ),
+        date(2003, 1, 1),
+        date(2008, 1, 1),
+        False,
+    )
+]
+
+
+def _variant(config, index):
+    config = withConfigValue(config, "initialState.salary.salary", 10000 + 1000 * index)
+    return withConfigValue(config, "initialState.stocks.seed", index)
+
+
+def _run(config):
+    ledger = Ledger()
+    table = report(config, frequency="1Y", aggregates={"netWorth": Aggregate()})
+    report(config, ledger=ledger)
+    return list(table["netWorth"]), ledger.summary().to_dict()
+
+
+def testConcurrentRunsMatchSerialRuns(scenario):
+    configs = [_variant(scenario, index) for index in range(8)] * 4
+    serial = [_run(config) for config in configs]
+    with ThreadPoolExecutor(8) as executor:
+        concurrent = list(executor.map(_run, configs))
+    assert concurrent == serial
+
+
+def testThreadsShareOnePlan(scenario):
+    plan = compileConfig(scenario)
+
+    def finalNetWorth(_):
+        return netWorth(_simulateFinal(plan, InsolvencyPolicy.Raise).latestEvents())
+
+    expected = finalNetWorth(None)
+    with ThreadPoolExecutor(8) as executor:
+        assert set(executor.map(finalNetWorth, range(32))) == {expected}
+
+
+def testConcurrentPluginLookupLoadsOnce(monkeypatch):
+    loads = []
+
+    class SlowEntryPoint(object):
+        name = "slow-cash"
+
+        def load(self):
+            loads.append(threading.get_ident())
+            time.sleep(0.05)
+            return CashEventProfile
+
+    monkeypatch.setattr(
+        finance_sim.registry, "entry_points", lambda group: [SlowEntryPoint()]
+    )
+    registry = ProfileRegistry(AbstractEventProfile, "finance_sim.event_profiles")
+    with ThreadPoolExecutor(8) as executor:
+        types = list(executor.map(lambda _: registry["slow-cash"], range(8)))
+    assert types == [CashEventProfile] * 8
+    assert len(loads) == 1
+
+
+def testFinanceStateDefaultsToToday():
+    assert FinanceState().date == date.today()
+    assert FinanceState(date(2000, 1, 1)).date == date(2000, 1, 1)
@@ -22,7 +22,11 @@ def testParseConfigInitialState():
     assert config.initialState[0].data == {"value": 100}
     assert config.initialState[1].type == "constant-growth-asset"
     assert config.initialState[1].name == "CD Savings"
-    assert config.initialState[1].data == {"value": 500, "appreciation": 0.05}
+    assert config.initialState[1].data == {
+        "accrualModel": "periodic monthly",
+        "initialValue": 500,
+        "annualAppreciation": 0.05,
+    }
     # todo: add appreciation
 
 
@@ -0,0 +1,42 @@
+import pytest
+from copy import deepcopy
+from datetime import date
+from dateutil.relativedelta import relativedelta
+from finance_sim import *
+
+
+def _monthlyScenario(
+    initialState, scheduledValues=(), years=10, startingDate=date(2000, 1, 1), **sections
+):
+    return ScenarioConfig(
+        TimeConfig(
+            relativedelta(months=1), AccrualModel.PeriodicMonthly, years, startingDate
+        ),
+        deepcopy(list(initialState)),
+        deepcopy(list(scheduledValues)),
+        **deepcopy(sections),
+    )
+
+
+@pytest.fixture
+def monthlyScenario():
+    """
+    Builds a scenario stepping monthly for `years` from `startingDate`; keyword
+    sections like `indices` and `sweep` are passed through.
+    """
+    return _monthlyScenario
+
+
+@pytest.fixture
+def scenario(request):
+    """
+    The test module's monthly scenario, built afresh from its `initialState` and
+    optional `scheduledValues`, `years` and `indices`.
+    """
+    module = request.module
+    return _monthlyScenario(
+        module.initialState,
+        getattr(module, "scheduledValues", ()),
+        getattr(module, "years", 10),
+        indices=getattr(module, "indices", {}),
+    )
@@ -0,0 +1,88 @@
+import pytest
+from finance_sim import *
+from finance_sim.plan import compileConfig
+from finance_sim.reporting import (
+    Aggregate,
+    _assembleInitialState,
+    _simulate,
+    _simulateFinal,
+    compare,
+    report,
+    simulateFinal,
+)
+from finance_sim.testing import checkEngine, finalValues, profileTypes, randomConfig
+from copy import deepcopy
+from datetime import date
+
+seeds = range(24)
+
+
+def sparseEngine(config):
+    plan = compileConfig(config)
+    history = SparseFinanceHistory(_assembleInitialState(plan, InsolvencyPolicy.Continue))
+    _simulate(plan, history)
+    return finalValues(history.latestEvents())
+
+
+def latestEngine(config):
+    history = _simulateFinal(compileConfig(config), InsolvencyPolicy.Continue)
+    return finalValues(history.latestEvents())
+
+
+def resumedEngine(config):
+    plan = compileConfig(config)
+    history = LatestFinanceHistory(_assembleInitialState(plan, InsolvencyPolicy.Continue))
+    middle = len(plan.timeline) // 2
+    _simulate(plan, history, stop=middle)
+    resumed = LatestFinanceHistory(history.latestEvents().copy())
+    _simulate(plan, resumed, start=middle)
+    return finalValues(resumed.latestEvents())
+
+
+def branchedEngine(config):
+    # a second scenario that differs from the middle on makes compare() fork the run
+    plan = compileConfig(config)
+    middle = date.fromordinal(plan.timeline.ordinals[len(plan.timeline) // 2])
+    other = deepcopy(config)
+    other.scheduledValues.append(
+        ScheduledState(StateConfig("cash", "spare", {"value": 0}), middle, date.max, False)
+    )
+    table = compare({"base": config, "other": other}, InsolvencyPolicy.Continue)
+    return {"netWorth": table["base.netWorth"].iloc[-1]}
+
+
+def inPlaceEngine(config):
+    return finalValues(simulateFinal(config, InsolvencyPolicy.Continue).events)
+
+
+def aggregatedEngine(config):
+    table = report(config, InsolvencyPolicy.Continue, "1Y", {"netWorth": Aggregate()})
+    return {"netWorth": table["netWorth"].iloc[-1]}
+
+
+engines = {
+    "sparse": sparseEngine,
+    "latest": latestEngine,
+    "resumed": resumedEngine,
+    "branched": branchedEngine,
+    "aggregated": aggregatedEngine,
+    "inPlace": inPlaceEngine,
+}
+
+
+def testRandomConfigsCoverEveryProfileType():
+    configs = [randomConfig(seed, maxSteps=1000) for seed in seeds]
+    states = [
+        s for c in configs for s in c.initialState + [u.state for u in c.scheduledValues]
+    ]
+    assert {state.type for state in states} == set(profileTypes)
+    assert {c.time.accrualModel for c in configs} == set(AccrualModel)
+    assert randomConfig(7) == randomConfig(7)
+
+
+@pytest.mark.parametrize("engine", list(engines))
+@pytest.mark.parametrize("seed", seeds)
+def testEngineMatchesReference(engine, seed, record_property):
+    result = checkEngine(engines[engine], randomConfig(seed, maxSteps=1000))
+    record_property("speedup", result.speedup)
+    record_property("maxError", result.maxError)
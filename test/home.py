@@ -0,0 +1,157 @@
+import pytest
+from finance_sim import *
+from finance_sim.config import sweepVariants
+from finance_sim.ledger import Ledger
+from finance_sim.plan import compileConfig
+from finance_sim.reporting import _assembleInitialState, _simulate, report, simulateFinal
+from datetime import date
+from dateutil.relativedelta import relativedelta
+
+
+def _home(**overrides):
+    data = {
+        "accrualModel": "periodic monthly",
+        "purchasePrice": 300000,
+        "downPayment": 60000,
+        "rate": 0.05,
+        "termInYears": 20,
+        "annualAppreciation": 0.03,
+    }
+    data.update(overrides)
+    return StateConfig("home", "home", data)
+
+
+def testHomeMatchesLoanAndAsset(monthlyScenario):
+    home = monthlyScenario(
+        [StateConfig("cash", "cash", {"value": 500000}), _home()], years=5
+    )
+    separate = monthlyScenario(
+        [
+            StateConfig("cash", "cash", {"value": 440000}),
+            StateConfig(
+                "amortizing-loan",
+                "loan",
+                {
+                    "accrualModel": "periodic monthly",
+                    "initialPrinciple": 0,
+                    "loanAmount": 240000,
+                    "rate": 0.05,
+                    "remainingTermInYears": 20,
+                    "payment": -1,
+                },
+            ),
+            StateConfig(
+                "constant-growth-asset",
+                "house",
+                {
+                    "accrualModel": "periodic monthly",
+                    "initialValue": 300000,
+                    "annualAppreciation": 0.03,
+                },
+            ),
+        ],
+        years=5,
+    )
+    combined = simulateFinal(home)
+    expected = simulateFinal(separate)
+    event = combined.events.events["home"]
+    loan = expected.events.events["loan"]
+    assert isinstance(event, HomeProfile) and isinstance(loan, AmortizingLoan)
+    assert event.value == pytest.approx(expected.values["house"])
+    assert event.balance == pytest.approx(loan.loanAmount - loan.principle)
+    assert event.interestPaid == pytest.approx(loan.interestPaid)
+    assert combined.values["cash"] == pytest.approx(expected.values["cash"])
+    assert combined.netWorth == pytest.approx(expected.netWorth)
+
+
+def testNoEquityBeforeThePurchase(monthlyScenario):
+    config = monthlyScenario(
+        [StateConfig("cash", "cash", {"value": 100000}), _home(rate=0)], years=1
+    )
+    plan = compileConfig(config)
+    history = FinanceHistory(_assembleInitialState(plan))
+    _simulate(plan, history, stop=1)
+    assert netWorth(history.data[0]) == 100000
+    # the down payment moves from cash into equity; the first payment is all principal
+    assert netWorth(history.data[1]) == pytest.approx(
+        100000 + 300000 * (1.03 ** (1 / 12) - 1)
+    )
+
+
+def testOneCashMovementPerStep(monthlyScenario):
+    ledger = Ledger()
+    config = monthlyScenario(
+        [
+            StateConfig("cash", "cash", {"value": 100000}),
+            _home(rate=0, termInYears=10, propertyTaxRate=0.01, maintenanceRate=0.01),
+        ],
+        years=1,
+    )
+    report(config, ledger=ledger)
+    amounts = ledger.frame()["amount"]
+    assert len(amounts) == 11
+    # 240000 over 120 months, plus 2% a year of the value at the start of each month
+    assert amounts[0] == pytest.approx(-60000 - 2000 - 300000 * 0.02 / 12)
+    value = 300000 * 1.03 ** (1 / 12)
+    assert amounts[1] == pytest.approx(-2000 - value * 0.02 / 12)
+
+
+def testMortgageStopsWhenPaidOff(monthlyScenario):
+    config = monthlyScenario(
+        [StateConfig("cash", "cash", {"value": 400000}), _home(termInYears=2)],
+        years=3,
+    )
+    final = simulateFinal(config)
+    event = final.events.events["home"]
+    assert event.balance == 0
+    schedule = event.schedule
+    assert (schedule["payment"][24:] == 0).all()
+    assert schedule["payment"][:24].sum() == pytest.approx(
+        240000 + schedule["interest"].sum()
+    )
+    assert final.netWorth == pytest.approx(
+        400000 - 60000 - schedule["payment"].sum() + 300000 * 1.03 ** (35 / 12)
+    )
+
+
+def testScheduledPurchaseStartsAtActivation(monthlyScenario):
+    ledger = Ledger()
+    config = monthlyScenario(
+        [StateConfig("cash", "cash", {"value": 100000})],
+        [ScheduledState(_home(rate=0), date(2001, 1, 1), date(2010, 1, 1), False)],
+        years=2,
+    )
+    report(config, ledger=ledger)
+    frame = ledger.frame()
+    purchase = frame[frame["source"] == "home"]
+    assert list(purchase["amount"]) == pytest.approx([-60000 - 1000] + [-1000] * 11)
+
+
+def testSweepOverPriceAndRate(monthlyScenario):
+    config = monthlyScenario(
+        [StateConfig("cash", "cash", {"value": 500000}), _home()],
+        years=5,
+        sweep={
+            "initialState.home.purchasePrice": [250000, 300000],
+            "initialState.home.rate": [0.04, 0.06],
+        },
+    )
+    worths = {
+        tuple(point.values.values()): simulateFinal(point.config).netWorth
+        for point in sweepVariants(config)
+    }
+    assert len(worths) == 4
+    # a higher rate costs more interest at either price
+    assert worths[(250000, 0.04)] > worths[(250000, 0.06)]
+    assert worths[(300000, 0.04)] > worths[(300000, 0.06)]
+
+
+def testUnpreparedHomeRaises():
+    home = HomeProfile(None, "home", purchasePrice=100000, downPayment=20000)
+    history = FinanceHistory(
+        EventProfileGroup(
+            date(2000, 1, 1), {"home": home, "cash": CashEventProfile(None, "cash", 0)}
+        )
+    )
+    with pytest.raises(RuntimeError):
+        history.passEvent(date(2000, 2, 1), relativedelta(months=1))
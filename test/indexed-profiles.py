@@ -0,0 +1,120 @@
+import pytest
+from finance_sim import *
+from finance_sim.ledger import Ledger
+from finance_sim.plan import compileConfig
+from finance_sim.reporting import _assembleInitialState, _simulate, report
+from finance_sim.sensitivity import numericConfigPaths, sensitivities
+from ctypes import ArgumentError
+from datetime import date
+from dateutil.relativedelta import relativedelta
+
+initialState = [
+    StateConfig("cash", "cash", {"value": 1000}),
+    StateConfig(
+        "indexed-salaried-income",
+        "salary",
+        {"salary": 12000, "accrualModel": "periodic monthly", "index": "wages"},
+    ),
+    StateConfig(
+        "indexed-expense",
+        "rent",
+        {
+            "yearlyExpense": 6000,
+            "accrualModel": "periodic monthly",
+            "index": {"annualRates": [0.1, 0.0]},
+        },
+    ),
+]
+scheduledValues = [
+    ScheduledState(
+        StateConfig(
+            "indexed-expense",
+            "insurance",
+            {
+                "yearlyExpense": 1200,
+                "accrualModel": "periodic yearly",
+                "index": "wages",
+            },
+        ),
+        date(2002, 6, 1),
+        date(2010, 1, 1),
+        False,
+    )
+]
+years = 5
+indices = {"wages": {"annualRate": 0.03}}
+
+
+def testIndexedAmountsGrowOnAnniversaries(scenario):
+    ledger = Ledger()
+    report(scenario, ledger=ledger)
+    summary = ledger.summary("1Y")
+    # the first year has 11 monthly steps after the start, the anniversary step is raised
+    assert list(summary.loc["salary"]) == pytest.approx(
+        [11000 + 1030, 11 * 1030 + 1000 * 1.03**2, 11 * 1000 * 1.03**2 + 1000 * 1.03**3]
+        + [11 * 1000 * 1.03**3 + 1000 * 1.03**4, 11 * 1000 * 1.03**4]
+    )
+    assert list(summary.loc["rent"]) == pytest.approx([-5500 - 550] + [-6600] * 3 + [-6050])
+    # scheduled late, but still indexed from the start of the simulation
+    assert list(summary.loc["insurance"]) == pytest.approx(
+        [0, 0, -1200 * 1.03**3, -1200 * 1.03**4, 0]
+    )
+
+
+def testCurvesAreComputedOncePerTimeline(scenario):
+    timeline = compileConfig(scenario).timeline
+    curve = timeline.indexCurve((0.03,))
+    assert timeline.indexCurve((0.03,)) is curve
+    assert len(curve) == len(timeline)
+    assert curve[10] == 1 and curve[11] == pytest.approx(1.03)
+    assert not curve.flags.writeable
+
+
+def testUnknownIndexIsReported(scenario):
+    scenario.indices = {}
+    with pytest.raises(RuntimeError, match="index wages is not defined"):
+        compileConfig(scenario)
+    scenario.indices = {"wages": {"annualRate": "three percent"}}
+    with pytest.raises(RuntimeError, match="indices wages"):
+        compileConfig(scenario)
+
+
+def testUnpreparedProfileRaises():
+    salary = IndexedSalariedIncome(None, "salary", 12000)
+    history = FinanceHistory(
+        EventProfileGroup(
+            date(2000, 1, 1), {"salary": salary, "cash": CashEventProfile(None, "cash")}
+        )
+    )
+    with pytest.raises(RuntimeError):
+        history.passEvent(date(2000, 2, 1), relativedelta(months=1))
+
+
+def testReportsAndSparseHistoryFollowTheLevel(scenario):
+    salary = report(scenario)[2]
+    assert float(salary.iloc[0]) == 12000
+    assert float(salary.iloc[-1]) == pytest.approx(12000 * 1.03**4)
+    plan = compileConfig(scenario)
+    history = SparseFinanceHistory(_assembleInitialState(plan))
+    _simulate(plan, history)
+    # one snapshot to start with and one per anniversary, not one per month
+    assert len(history.columns["salary"].steps) == 5
+
+
+def testSharedIndexRatesAreConfigPaths(scenario):
+    config = withConfigValue(scenario, "indices.wages.annualRate", 0.05)
+    assert getConfigValue(config, "indices.wages.annualRate") == 0.05
+    assert getConfigValue(scenario, "indices.wages.annualRate") == 0.03
+    config.indices["cpi"] = {"annualRates": [0.02, 0.04]}
+    config = withConfigValue(config, "indices.cpi.annualRates.1", 0.03)
+    assert config.indices["cpi"] == {"annualRates": [0.02, 0.03]}
+    with pytest.raises(ArgumentError):
+        getConfigValue(config, "indices.rates.annualRate")
+    paths = numericConfigPaths(config)
+    assert paths[-3:] == [
+        "indices.wages.annualRate",
+        "indices.cpi.annualRates.0",
+        "indices.cpi.annualRates.1",
+    ]
+    table = sensitivities(scenario).set_index("path")
+    assert table.loc["indices.wages.annualRate", "sensitivity"] > 0
@@ -0,0 +1,62 @@
+import pytest
+from finance_sim import *
+from finance_sim.reporting import report, simulateBatch, simulateFinal
+from datetime import date
+
+initialState = [
+    StateConfig("cash", "cash", {"value": 250}),
+    StateConfig(
+        "constant-expense",
+        "rent",
+        {"yearlyExpense": 1200, "accrualModel": "periodic monthly"},
+    ),
+]
+years = 2
+
+
+def testInsolvencyRaises(scenario):
+    with pytest.raises(RuntimeError):
+        report(scenario)
+
+
+def testInsolvencyStop(scenario):
+    result = report(scenario, InsolvencyPolicy.Stop)
+    assert result.attrs["insolvencyDate"] == date(2000, 4, 1)
+    assert len(result) == 4
+    assert float(result.iloc[-1, 1]) == pytest.approx(-50)
+
+
+def testInsolvencyContinue(scenario):
+    result = report(scenario, InsolvencyPolicy.Continue)
+    assert result.attrs["insolvencyDate"] == date(2000, 4, 1)
+    assert len(result) == 24
+    assert float(result.iloc[-1, 1]) == pytest.approx(250 - 2300)
+
+
+def testSolventReport(scenario):
+    result = report(withConfigValue(scenario, "initialState.cash.value", 5000))
+    assert result.attrs["insolvencyDate"] is None
+
+
+def testBatchInsolvencyMask(scenario):
+    cash = "initialState.cash.value"
+    batch = simulateBatch(
+        [
+            withConfigValue(scenario, cash, 5000),
+            scenario,
+            withConfigValue(scenario, cash, 1000),
+        ]
+    )
+    assert list(batch.insolvent) == [False, True, True]
+    assert batch.insolvencyDates == [None, date(2000, 4, 1), date(2000, 12, 1)]
+    assert batch.finalEvents[0].events["cash"].value == pytest.approx(5000 - 2300)
+    assert batch.finalEvents[1].date == date(2000, 4, 1)
+
+
+def testEntryPointsRaiseByDefault(scenario):
+    with pytest.raises(RuntimeError):
+        simulateFinal(scenario)
+    raised = simulateBatch([scenario], InsolvencyPolicy.Raise)
+    stopped = simulateBatch([scenario], InsolvencyPolicy.Stop)
+    assert list(raised.insolvent) == [True]
+    assert raised.insolvencyDates == stopped.insolvencyDates == [date(2000, 4, 1)]
@@ -0,0 +1,68 @@
+import pytest
+import numpy as np
+from finance_sim import *
+from finance_sim.ledger import Ledger
+from finance_sim.reporting import Aggregate, report
+from datetime import date
+
+initialState = [
+    StateConfig("cash", "checking", {"value": 100, "cap": 500}),
+    StateConfig("cash", "savings", {"value": 0}),
+    StateConfig(
+        "constant-salaried-income",
+        "salary",
+        {"salary": 12000, "accrualModel": "periodic monthly"},
+    ),
+    StateConfig(
+        "constant-expense",
+        "rent",
+        {"yearlyExpense": 6000, "accrualModel": "periodic monthly"},
+    ),
+    StateConfig(
+        "tax-payment",
+        "taxes",
+        {
+            "frequency": "1M",
+            "accrualModel": "periodic monthly",
+            "brackets": [{"rate": 0.1, "income": 0}],
+        },
+    ),
+]
+years = 3
+
+
+def testLedgerAccountsForEveryCashMovement(scenario):
+    ledger = Ledger(capacity=4)
+    table = report(scenario, ledger=ledger)
+    records = ledger.records
+    assert len(ledger) > 4
+    assert records["step"][0] == 0 and records["step"][-1] == 34
+    summary = ledger.summary()
+    assert summary.loc["salary", "amount"] == pytest.approx(35 * 1000)
+    assert summary.loc["rent", "amount"] == pytest.approx(-35 * 500)
+    assert summary.loc["taxes", "amount"] == pytest.approx(-35 * 100)
+    assert "checking" not in summary.index
+    final = report(scenario, frequency="3Y", aggregates={"cash": Aggregate()})
+    assert 100 + records["amount"].sum() == pytest.approx(final["cash"].iloc[-1])
+
+
+def testLedgerRecordsDestinationsAndTaxability(scenario):
+    ledger = Ledger()
+    report(scenario, ledger=ledger)
+    frame = ledger.frame()
+    salary = frame[frame["source"] == "salary"]
+    assert set(salary["destination"]) == {"checking", "savings"}
+    assert salary["taxable"].all()
+    assert not frame[frame["source"] == "rent"]["taxable"].any()
+    assert frame.groupby("destination", observed=True)["amount"].sum()[
+        "savings"
+    ] == pytest.approx(35 * 1000 - 35 * 600 - 400, rel=0.05)
+
+
+def testLedgerSummaryPerPeriod(scenario):
+    ledger = Ledger()
+    report(scenario, ledger=ledger)
+    summary = ledger.summary("1Y")
+    assert list(summary.columns) == [date(2001, 1, 1), date(2002, 1, 1), date(2003, 1, 1)]
+    assert list(summary.loc["salary"]) == pytest.approx([12000, 12000, 11000])
+    assert np.allclose(summary.sum(axis=1), ledger.summary()["amount"])
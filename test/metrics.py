@@ -0,0 +1,97 @@
+import threading
+import pytest
+from finance_sim import *
+from finance_sim.metrics import PrometheusMetrics, currentSink, setMetricsSink
+from finance_sim.reporting import report
+from datetime import date
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+
+@pytest.fixture
+def sink():
+    sink = PrometheusMetrics()
+    previous = setMetricsSink(sink)
+    yield sink
+    setMetricsSink(previous)
+
+
+initialState = [
+    StateConfig("cash", "cash", {"value": 100}),
+    StateConfig(
+        "constant-expense",
+        "rent",
+        {"yearlyExpense": 600, "accrualModel": "periodic monthly"},
+    ),
+]
+scheduledValues = [
+    ScheduledState(
+        StateConfig("cash", "gift", {"value": 50}),
+        date(2001, 1, 1),
+        date(2003, 1, 1),
+        False,
+    )
+]
+years = 2
+
+
+def testRunMetrics(scenario, sink):
+    report(scenario, InsolvencyPolicy.Continue)
+    assert sink.counter("finance_sim_runs_total") == 1
+    assert sink.counter("finance_sim_steps_total") == 23
+    assert sink.counter("finance_sim_scheduled_activations_total") == 1
+    assert sink.counter("finance_sim_insolvencies_total") == 1
+    assert (
+        sink.counter(
+            "finance_sim_precomputed_lookups_total", table="timeline", outcome="built"
+        )
+        == 1
+    )
+    total, count = sink.histogram("finance_sim_profiles_per_step")
+    assert count == 1 and total == pytest.approx((11 * 2 + 12 * 3) / 23)
+    assert sink.histogram("finance_sim_steps_per_second")[1] == 1
+    assert sink.histogram("finance_sim_report_seconds", kind="report")[1] == 1
+
+
+def testPrometheusExposition(scenario, sink, tmp_path):
+    report(scenario, InsolvencyPolicy.Continue)
+    text = sink.exposition()
+    assert "# TYPE finance_sim_steps_total counter\nfinance_sim_steps_total 23\n" in text
+    assert "# TYPE finance_sim_run_seconds histogram" in text
+    assert 'finance_sim_run_seconds_bucket{le="+Inf"} 1\n' in text
+    assert 'finance_sim_report_seconds_count{kind="report"} 1\n' in text
+    assert (
+        'finance_sim_precomputed_lookups_total{outcome="built",table="timeline"} 1\n'
+        in text
+    )
+    path = tmp_path / "finance_sim.prom"
+    sink.writeTextFile(str(path))
+    assert path.read_text() == text
+
+
+def testPushToEndpoint(sink):
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_PUT(self):
+            received.append(self.rfile.read(int(self.headers["Content-Length"])).decode())
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.handle_request)
+    thread.start()
+    sink.increment("finance_sim_runs_total")
+    sink.push("http://127.0.0.1:{}/metrics/job/finance_sim".format(server.server_port))
+    thread.join()
+    server.server_close()
+    assert received == [sink.exposition()]
+
+
+def testNothingIsMeasuredWithoutASink(scenario):
+    assert currentSink() is None
+    sink = PrometheusMetrics()
+    report(scenario, InsolvencyPolicy.Continue)
+    assert sink.exposition() == "\n"
@@ -0,0 +1,92 @@
+import dataclasses
+import pytest
+from finance_sim import *
+from finance_sim.plan import compileConfig, validateConfig
+from finance_sim.reporting import report
+from datetime import date
+from dateutil.relativedelta import relativedelta
+
+
+def testExampleConfigRuns():
+    result = report(parseConfig("examples/finance-config.yaml"))
+    assert len(result) == 360
+    assert float(result.iloc[0, 1]) == 100
+    assert float(result.iloc[-1, 2]) == pytest.approx(500 * 1.05 ** (359 / 12), abs=0.01)
+
+
+def testAllErrorsReportedUpFront(monthlyScenario):
+    config = monthlyScenario(
+        [
+            StateConfig("cash", "cash", {"value": 100}),
+            StateConfig(
+                "constant-growth-asset", "cd", {"value": 500, "appreciation": 0.05}
+            ),
+            StateConfig("lottery", "ticket", {}),
+        ],
+        [
+            ScheduledState(
+                StateConfig(
+                    "constant-expense",
+                    "rent",
+                    {"yearlyExpense": "a lot", "accrualModel": "periodic hourly"},
+                ),
+                date(2025, 1, 1),
+                date(2026, 1, 1),
+                False,
+            )
+        ],
+    )
+    errors = validateConfig(config)
+    assert 'initialState[1] cd: missing required key "initialValue"' in errors
+    assert 'initialState[1] cd: unknown key "appreciation"' in errors
+    assert "initialState[2] ticket: lottery is not a valid event type" in errors
+    assert len([error for error in errors if error.startswith("scheduled")]) == 2
+    with pytest.raises(RuntimeError, match="invalid configuration"):
+        compileConfig(config)
+
+
+def testTaxPaymentFromConfig(monthlyScenario):
+    data = {
+        "frequency": "1Y",
+        "accrualModel": "periodic yearly",
+        "brackets": [{"rate": 0.1, "income": 0}, {"rate": 0.2, "income": 1000}],
+    }
+    assert validateConfig(monthlyScenario([StateConfig("tax-payment", "tax", data)])) == []
+    tax = TaxPaymentEventProfile(data, "tax")
+    assert tax.frequency == relativedelta(years=1)
+    assert tax.brackets[1] == TaxBracket(0.2, 1000)
+    data["brackets"] = [{"rate": 0.1, "income": 10}]
+    assert (
+        len(validateConfig(monthlyScenario([StateConfig("tax-payment", "tax", data)]))) == 1
+    )
+
+
+def testPlanSchedule(monthlyScenario):
+    expense = {"yearlyExpense": 12, "accrualModel": "periodic monthly"}
+    config = monthlyScenario(
+        [StateConfig("cash", "cash", {"value": 100})],
+        [
+            ScheduledState(
+                StateConfig("constant-expense", "rent", expense),
+                date(2000, 3, 15),
+                date(2001, 1, 1),
+                False,
+            ),
+            ScheduledState(
+                StateConfig("constant-expense", "never", expense),
+                date(2001, 1, 1),
+                date(2000, 1, 1),
+                False,
+            ),
+        ],
+    )
+    plan = compileConfig(config)
+    assert plan.slots == ("cash", "rent", "never")
+    assert [step for step in plan.changes] == [2, 11]
+    assert plan.changes[2][0].activate
+    assert plan.timeline.dates()[2] == date(2000, 4, 1)
+    assert not plan.changes[11][0].activate
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        plan.slots = ()
+    config.initialState[0].data["value"] = 0
+    assert plan.initialProfiles[0].instantiate().value == 100
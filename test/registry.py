@@ -0,0 +1,91 @@
+import sys
+import pytest
+import finance_sim.registry
+from finance_sim import *
+from finance_sim.registry import ProfileRegistry
+from importlib.metadata import EntryPoint
+
+_plugin = """
+from finance_sim import AbstractEventProfile
+
+
+class Lottery(AbstractEventProfile):
+    def __init__(self, config, name, prize=0):
+        self.name = name
+        self.prize = prize if config is None else config["prize"]
+
+    def transform(self, history, date, delta):
+        pass
+
+    def copy(self):
+        return Lottery(None, self.name, self.prize)
+
+
+class MissingCopy(AbstractEventProfile):
+    def __init__(self, config, name):
+        self.name = name
+
+    def transform(self, history, date, delta):
+        pass
+
+
+class BadTransform(Lottery):
+    def transform(self, history):
+        pass
+"""
+
+
+@pytest.fixture
+def plugins(tmp_path, monkeypatch):
+    (tmp_path / "lottery_plugin.py").write_text(_plugin)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    group = "finance_sim.event_profiles"
+    entryPoints = [
+        EntryPoint("lottery", "lottery_plugin:Lottery", group),
+        EntryPoint("missing-copy", "lottery_plugin:MissingCopy", group),
+        EntryPoint("bad-transform", "lottery_plugin:BadTransform", group),
+    ]
+    monkeypatch.setattr(
+        finance_sim.registry,
+        "entry_points",
+        lambda group: [
+            entryPoint for entryPoint in entryPoints if entryPoint.group == group
+        ],
+    )
+    yield ProfileRegistry(AbstractEventProfile, group)
+    sys.modules.pop("lottery_plugin", None)
+
+
+def testBuiltinTypesRegistered():
+    assert abstractEventProfileType["cash"] is CashEventProfile
+    assert "amortizing-loan" in abstractEventProfileType
+
+
+def testPluginLoadedOnFirstUse(plugins):
+    assert "lottery" in plugins
+    assert "lottery_plugin" not in sys.modules
+    lottery = plugins["lottery"]({"prize": 5}, "ticket")
+    assert "lottery_plugin" in sys.modules
+    assert lottery.copy().prize == 5
+    assert "lottery" in plugins.loaded()
+
+
+def testUnknownType(plugins):
+    assert "roulette" not in plugins
+    with pytest.raises(KeyError):
+        plugins["roulette"]
+
+
+def testPluginContracts(plugins):
+    with pytest.raises(RuntimeError, match="copy"):
+        plugins["missing-copy"]
+    with pytest.raises(RuntimeError, match="transform"):
+        plugins["bad-transform"]
+
+
+def testRegisterValidates():
+    registry = ProfileRegistry(AbstractEventProfile, "unused")
+    with pytest.raises(RuntimeError):
+        registry["not-a-profile"] = dict
+    registry["cash"] = CashEventProfile
+    assert list(registry) == ["cash"]
@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+from finance_sim import *
+from finance_sim.plan import compileConfig
+from finance_sim.reporting import simulateFinal
+
+initialState = [
+    StateConfig("cash", "cash", {"value": 100000}),
+    StateConfig(
+        "retirement-account",
+        "401k",
+        {
+            "accrualModel": "periodic monthly",
+            "initialValue": 0,
+            "annualReturn": 0,
+            "contribution": 30000,
+            "contributionLimit": 23000,
+        },
+    ),
+]
+years = 2
+
+
+def _account(config, **data):
+    for key, value in data.items():
+        config = withConfigValue(config, "initialState.401k.{}".format(key), value)
+    return config
+
+
+def testContributionsStopAtTheYearlyLimits(scenario):
+    final = simulateFinal(_account(scenario, employerMatch=0.5, employerMatchLimit=5000))
+    account = final.events.events["401k"]
+    assert isinstance(account, RetirementAccount)
+    # 11 steps fall in 2000 and 12 in 2001, each asking for 2500
+    assert account.contributedThisYear == pytest.approx(23000)
+    assert account.matchedThisYear == pytest.approx(5000)
+    assert final.values["401k"] == pytest.approx(2 * 23000 + 2 * 5000)
+    assert final.values["cash"] == pytest.approx(100000 - 2 * 23000)
+
+
+def testLimitsGrowWithTheIndex(scenario):
+    final = simulateFinal(_account(scenario, index={"annualRate": 0.1}))
+    assert final.values["401k"] == pytest.approx(23000 + 23000 * 1.1)
+    tables = final.events.events["401k"].tables
+    assert list(tables.years["year"]) == [2000, 2001]
+    assert list(tables.years["contributionLimit"]) == pytest.approx([23000, 25300])
+
+
+def testRequiredMinimumDistributions(scenario):
+    config = withConfigValue(scenario, "initialState.cash.value", 0)
+    final = simulateFinal(
+        _account(config, initialValue=265000, contribution=0, birthYear=1927)
+    )
+    # turning 73 in 2000, 1/26.5 of the balance is paid out over the year
+    firstYear = 10000 * 11 / 12
+    secondYear = (265000 - firstYear) / 25.5
+    assert final.values["401k"] == pytest.approx(265000 - firstYear - secondYear)
+    assert final.values["cash"] == pytest.approx(firstYear + secondYear)
+
+
+def testDistributionsStartAtTheRmdAge(scenario):
+    config = _account(withConfigValue(scenario, "time.period", 3), birthYear=1928)
+    tables = simulateFinal(config).events.events["401k"].tables
+    assert list(tables.years["rmdDivisor"]) == [0, 26.5, 25.5]
+
+
+def testContributionsReduceTaxableIncome(scenario):
+    config = _account(scenario, contribution=12000, contributionLimit=20000)
+    config.initialState.insert(
+        1,
+        StateConfig(
+            "constant-salaried-income",
+            "salary",
+            {"salary": 120000, "accrualModel": "periodic monthly"},
+        ),
+    )
+    config.initialState.append(
+        StateConfig(
+            "tax-payment",
+            "taxes",
+            {
+                "frequency": "1M",
+                "accrualModel": "periodic monthly",
+                "brackets": [{"rate": 0.1, "income": 0}],
+            },
+        )
+    )
+    final = simulateFinal(config)
+    assert final.events.events["taxes"].taxesPaid == pytest.approx(23 * 0.1 * 9000)
+
+
+def testBatchedAccountsMatchTheProfile(scenario):
+    initialValues = [0, 50000, 400000]
+    kwargs = {"annualReturn": 0.05, "employerMatch": 1, "employerMatchLimit": 4000}
+    kwargs.update({"birthYear": 1926, "index": {"annualRate": 0.02}})
+    config = _account(withConfigValue(scenario, "time.period", 4), **kwargs)
+    finals = [
+        simulateFinal(_account(config, initialValue=value)) for value in initialValues
+    ]
+    plan = compileConfig(config)
+    account = plan.initialProfiles[1].instantiate()
+    account.prepare(plan.timeline, 0)
+    totals = simulateAccounts(account.tables, initialValues)
+    assert list(totals["value"]) == pytest.approx([f.values["401k"] for f in finals])
+    assert list(totals["contributed"]) == pytest.approx(
+        [100000 - f.values["cash"] + totals["distributed"][i] for i, f in enumerate(finals)]
+    )
+    # the match limit binds at every balance
+    assert list(totals["matched"]) == pytest.approx([totals["matched"][0]] * 3)
+
+
+def testBatchedGrowthReplacesTheTables(scenario):
+    plan = compileConfig(_account(scenario, annualReturn=0.05))
+    account = plan.initialProfiles[1].instantiate()
+    account.prepare(plan.timeline, 0)
+    steps = len(account.tables.steps)
+    totals = simulateAccounts(account.tables, [1000, 1000], np.ones((2, steps)))
+    flat = simulateFinal(_account(scenario, initialValue=1000))
+    assert list(totals["value"]) == pytest.approx([flat.values["401k"]] * 2)
+    with pytest.raises(ArgumentError):
+        simulateAccounts(account.tables, [1000], np.ones((2, steps)))
+
+
+def testAccountNeverDueInTheRun(scenario):
+    config = withConfigValue(scenario, "time.period", 1)
+    final = simulateFinal(
+        _account(config, accrualModel="periodic yearly", initialValue=1000, birthYear=1920)
+    )
+    account = final.events.events["401k"]
+    assert len(account.tables) == 0 and len(account.tables.years) == 0
+    assert final.values["401k"] == 1000
@@ -0,0 +1,74 @@
+import pytest
+import numpy as np
+import finance_sim.scheduling as scheduling
+from finance_sim import *
+from finance_sim.scheduling import buildTimeline, cadenceKey, portionOfYear, portionsOfYear
+from ctypes import ArgumentError
+from datetime import date
+from dateutil.relativedelta import relativedelta
+
+
+@pytest.mark.parametrize(
+    "startingDate, granularity, accrualModel",
+    [
+        (date(2000, 1, 31), relativedelta(months=1), AccrualModel.PeriodicMonthly),
+        (date(2000, 2, 29), relativedelta(years=1), AccrualModel.PeriodicYearly),
+        (date(2000, 1, 15), relativedelta(days=15), AccrualModel.PeriodicSemiMonthly),
+        (date(2000, 1, 3), relativedelta(days=7), AccrualModel.PeriodicWeekly),
+        (date(2000, 1, 3), relativedelta(days=14), AccrualModel.PeriodicBiweekly),
+        (date(1999, 12, 20), relativedelta(days=1), AccrualModel.ProRata),
+        (date(1999, 12, 20), relativedelta(days=10), AccrualModel.ProRata),
+        (date(2000, 1, 31), relativedelta(months=1), AccrualModel.ProRata),
+    ],
+)
+def testVectorizedMatchesScalar(startingDate, granularity, accrualModel):
+    timeline = buildTimeline(startingDate, granularity, 9, accrualModel, [accrualModel])
+    key = cadenceKey(accrualModel)
+    starts, ends = timeline.spans(key)
+    scalar = [
+        portionOfYear(date.fromordinal(ordinal), due[key], accrualModel)
+        for ordinal, due in zip(timeline.ordinals, timeline.due)
+        if key in due
+    ]
+    assert np.allclose(portionsOfYear(starts, ends, accrualModel), scalar)
+
+
+def testVectorizedRejectsMismatchedPeriods():
+    start = date(2000, 1, 10).toordinal()
+    with pytest.raises(ArgumentError):
+        portionsOfYear([start], [start + 10], AccrualModel.PeriodicWeekly)
+    with pytest.raises(ArgumentError):
+        portionsOfYear([start], [start + 30], AccrualModel.PeriodicMonthly)
+    with pytest.raises(ArgumentError):
+        portionsOfYear([start], [start + 15], AccrualModel.PeriodicSemiMonthly)
+
+
+def testPeriodValidatedOnce(monkeypatch):
+    calls = []
+    original = scheduling.nonZeroValuesInDelta
+    monkeypatch.setattr(
+        scheduling,
+        "nonZeroValuesInDelta",
+        lambda delta: calls.append(delta) or original(delta),
+    )
+    period = relativedelta(months=7)
+    for month in range(1, 13):
+        assert portionOfYear(
+            date(2000, month, 1), period, AccrualModel.PeriodicMonthly
+        ) == (pytest.approx(7 / 12))
+        portionOfYear(
+            date(2000, month, 1), relativedelta(months=7), AccrualModel.PeriodicMonthly
+        )
+    assert len(calls) <= 1
+
+
+def testInvalidPeriodStillRaises():
+    for _ in range(2):
+        with pytest.raises(ArgumentError):
+            portionOfYear(
+                date(2000, 1, 1), relativedelta(days=3), AccrualModel.PeriodicMonthly
+            )
+    with pytest.raises(ArgumentError):
+        portionOfYear(
+            date(2000, 1, 3), relativedelta(days=15), AccrualModel.PeriodicSemiMonthly
+        )
@@ -0,0 +1,104 @@
+import pytest
+from finance_sim import *
+from finance_sim.sensitivity import numericConfigPaths, sensitivities
+from datetime import date
+
+initialState = [
+    StateConfig("cash", "cash", {"value": 20000}),
+    StateConfig(
+        "constant-expense",
+        "rent",
+        {"yearlyExpense": 1200, "accrualModel": "periodic monthly"},
+    ),
+    StateConfig(
+        "lognormal-return-asset",
+        "stocks",
+        {
+            "accrualModel": "periodic monthly",
+            "initialValue": 1000,
+            "annualReturn": 0.05,
+            "annualVolatility": 0,
+            "seed": 3,
+        },
+    ),
+]
+scheduledValues = [
+    ScheduledState(
+        StateConfig(
+            "constant-salaried-income",
+            "salary",
+            {"salary": 600, "accrualModel": "periodic monthly"},
+        ),
+        date(2010, 1, 1),
+        date(2030, 1, 1),
+        False,
+    )
+]
+years = 30
+
+
+def testNumericConfigPathsSkipIntegerFields(scenario):
+    assert numericConfigPaths(scenario) == [
+        "initialState.cash.value",
+        "initialState.rent.yearlyExpense",
+        "initialState.stocks.initialValue",
+        "initialState.stocks.annualReturn",
+        "initialState.stocks.annualVolatility",
+        "scheduledStateUpdates.salary.salary",
+    ]
+
+
+def testSensitivitiesMatchClosedForm(scenario):
+    table = sensitivities(scenario).set_index("path")
+    assert table.loc["initialState.cash.value", "sensitivity"] == pytest.approx(1)
+    assert table.loc["initialState.rent.yearlyExpense", "sensitivity"] == pytest.approx(
+        -359 / 12
+    )
+    assert table.loc["initialState.stocks.initialValue", "sensitivity"] == pytest.approx(
+        1.05 ** (359 / 12)
+    )
+    assert table.loc["initialState.stocks.annualVolatility", "bump"] == 1e-4
+    base = table.attrs["baseNetWorth"]
+    salary = table.loc["scheduledStateUpdates.salary.salary"]
+    assert salary["elasticity"] == pytest.approx(salary["sensitivity"] * 600 / base)
+
+
+def testParallelSensitivitiesMatchSerial(scenario):
+    paths = ["initialState.cash.value", "scheduledStateUpdates.salary.salary"]
+    serial = sensitivities(scenario, paths)
+    parallel = sensitivities(scenario, paths, workers=2)
+    assert list(parallel["sensitivity"]) == list(serial["sensitivity"])
+
+
+def testFixedAndDiscreteFieldsAreNotBumped(scenario):
+    scenario.initialState[0].data.update({"depositPriority": 1, "withdrawalPriority": 0})
+    scenario.initialState += [
+        StateConfig(
+            "tax-payment",
+            "taxes",
+            {
+                "frequency": "1M",
+                "accrualModel": "periodic monthly",
+                "brackets": [{"rate": 0.1, "income": 0}, {"rate": 0.2, "income": 5000}],
+            },
+        ),
+        StateConfig(
+            "amortizing-loan",
+            "loan",
+            {
+                "accrualModel": "periodic monthly",
+                "initialPrinciple": 0,
+                "loanAmount": 1000,
+                "rate": 0.05,
+                "remainingTermInYears": 10,
+                "payment": -1,
+            },
+        ),
+    ]
+    paths = numericConfigPaths(scenario)
+    assert "initialState.taxes.brackets.0.income" not in paths
+    assert "initialState.taxes.brackets.1.income" in paths
+    assert "initialState.loan.payment" not in paths
+    assert not [path for path in paths if "Priority" in path]
+    table = sensitivities(scenario).set_index("path")
+    assert table.loc["initialState.taxes.brackets.0.rate", "sensitivity"] < 0
@@ -0,0 +1,79 @@
+import pytest
+from finance_sim import *
+from finance_sim.plan import compileConfig
+from finance_sim.reporting import _assembleInitialState, _simulate, simulateFinal
+from datetime import date
+
+initialState = [
+    StateConfig("cash", "checking", {"value": 5000, "cap": 2000}),
+    StateConfig("cash", "savings", {"value": 0}),
+    StateConfig(
+        "constant-salaried-income",
+        "salary",
+        {"salary": 30000, "accrualModel": "periodic monthly"},
+    ),
+    StateConfig(
+        "amortizing-loan",
+        "mortgage",
+        {
+            "accrualModel": "periodic monthly",
+            "initialPrinciple": 0,
+            "loanAmount": 200000,
+            "rate": 0.04,
+            "remainingTermInYears": 30,
+            "payment": -1,
+        },
+    ),
+]
+scheduledValues = [
+    ScheduledState(
+        StateConfig(
+            "constant-expense",
+            "tuition",
+            {"yearlyExpense": 8000, "accrualModel": "periodic monthly"},
+        ),
+        date(2004, 9, 1),
+        date(2008, 6, 1),
+        False,
+    )
+]
+
+
+def testFinalStateMatchesFullHistory(scenario):
+    plan = compileConfig(scenario)
+    history = FinanceHistory(_assembleInitialState(plan))
+    _simulate(plan, history)
+    expected = history.latestEvents().events
+    final = simulateFinal(scenario)
+    assert final.date == history.latestEvents().date
+    assert final.values["checking"] == pytest.approx(expected["checking"].value)
+    assert final.values["savings"] == pytest.approx(expected["savings"].value)
+    assert final.values["mortgage"] == pytest.approx(
+        expected["mortgage"].principle - 200000
+    )
+    assert final.netWorth == pytest.approx(sum(final.values.values()))
+    assert final.insolvencyDate is None
+
+
+def testNoStepIsCopied(scenario, monkeypatch):
+    def refuse(self):
+        raise AssertionError("copied a step")
+
+    expected = simulateFinal(scenario).netWorth
+    monkeypatch.setattr(EventProfileGroup, "copy", refuse)
+    assert simulateFinal(scenario).netWorth == expected
+
+
+def testPlansCanBeRunRepeatedly(scenario):
+    plan = compileConfig(scenario)
+    first, second = simulateFinal(plan), simulateFinal(plan)
+    assert first.netWorth == second.netWorth
+    assert first.events is not second.events
+
+
+def testInsolvency(scenario):
+    broke = withConfigValue(scenario, "initialState.checking.value", 0)
+    broke = withConfigValue(broke, "initialState.salary.salary", 0)
+    final = simulateFinal(broke, InsolvencyPolicy.Stop)
+    assert final.insolvencyDate == date(2000, 2, 1)
+    assert final.date == date(2000, 2, 1)
@@ -0,0 +1,96 @@
+import pytest
+from finance_sim import *
+from ctypes import ArgumentError
+from finance_sim.solver import solve, solveConstraint
+from datetime import date
+
+initialState = [
+    StateConfig("cash", "cash", {"value": 20000}),
+    StateConfig(
+        "constant-expense",
+        "rent",
+        {"yearlyExpense": 1200, "accrualModel": "periodic monthly"},
+    ),
+]
+scheduledValues = [
+    ScheduledState(
+        StateConfig(
+            "constant-salaried-income",
+            "salary",
+            {"salary": 600, "accrualModel": "periodic monthly"},
+        ),
+        date(2010, 1, 1),
+        date(2030, 1, 1),
+        False,
+    )
+]
+years = 30
+
+
+def _cash(events):
+    return events.events["cash"].value
+
+
+def testConfigPaths(scenario):
+    assert getConfigValue(scenario, "initialState.rent.yearlyExpense") == 1200
+    variant = withConfigValue(scenario, "scheduledStateUpdates.salary.salary", 900)
+    assert getConfigValue(variant, "scheduledStateUpdates.salary.salary") == 900
+    assert getConfigValue(scenario, "scheduledStateUpdates.salary.salary") == 600
+    assert getConfigValue(withConfigValue(scenario, "time.period", 5), "time.period") == 5
+
+
+@pytest.mark.parametrize("method", ["brent", "bisect"])
+def testSolveFinalCash(scenario, method):
+    # 20000 - 359 * 100 + 20 * salary == 50000
+    result = solve(
+        scenario,
+        "scheduledStateUpdates.salary.salary",
+        lambda events: _cash(events) - 50000,
+        0,
+        10000,
+        method=method,
+        tolerance=1e-6,
+    )
+    assert result.converged
+    assert result.value == pytest.approx(3295, abs=1e-4)
+    assert result.simulations < 60
+
+
+@pytest.mark.parametrize("method", ["brent", "bisect"])
+def testSolveRejectsBracketWithoutRoot(scenario, method):
+    with pytest.raises(ArgumentError):
+        solve(
+            scenario,
+            "scheduledStateUpdates.salary.salary",
+            lambda events: _cash(events) - 50000,
+            0,
+            1000,
+            method=method,
+        )
+
+
+def testSolveConstraint(scenario):
+    # cash is lowest at the end: 20000 - 359 * 100 + 240 * salary / 12 >= 1000
+    result = solveConstraint(
+        scenario,
+        "scheduledStateUpdates.salary.salary",
+        lambda events: _cash(events) >= 1000,
+        0,
+        5000,
+        tolerance=1e-3,
+    )
+    assert result.converged
+    assert result.value == pytest.approx(845, abs=1e-2)
+    assert result.value >= 845
+
+
+def testConstraintBrokenBeforeTheParameterMatters(scenario):
+    # by 2010 rent has taken cash to 20000 - 119 * 100 = 8100, whatever the salary
+    with pytest.raises(ArgumentError):
+        solveConstraint(
+            scenario,
+            "scheduledStateUpdates.salary.salary",
+            lambda events: _cash(events) >= 10000,
+            0,
+            50000,
+        )
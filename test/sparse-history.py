@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+from finance_sim import *
+from finance_sim.plan import compileConfig
+from finance_sim.reporting import _assembleInitialState, _simulate
+from datetime import date
+from dateutil.relativedelta import relativedelta
+
+initialState = [
+    StateConfig("cash", "cash", {"value": 1000}),
+    StateConfig(
+        "constant-salaried-income",
+        "salary",
+        {"salary": 1200, "accrualModel": "periodic monthly"},
+    ),
+    StateConfig(
+        "constant-expense",
+        "rent",
+        {"yearlyExpense": 600, "accrualModel": "periodic monthly"},
+    ),
+] + [
+    StateConfig(
+        "constant-expense",
+        "idle{}".format(index),
+        {"yearlyExpense": 0, "accrualModel": "periodic monthly"},
+    )
+    for index in range(20)
+]
+scheduledValues = [
+    ScheduledState(
+        StateConfig(
+            "constant-expense",
+            "bonus",
+            {"yearlyExpense": -120, "accrualModel": "periodic monthly"},
+        ),
+        date(2003, 1, 1),
+        date(2004, 1, 1),
+        False,
+    )
+]
+
+
+def _run(config, historyType):
+    plan = compileConfig(config)
+    history = historyType(_assembleInitialState(plan))
+    _simulate(plan, history)
+    return history
+
+
+def testSparseMatchesDense(scenario):
+    dense = _run(scenario, FinanceHistory)
+    sparse = _run(scenario, SparseFinanceHistory)
+    assert len(sparse.data) == len(dense.data)
+    for denseStep, sparseStep in zip(dense.data, sparse.data):
+        assert denseStep.date == sparseStep.date
+        assert list(denseStep.events) == list(sparseStep.events)
+        for name, event in denseStep.events.items():
+            assert str(event) == str(sparseStep.events[name])
+    assert str(sparse.data[-1].events["cash"]) == str(dense.latestEvents().events["cash"])
+    assert "bonus" in sparse.data[40].events
+    assert "bonus" not in sparse.data[60].events
+
+
+def testSparseStoresOnlyChanges(scenario):
+    sparse = _run(scenario, SparseFinanceHistory)
+    steps = len(sparse.dates)
+    # cash changes every step; the bonus is added and removed; everything else is stored once
+    assert sparse.storedSnapshots() == steps + 2 + 22
+    assert sparse.storedSnapshots() * 10 < steps * len(sparse.columns)
+
+
+def testSparseColumn(scenario):
+    sparse = _run(scenario, SparseFinanceHistory)
+    column = sparse.column("bonus")
+    assert column[0] is None
+    assert column[40].yearlyExpense == -120
+    assert column[-1] is None
+    assert [event.value for event in sparse.column("cash")[:3]] == [1000, 1050, 1100]
+    assert sparse.column("cash")[40].value == pytest.approx(
+        sparse.column("cash")[39].value + 60
+    )
+
+
+def testPreparedProfilesHideTheirCursorAndSharedData():
+    asset = LognormalReturnAsset(None, "stocks", annualReturn=0.05, seed=1)
+    asset.factors = np.ones(3)
+    copy = asset.copy()
+    copy.step += 1
+    assert copy.factors is asset.factors
+    assert copy.observableState() == asset.observableState()
+    assert "step" not in asset.observableState()
+
+
+class _ArrayProfile(AbstractEventProfile):
+    def __init__(self, config, name, weights=None):
+        self.name = name
+        self.weights = np.ones(3) if weights is None else weights
+
+    def transform(self, history, date, delta):
+        pass
+
+    def copy(self):
+        # a plugin that copies its arrays instead of sharing them
+        return _ArrayProfile(None, self.name, self.weights.copy())
+
+
+def testArrayStateIsComparedSafely():
+    events = {
+        "weights": _ArrayProfile(None, "weights"),
+        "cash": CashEventProfile(None, "cash"),
+    }
+    history = SparseFinanceHistory(EventProfileGroup(date(2000, 1, 1), events))
+    for month in range(2, 5):
+        history.passEvent(date(2000, month, 1), relativedelta(months=1))
+    assert history.columns["weights"].steps == [0]
+    history.latestEvents().events["weights"].weights[0] = 2
+    history.passEvent(date(2000, 5, 1), relativedelta(months=1))
+    assert history.columns["weights"].steps == [0, 4]
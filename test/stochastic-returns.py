@@ -0,0 +1,83 @@
+import pytest
+import numpy as np
+from finance_sim import *
+from finance_sim.reporting import report, simulateBatch
+from finance_sim.scheduling import buildTimeline
+from datetime import date
+from dateutil.relativedelta import relativedelta
+
+initialState = [
+    StateConfig("cash", "cash", {"value": 0}),
+    StateConfig(
+        "lognormal-return-asset",
+        "stocks",
+        {
+            "initialValue": 1000,
+            "accrualModel": "periodic monthly",
+            "seed": 42,
+            "annualReturn": 0.07,
+            "annualVolatility": 0.15,
+        },
+    ),
+]
+bootstrap = StateConfig(
+    "bootstrap-return-asset",
+    "stocks",
+    {
+        "initialValue": 1000,
+        "accrualModel": "periodic monthly",
+        "seed": 42,
+        "historicalReturns": [0.1, 0.1],
+    },
+)
+
+
+def _finalValue(config):
+    return simulateBatch([config]).finalEvents[0].events["stocks"].value
+
+
+def testLognormalReproducible(scenario):
+    assert report(scenario).equals(report(scenario))
+
+
+def testStreamsAreIndependent(scenario):
+    values = [_finalValue(variant) for variant in streamVariants(scenario, 4)]
+    assert len(set(values)) == 4
+    assert values == [_finalValue(variant) for variant in streamVariants(scenario, 4)]
+
+
+def testLognormalZeroVolatility(scenario):
+    config = withConfigValue(scenario, "initialState.stocks.annualReturn", 0.05)
+    config = withConfigValue(config, "initialState.stocks.annualVolatility", 0)
+    assert _finalValue(config) == pytest.approx(1000 * 1.05 ** (119 / 12))
+
+
+def testLognormalDrawsUpFront():
+    asset = LognormalReturnAsset(
+        None, "a", AccrualModel.PeriodicMonthly, 100, 0.07, 0.15, 1
+    )
+    timeline = buildTimeline(
+        date(2000, 1, 1), relativedelta(months=1), 2, profileModels=[asset.accrualModel]
+    )
+    asset.prepare(timeline, 0)
+    assert len(asset.factors) == 23
+    assert asset.copy().factors is asset.factors
+
+
+def testBootstrapSamplesHistory(monthlyScenario):
+    config = monthlyScenario([initialState[0], bootstrap])
+    assert _finalValue(config) == pytest.approx(1000 * 1.1 ** (119 / 12))
+    config = withConfigValue(config, "initialState.stocks.historicalReturns", [-0.2, 0.3])
+    monthly = set(np.round(np.diff(np.log(report(config)[2].astype(float))), 3))
+    assert monthly <= {round(np.log(0.8) / 12, 3), round(np.log(1.3) / 12, 3)}
+
+
+def testUnpreparedTransform():
+    events = {
+        "g": LognormalReturnAsset(None, "g", AccrualModel.PeriodicMonthly, 100, 0.05, 0, 1),
+        "cash": CashEventProfile(None, "cash", 0),
+    }
+    history = FinanceHistory(EventProfileGroup(date(1999, 12, 1), events))
+    for month in range(1, 13):
+        history.passEvent(date(2000, month, 1), relativedelta(months=1))
+    assert history.latestEvents().events["g"].value == pytest.approx(105)
@@ -0,0 +1,76 @@
+import pytest
+from finance_sim import *
+from ctypes import ArgumentError
+from types import GeneratorType
+
+path = "examples/sweep-config.yaml"
+
+
+def testParseSweep():
+    config = parseConfig(path)
+    assert config.sweep["initialState.Savings.value"] == [100, 1000, 10000]
+    assert config.sweep["initialState.CD Savings.annualAppreciation"] == pytest.approx(
+        [0.01, 0.02, 0.03, 0.04, 0.05]
+    )
+    assert config.sweep["scheduledStateUpdates.inheritance.value"] == [0, 2500, 5000]
+    assert sweepSize(config) == 45
+    assert parseConfig("examples/finance-config.yaml").sweep == {}
+
+
+def testSweepVariantsCoverTheProduct():
+    config = parseConfig(path)
+    variants = sweepVariants(config)
+    assert isinstance(variants, GeneratorType)
+    points = list(variants)
+    assert [point.index for point in points] == list(range(45))
+    first, second, last = points[0], points[1], points[-1]
+    assert first.values == {
+        "initialState.Savings.value": 100,
+        "initialState.CD Savings.annualAppreciation": 0.01,
+        "scheduledStateUpdates.inheritance.value": 0,
+    }
+    assert second.values["scheduledStateUpdates.inheritance.value"] == 2500
+    assert getConfigValue(last.config, "initialState.Savings.value") == 10000
+    assert getConfigValue(
+        last.config, "initialState.CD Savings.annualAppreciation"
+    ) == pytest.approx(0.05)
+    assert last.config.sweep == {}
+    assert getConfigValue(config, "initialState.Savings.value") == 100
+    assert len({tuple(point.values.values()) for point in points}) == 45
+
+
+def testShardsPartitionTheGrid():
+    config = parseConfig(path)
+    shards = [
+        [point.index for point in sweepVariants(config, shard, 4)] for shard in range(4)
+    ]
+    assert sorted(sum(shards, [])) == list(range(45))
+    assert shards[1] == list(range(1, 45, 4))
+    again = [point.values for point in sweepVariants(config, 1, 4)]
+    assert again == [point.values for point in list(sweepVariants(config))[1::4]]
+
+
+def testLargeGridsAreGeneratedLazily():
+    config = parseConfig(path)
+    config.sweep = {"initialState.Savings.value": list(range(1000))} | {
+        "initialState.CD Savings.initialValue": list(range(1000))
+    }
+    assert sweepSize(config) == 1000000
+    point = next(sweepVariants(config, 999999, 1000000))
+    assert point.values == {
+        "initialState.Savings.value": 999,
+        "initialState.CD Savings.initialValue": 999,
+    }
+
+
+def testInvalidSweeps(tmp_path):
+    config = parseConfig(path)
+    config.sweep = {"initialState.Savings.missing": [1]}
+    with pytest.raises(KeyError):
+        next(sweepVariants(config))
+    with pytest.raises(ArgumentError):
+        next(sweepVariants(parseConfig(path), 4, 4))
+    broken = tmp_path / "broken.yaml"
+    broken.write_text(open(path).read() + "  time.period: {start: 1}\n")
+    with pytest.raises(RuntimeError):
+        parseConfig(str(broken))
@@ -1,5 +1,7 @@
 import pytest
 from finance_sim import *
+from finance_sim.ledger import Ledger
+from finance_sim.reporting import report
 from ctypes import ArgumentError
 from datetime import date
 from dateutil.relativedelta import relativedelta
@@ -81,3 +83,33 @@ def testNonZeroTaxBracket():
             AccrualModel.PeriodicMonthly,
             [TaxBracket(rate=0.05, income=10)],
         )
+
+
+def testMonthlyTaxOnClampedMonthEnds():
+    config = ScenarioConfig(
+        TimeConfig(relativedelta(months=1), AccrualModel.ProRata, 1, date(2001, 1, 31)),
+        [
+            StateConfig("cash", "cash", {"value": 0}),
+            StateConfig(
+                "constant-salaried-income",
+                "salary",
+                {"salary": 36500, "accrualModel": "pro rata"},
+            ),
+            StateConfig(
+                "tax-payment",
+                "taxes",
+                {
+                    "frequency": "1M",
+                    "accrualModel": "pro rata",
+                    "brackets": [{"rate": 0.1, "income": 0}],
+                },
+            ),
+        ],
+        [],
+    )
+    ledger = Ledger()
+    report(config, ledger=ledger)
+    frame = ledger.frame()
+    # taxes are paid every month, including the 28, 30 and 31 day ones
+    taxes = frame[frame["source"] == "taxes"]
+    assert list(taxes["step"]) == list(range(11))
@@ -0,0 +1,93 @@
+import pytest
+from finance_sim import *
+from finance_sim.reporting import report
+from finance_sim.scheduling import buildTimeline
+from datetime import date
+from dateutil.relativedelta import relativedelta
+
+
+def testDailyTimelineLength():
+    timeline = buildTimeline(
+        date(2000, 1, 1), relativedelta(days=1), 4, AccrualModel.ProRata
+    )
+    assert len(timeline) == 366 + 365 * 3 - 1
+    assert timeline.dates()[0] == date(2000, 1, 2)
+    assert timeline.dates()[-1] == date(2003, 12, 31)
+
+
+def testMonthlyTimelineAnchoredToStartDay():
+    timeline = buildTimeline(date(2000, 1, 31), relativedelta(months=1), 1)
+    assert timeline.dates()[:3] == [date(2000, 2, 29), date(2000, 3, 31), date(2000, 4, 30)]
+    assert len(timeline) == 11
+
+
+def testSemiMonthlyTimeline():
+    timeline = buildTimeline(
+        date(2001, 1, 15), relativedelta(days=15), 1, AccrualModel.PeriodicSemiMonthly
+    )
+    assert timeline.dates()[:3] == [date(2001, 1, 31), date(2001, 2, 15), date(2001, 2, 28)]
+    assert timeline.due[1] == {None: relativedelta(days=15)}
+    assert timeline.due[2] == {None: relativedelta(days=13)}
+
+
+def testDailyProRataSimulation():
+    config = ScenarioConfig(
+        time=TimeConfig(
+            granularity=relativedelta(days=1),
+            accrualModel=AccrualModel.ProRata,
+            period=1,
+            startingDate=date(2001, 1, 1),
+        ),
+        initialState=[
+            StateConfig("cash", "cash", {"value": 1000}),
+            StateConfig(
+                "constant-expense",
+                "expense",
+                {"yearlyExpense": 365, "accrualModel": "pro rata"},
+            ),
+        ],
+        scheduledValues=[],
+    )
+    result = report(config)
+    assert len(result) == 365
+    assert float(result.iloc[-1, 1]) == pytest.approx(1000 - 364)
+
+
+def testMixedCadenceTimeline():
+    timeline = buildTimeline(
+        date(2000, 1, 1),
+        relativedelta(months=1),
+        1,
+        AccrualModel.PeriodicMonthly,
+        [AccrualModel.PeriodicBiweekly, AccrualModel.ProRata],
+    )
+    biweekly = [due for due in timeline.due if AccrualModel.PeriodicBiweekly in due]
+    monthly = [due for due in timeline.due if None in due]
+    assert len(biweekly) == 26
+    assert len(monthly) == 11
+    assert timeline.ordinals == sorted(set(timeline.ordinals))
+
+
+def testMixedAccrualSimulation(monthlyScenario):
+    config = monthlyScenario(
+        years=1,
+        initialState=[
+            StateConfig("cash", "cash", {"value": 10000}),
+            StateConfig(
+                "constant-salaried-income",
+                "salary",
+                {"salary": 2600, "accrualModel": "periodic biweekly"},
+            ),
+            StateConfig(
+                "constant-expense",
+                "rent",
+                {"yearlyExpense": 1200, "accrualModel": "periodic monthly"},
+            ),
+        ],
+        scheduledValues=[],
+    )
+    result = report(config)
+    dates = list(result[0])
+    assert date(2000, 1, 15) in dates
+    assert date(2000, 2, 1) in dates
+    assert float(result.iloc[-1, 1]) == pytest.approx(10000 + 26 * 100 - 11 * 100)